@@ -0,0 +1,13 @@
+"""
+Run every benchmark suite, save the results and optionally compare them with an earlier run.
+
+Run from the repository root (requires poks and its dev dependencies installed)::
+
+    python -m benchmarks --repeat 3 --compare latest
+    python -m benchmarks --scale 0.1 --no-save    # quick smoke run
+"""
+
+from benchmarks import bench_bucket, bench_download, bench_extract, bench_poke
+from benchmarks.harness import main
+
+main([bench_extract.run, bench_download.run, bench_poke.run, bench_bucket.run], __doc__)
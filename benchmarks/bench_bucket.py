@@ -0,0 +1,66 @@
+"""
+Cloning, pulling and searching a synthetic bucket with thousands of manifests.
+
+The bucket is a local Git repository built with ``tests.helpers.update_test_bucket_repo``.
+Run from the repository root::
+
+    python -m benchmarks.bench_bucket --repeat 3 --compare latest
+"""
+
+from __future__ import annotations
+
+import shutil
+import tempfile
+from pathlib import Path
+
+from benchmarks.harness import BenchOptions, BenchResult, main, measure
+from poks.bucket import find_manifest, get_bucket_id, search_apps_in_buckets, sync_bucket
+from poks.domain import PoksAppVersion, PoksArchive, PoksBucket, PoksManifest
+from tests.helpers import update_test_bucket_repo
+
+MANIFESTS = 5000
+
+
+def _manifest(idx: int) -> str:
+    versions = [
+        PoksAppVersion(
+            version=f"1.{minor}.0",
+            url=f"https://example.com/app{idx}/app{idx}-1.{minor}.0-${{os}}-${{arch}}.${{ext}}",
+            archives=[PoksArchive(os=os_name, arch="x86_64", ext=".tar.gz", sha256="0" * 64) for os_name in ("linux", "windows", "macos")],
+        )
+        for minor in range(5)
+    ]
+    return PoksManifest(description=f"Synthetic app {idx}", versions=versions).to_json_string()
+
+
+def run(options: BenchOptions) -> list[BenchResult]:
+    results = []
+    count = options.scaled(MANIFESTS)
+    with tempfile.TemporaryDirectory(prefix="poks-bench-") as tmp:
+        url = update_test_bucket_repo(Path(tmp) / "bucket-src", {f"app{idx}.json": _manifest(idx) for idx in range(count)})
+        bucket = PoksBucket(name="synthetic", url=url, id=get_bucket_id(url))
+        buckets_dir = Path(tmp) / "buckets"
+        local_path = buckets_dir / (bucket.id or "synthetic")
+
+        results.append(
+            measure(
+                f"bucket[clone-{count}]",
+                lambda: sync_bucket(bucket, buckets_dir),
+                options,
+                setup=lambda: shutil.rmtree(local_path, ignore_errors=True),
+                files=count,
+            )
+        )
+        results.append(measure(f"bucket[pull-{count}]", lambda: sync_bucket(bucket, buckets_dir), options, files=count))
+        results.append(measure(f"bucket[search-{count}]", lambda: search_apps_in_buckets("app4", buckets_dir), options, files=count))
+
+        def parse_all() -> None:
+            for idx in range(count):
+                PoksManifest.from_json_file(find_manifest(f"app{idx}", local_path))
+
+        results.append(measure(f"bucket[parse-{count}]", parse_all, options, files=count))
+    return results
+
+
+if __name__ == "__main__":
+    main([run], __doc__)
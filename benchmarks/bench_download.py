@@ -0,0 +1,76 @@
+"""
+Download, hash verification and cache hits, served from a local ``http.server``.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_download --repeat 3 --compare latest
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from benchmarks.harness import BenchOptions, BenchResult, main, measure
+from poks.downloader import get_cached_or_download
+
+#: Case name -> payload size
+SIZES = {"1MiB": 1024 * 1024, "64MiB": 64 * 1024 * 1024}
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@contextmanager
+def serve_directory(directory: Path) -> Iterator[str]:
+    """Serve *directory* over HTTP on a free local port and yield its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(_QuietHandler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run(options: BenchOptions) -> list[BenchResult]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="poks-bench-") as tmp:
+        served = Path(tmp) / "served"
+        served.mkdir()
+        cache_dir = Path(tmp) / "cache"
+        with serve_directory(served) as base_url:
+            for case, size in SIZES.items():
+                size = options.scaled(size)
+                payload = os.urandom(size)
+                (served / f"{case}.bin").write_bytes(payload)
+                sha256 = hashlib.sha256(payload).hexdigest()
+                url = f"{base_url}/{case}.bin"
+                for scheme, source in (("http", url), ("file", (served / f"{case}.bin").as_uri())):
+                    results.append(
+                        measure(
+                            f"download[{scheme}-{case}]",
+                            functools.partial(get_cached_or_download, source, sha256, cache_dir, use_cache=False),
+                            options,
+                            setup=functools.partial(shutil.rmtree, cache_dir, ignore_errors=True),
+                            nbytes=size,
+                        )
+                    )
+                get_cached_or_download(url, sha256, cache_dir)
+                results.append(measure(f"cache-hit[{case}]", functools.partial(get_cached_or_download, url, sha256, cache_dir), options, nbytes=size))
+    return results
+
+
+if __name__ == "__main__":
+    main([run], __doc__)
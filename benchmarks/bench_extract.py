@@ -0,0 +1,73 @@
+"""
+Extraction speed of every supported archive format, for a few large files and for many small ones.
+
+Archives are built with ``tests.helpers.create_archive``. Run from the repository root
+(requires poks and its dev dependencies installed, e.g. ``pip install -e .``)::
+
+    python -m benchmarks.bench_extract --repeat 3 --compare latest
+"""
+
+from __future__ import annotations
+
+import functools
+import importlib.util
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from benchmarks.harness import BenchOptions, BenchResult, main, measure
+from poks.extractor import SUPPORTED_FORMATS, extract_archive
+from tests.helpers import create_archive
+
+#: Case name -> (file count, file size)
+CASES = {"few-large": (8, 2 * 1024 * 1024), "many-small": (2000, 4 * 1024)}
+
+
+def synthetic_files(count: int, size: int) -> dict[str, str | bytes]:
+    """Half incompressible (like binaries), half repetitive text (like headers and scripts)."""
+    files: dict[str, str | bytes] = {}
+    for idx in range(count):
+        name = f"dir{idx % 16}/file{idx}"
+        if idx % 2:
+            files[name] = os.urandom(size)
+        else:
+            line = f"#define POKS_SYMBOL_{idx} /opt/anaconda1anaconda2anaconda3/include/{idx}.h\n"
+            files[name] = (line * (size // len(line) + 1))[:size]
+    return files
+
+
+def _lz4_available() -> bool:
+    return shutil.which("lz4") is not None or importlib.util.find_spec("lz4") is not None
+
+
+def run(options: BenchOptions) -> list[BenchResult]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="poks-bench-") as tmp:
+        for case, (count, size) in CASES.items():
+            count = options.scaled(count)
+            files = synthetic_files(count, size)
+            for ext in SUPPORTED_FORMATS:
+                if ext == ".tar.lz4" and not _lz4_available():
+                    print(f"skipping {ext}: no lz4 encoder available")
+                    continue
+                work = Path(tmp) / case / ext.lstrip(".")
+                work.mkdir(parents=True)
+                archive, _ = create_archive(work, files, fmt=ext.lstrip("."))
+                dest = work / "out"
+                results.append(
+                    measure(
+                        f"extract[{ext.lstrip('.')}-{case}]",
+                        functools.partial(extract_archive, archive, dest),
+                        options,
+                        setup=functools.partial(shutil.rmtree, dest, ignore_errors=True),
+                        nbytes=count * size,
+                        files=count,
+                    )
+                )
+                shutil.rmtree(work)
+    return results
+
+
+if __name__ == "__main__":
+    main([run], __doc__)
@@ -0,0 +1,80 @@
+"""
+Conda prefix patching of large synthetic binaries and of many small text files.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_poke --repeat 3 --compare latest
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import tempfile
+from pathlib import Path
+
+from benchmarks.harness import BenchOptions, BenchResult, main, measure
+from poks.poker import POKE_WORKERS, PatchEntry, poke
+
+PLACEHOLDER = "/opt/anaconda1anaconda2anaconda3" + "_placeholder" * 12
+BINARY_SIZE = 64 * 1024 * 1024
+TEXT_FILES = 500
+
+
+def _binary(size: int, hits: int) -> bytes:
+    """Random data with *hits* null-terminated placeholders spread evenly through it."""
+    data = bytearray(os.urandom(size))
+    marker = PLACEHOLDER.encode() + b"/lib\x00"
+    for idx in range(hits):
+        offset = idx * (size // hits)
+        data[offset : offset + len(marker)] = marker
+    return bytes(data)
+
+
+def run(options: BenchOptions) -> list[BenchResult]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="poks-bench-") as tmp:
+        install_dir = Path(tmp) / "app"
+        (install_dir / "lib").mkdir(parents=True)
+        size = options.scaled(BINARY_SIZE)
+        for case, hits in (("no-hits", 0), ("1000-hits", 1000)):
+            target = install_dir / "lib" / f"{case}.so"
+            original = _binary(size, hits) if hits else os.urandom(size)
+            patches = [PatchEntry(path=f"lib/{case}.so", prefix_placeholder=PLACEHOLDER, file_mode="binary")]
+            results.append(
+                measure(
+                    f"poke[binary-{case}]",
+                    functools.partial(poke, install_dir, patches),
+                    options,
+                    setup=functools.partial(target.write_bytes, original),
+                    nbytes=size,
+                    files=1,
+                )
+            )
+
+        count = options.scaled(TEXT_FILES)
+        script = "".join(f'export PATH="{PLACEHOLDER}/bin:$PATH"  # {idx}\n' for idx in range(200))
+        (install_dir / "bin").mkdir()
+        patches = [PatchEntry(path=f"bin/script{idx}", prefix_placeholder=PLACEHOLDER, file_mode="text") for idx in range(count)]
+
+        def reset_scripts() -> None:
+            for entry in patches:
+                (install_dir / entry.path).write_text(script)
+
+        for workers in (1, POKE_WORKERS):
+            label = "serial" if workers == 1 else "parallel"
+            results.append(
+                measure(
+                    f"poke[text-{count}-files-{label}]",
+                    functools.partial(poke, install_dir, patches, workers=workers),
+                    options,
+                    setup=reset_scripts,
+                    nbytes=count * len(script),
+                    files=count,
+                )
+            )
+    return results
+
+
+if __name__ == "__main__":
+    main([run], __doc__)
@@ -0,0 +1,155 @@
+"""
+Shared runner for the benchmark suites: timing, saving results and comparing runs.
+
+Every suite module exposes ``run(options) -> list[BenchResult]``. Results are written
+to ``.benchmarks/<timestamp>.json`` so a later run can be compared against them with
+``--compare latest`` (or the path of a saved result).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path(".benchmarks")
+#: Slowdowns above this ratio are flagged when comparing runs
+REGRESSION_THRESHOLD = 1.10
+
+
+@dataclass
+class BenchOptions:
+    """Knobs shared by all suites."""
+
+    #: Runs per case; the fastest one is compared
+    repeat: int
+    #: Multiplier for data sizes and counts
+    scale: float
+
+    def scaled(self, value: int) -> int:
+        return max(1, int(value * self.scale))
+
+
+@dataclass
+class BenchResult:
+    """Timings of one benchmark case."""
+
+    name: str
+    best: float
+    median: float
+    rounds: int
+    #: Work done per run, used to report throughput
+    bytes: int | None = None
+    files: int | None = None
+
+    @property
+    def mib_per_second(self) -> float | None:
+        return self.bytes / self.best / (1024 * 1024) if self.bytes and self.best > 0 else None
+
+
+def measure(
+    name: str,
+    fn: Callable[[], object],
+    options: BenchOptions,
+    setup: Callable[[], object] | None = None,
+    nbytes: int | None = None,
+    files: int | None = None,
+) -> BenchResult:
+    """Time *fn* ``options.repeat`` times, calling *setup* untimed before each run."""
+    timings = []
+    for _ in range(options.repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    result = BenchResult(name=name, best=min(timings), median=statistics.median(timings), rounds=len(timings), bytes=nbytes, files=files)
+    rate = f"{result.mib_per_second:9.1f} MiB/s" if result.mib_per_second is not None else ""
+    print(f"{name:<48} {result.best:>9.4f}s {result.median:>9.4f}s {rate}", flush=True)
+    return result
+
+
+def save_results(results: Sequence[BenchResult], options: BenchOptions, results_dir: Path = RESULTS_DIR) -> Path:
+    """Write *results* with the machine and revision they were measured on, and return the file path."""
+    results_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = results_dir / f"{stamp}.json"
+    document = {
+        "created": stamp,
+        "commit": _git_revision(),
+        "machine": {"python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count()},
+        "options": asdict(options),
+        "results": [asdict(result) for result in results],
+    }
+    path.write_text(json.dumps(document, indent=2))
+    return path
+
+
+def load_results(path: Path) -> dict[str, BenchResult]:
+    return {entry["name"]: BenchResult(**entry) for entry in json.loads(path.read_text())["results"]}
+
+
+def latest_results(names: set[str], results_dir: Path = RESULTS_DIR, exclude: Path | None = None) -> Path | None:
+    """Return the most recent saved result (other than *exclude*) that measured any of the benchmarks *names*."""
+    for path in sorted(results_dir.glob("*.json"), reverse=True):
+        if path != exclude and names & load_results(path).keys():
+            return path
+    return None
+
+
+def compare(results: Sequence[BenchResult], baseline: dict[str, BenchResult]) -> list[str]:
+    """Print the change of each best time against *baseline* and return the names of regressed cases."""
+    regressions = []
+    print(f"\n{'benchmark':<48} {'baseline':>10} {'current':>10} {'change':>8}")
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None:
+            continue
+        ratio = result.best / before.best if before.best > 0 else 1.0
+        flag = ""
+        if ratio > REGRESSION_THRESHOLD:
+            flag = "  REGRESSION"
+            regressions.append(result.name)
+        print(f"{result.name:<48} {before.best:>9.4f}s {result.best:>9.4f}s {(ratio - 1) * 100:>+7.1f}%{flag}")
+    return regressions
+
+
+def main(suites: Sequence[Callable[[BenchOptions], list[BenchResult]]], description: str | None) -> None:
+    """Parse the common options, run *suites*, save and optionally compare the results."""
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest one is compared.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier for data sizes and counts.")
+    parser.add_argument("--no-save", action="store_true", help=f"Do not write the results to {RESULTS_DIR}/.")
+    parser.add_argument("--compare", metavar="RESULT", help="Saved result to compare with, or 'latest'.")
+    args = parser.parse_args()
+
+    options = BenchOptions(repeat=args.repeat, scale=args.scale)
+    print(f"{'benchmark':<48} {'best':>10} {'median':>10}")
+    results = [result for suite in suites for result in suite(options)]
+    saved = None if args.no_save else save_results(results, options)
+    if saved:
+        print(f"\nSaved {saved}")
+    if args.compare:
+        baseline = latest_results({result.name for result in results}, exclude=saved) if args.compare == "latest" else Path(args.compare)
+        if baseline is None:
+            print("No earlier result to compare with.")
+        else:
+            print(f"Comparing with {baseline}")
+            if compare(results, load_results(baseline)):
+                sys.exit(1)
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()  # noqa: S607
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,150 @@
+"""Shell activation snippets for installed apps, served from a precomputed cache."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass
+from enum import Enum
+from pathlib import Path
+
+from py_app_dev.core.exceptions import UserNotificationException
+
+from poks import __version__
+from poks.state import STATE_FILE_NAME
+
+
+class Shell(str, Enum):
+    """Output formats supported by ``poks env``."""
+
+    BASH = "bash"
+    PWSH = "pwsh"
+    CMD = "cmd"
+    FISH = "fish"
+    JSON = "json"
+
+
+@dataclass
+class Activation:
+    """Directories to prepend to PATH and environment variables to set, in config order."""
+
+    dirs: list[str]
+    env: dict[str, str]
+
+
+def get_activation(config_path: Path, root_dir: Path) -> Activation:
+    """
+    Return the activation for the apps in *config_path*, using the cached copy when it is still valid.
+
+    The cache is keyed by the config file path and invalidated whenever the config file
+    or the installed-state file changes. A cache hit only reads two ``stat`` results and one
+    small JSON file, without importing any of the install machinery.
+
+    Raises:
+        UserNotificationException: If the config file is missing or an app from it is not installed.
+
+    """
+    if not config_path.is_file():
+        raise UserNotificationException(f"Config file not found: {config_path}")
+    cache_file = _cache_file_for(config_path, root_dir)
+    state_stamp = _state_stamp(root_dir)
+    stamp = _stamp(config_path, root_dir, state_stamp)
+    try:
+        cached = json.loads(cache_file.read_text())
+        if cached.get("stamp") == stamp:
+            return Activation(dirs=cached["dirs"], env=cached["env"])
+    except (OSError, ValueError, KeyError):
+        pass
+
+    activation = _compute_activation(config_path, root_dir)
+    if state_stamp is None:
+        # Computing migrated a missing installed-state file into existence
+        stamp = _stamp(config_path, root_dir, _state_stamp(root_dir))
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_text(json.dumps({"stamp": stamp, **asdict(activation)}, indent=2))
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass  # A read-only root still gets a correct (uncached) answer
+    return activation
+
+
+def render_activation(activation: Activation, shell: Shell) -> str:
+    """Render the activation as a snippet to be evaluated by *shell*."""
+    if shell == Shell.JSON:
+        return json.dumps(asdict(activation), indent=2)
+    lines: list[str] = []
+    if shell == Shell.BASH:
+        if activation.dirs:
+            lines.append(f'export PATH={":".join(_posix_quote(d) for d in activation.dirs)}:"$PATH"')
+        lines.extend(f"export {key}={_posix_quote(value)}" for key, value in activation.env.items())
+    elif shell == Shell.FISH:
+        if activation.dirs:
+            lines.append(f"set -gx PATH {' '.join(_fish_quote(d) for d in activation.dirs)} $PATH")
+        lines.extend(f"set -gx {key} {_fish_quote(value)}" for key, value in activation.env.items())
+    elif shell == Shell.PWSH:
+        if activation.dirs:
+            lines.append(f"$env:PATH = {_pwsh_quote(os.pathsep.join(activation.dirs))} + [IO.Path]::PathSeparator + $env:PATH")
+        lines.extend(f"$env:{key} = {_pwsh_quote(value)}" for key, value in activation.env.items())
+    elif shell == Shell.CMD:
+        if activation.dirs:
+            lines.append(f'set "PATH={";".join(activation.dirs)};%PATH%"')
+        lines.extend(f'set "{key}={value}"' for key, value in activation.env.items())
+    return "\n".join(lines)
+
+
+def _cache_file_for(config_path: Path, root_dir: Path) -> Path:
+    key = hashlib.sha256(str(config_path.resolve()).encode()).hexdigest()[:16]
+    return root_dir / "cache" / "activation" / f"{key}.json"
+
+
+def _stamp(config_path: Path, root_dir: Path, state_stamp: list[int] | None) -> list[object]:
+    """Cheap fingerprint of everything the activation depends on, given the ``_state_stamp`` of *root_dir*."""
+    config_stat = config_path.stat()
+    # The root is part of the stamp because a moved root (see ``poks relocate``) keeps the state file's mtime
+    return [__version__, str(root_dir.resolve()), config_stat.st_mtime_ns, config_stat.st_size, *(state_stamp or [])]
+
+
+def _state_stamp(root_dir: Path) -> list[int] | None:
+    """Return the mtime and size of the installed-state file, or None if it does not exist (yet)."""
+    try:
+        state_stat = (root_dir / "apps" / STATE_FILE_NAME).stat()
+    except FileNotFoundError:
+        return None
+    return [state_stat.st_mtime_ns, state_stat.st_size]
+
+
+def _compute_activation(config_path: Path, root_dir: Path) -> Activation:
+    from poks.domain import InstallResult, PoksConfig
+    from poks.platform import get_current_platform
+    from poks.poks import Poks
+
+    config = PoksConfig.from_json_file(config_path)
+    installed = {(app.name, app.version): app for app in Poks(root_dir=root_dir, progress_callback=None, extract_callback=None).list_installed().apps}
+    current_os, current_arch = get_current_platform()
+
+    selected = []
+    for app in config.apps:
+        if not app.is_supported(current_os, current_arch):
+            continue
+        installed_app = installed.get((app.name, app.version))
+        if installed_app is None:
+            raise UserNotificationException(f"App {app.name}@{app.version} is not installed. Run 'poks install -c {config_path}' first.")
+        selected.append(installed_app)
+
+    result = InstallResult(apps=selected)
+    return Activation(dirs=[str(d) for d in result.dirs], env=result.env)
+
+
+def _posix_quote(value: str) -> str:
+    return "'" + value.replace("'", "'\"'\"'") + "'"
+
+
+def _fish_quote(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _pwsh_quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
@@ -0,0 +1,222 @@
+"""
+asyncio facade for embedding Poks in async applications.
+
+``AsyncPoks`` runs the blocking ``Poks`` operations on its own thread pool, so awaiting
+them never blocks the event loop, and reports progress as an async iterator of
+``ProgressEvent`` instead of callbacks. With the ``async`` extra (``httpx``) installed,
+``install`` first downloads the missing archives with asynchronous HTTP on the event loop;
+only the extraction then holds a worker thread. Without it, downloads run on the worker
+threads as well::
+
+    async with AsyncPoks(root_dir) as poks:
+        watcher = asyncio.create_task(show(poks.progress()))
+        result = await poks.install(Path("poks.json"))
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import hashlib
+import os
+import ssl
+import threading
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Literal, TypeVar
+
+from py_app_dev.core.logging import logger
+
+from poks.domain import InstalledApp, InstallResult, PoksBundleArchive, PoksConfig, PoksMirror
+from poks.downloader import cache_path_for, mirror_url
+from poks.poks import Poks
+from poks.resolver import resolve_mirror_urls
+from poks.tracing import Tracer
+
+_T = TypeVar("_T")
+
+#: Seconds without any data before an asynchronous download is given up
+_DOWNLOAD_TIMEOUT = 60
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    """Latest progress of one app's download or extraction, see ``AsyncPoks.progress``."""
+
+    kind: Literal["download", "extract"]
+    app_name: str
+    #: Bytes downloaded or extracted so far
+    current: int
+    total: int | None
+
+
+class AsyncPoks:
+    """
+    Awaitable counterpart of ``Poks``.
+
+    Every call runs on a dedicated thread pool of *max_workers* threads (Python's default
+    when None); further concurrent calls wait for a free thread without blocking the loop.
+    ``install`` of a config downloads its archives on the event loop first when ``httpx`` is
+    available, except with the store, a bandwidth limit or the cache disabled, which keep
+    the downloads of ``Poks``. ``install_app`` always downloads on its worker thread.
+    Use it as an async context manager, or call ``aclose`` when done.
+    """
+
+    def __init__(
+        self,
+        root_dir: Path,
+        use_cache: bool = True,
+        use_store: bool = False,
+        tracer: Tracer | None = None,
+        mirror: str | None = None,
+        max_bandwidth: int | None = None,
+        max_workers: int | None = None,
+    ) -> None:
+        self.poks = Poks(
+            root_dir=root_dir,
+            progress_callback=functools.partial(self._report, "download"),
+            extract_callback=functools.partial(self._report, "extract"),
+            use_cache=use_cache,
+            use_store=use_store,
+            tracer=tracer,
+            mirror=mirror,
+            max_bandwidth=max_bandwidth,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="poks-async")
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._subscribers: set[asyncio.Queue[ProgressEvent | None]] = set()
+        # Progress is coalesced per bar: workers only overwrite the latest value and the loop
+        # is woken once per batch, not once per downloaded chunk
+        self._pending: dict[tuple[str, str], ProgressEvent] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_scheduled = False
+
+    async def __aenter__(self) -> AsyncPoks:
+        """Return the facade itself."""
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, exc: BaseException | None, tb: TracebackType | None) -> None:
+        """Close the facade, see ``aclose``."""
+        await self.aclose()
+
+    async def install(self, config_or_path: Path | PoksConfig) -> InstallResult:
+        """Install apps from a configuration file or config object, see ``Poks.install``."""
+        config = PoksConfig.from_json_file(config_or_path) if isinstance(config_or_path, Path) else config_or_path
+        await self._fetch(config)
+        return await self._run(self.poks.install, config)
+
+    async def install_app(self, app_name: str, version: str, bucket: str | None = None) -> InstalledApp:
+        """Install a single application from a bucket, see ``Poks.install_app``."""
+        return await self._run(self.poks.install_app, app_name, version, bucket)
+
+    async def list_installed(self) -> InstallResult:
+        """List the installed apps, see ``Poks.list_installed``."""
+        return await self._run(self.poks.list_installed)
+
+    async def progress(self) -> AsyncIterator[ProgressEvent]:
+        """
+        Yield the progress of all operations started after subscribing, until ``aclose``.
+
+        Events of a bar that changes faster than the consumer reads are merged into the latest one.
+        """
+        self._loop = asyncio.get_running_loop()
+        subscriber: asyncio.Queue[ProgressEvent | None] = asyncio.Queue()
+        self._subscribers.add(subscriber)
+        try:
+            while (event := await subscriber.get()) is not None:
+                yield event
+        finally:
+            self._subscribers.discard(subscriber)
+
+    async def aclose(self) -> None:
+        """Wait for the running operations, then end the progress iterators."""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self._flush()
+        for subscriber in self._subscribers:
+            subscriber.put_nowait(None)
+
+    async def _fetch(self, config: PoksConfig) -> None:
+        """
+        Download the archives ``install`` of *config* is missing into the cache with asynchronous HTTP.
+
+        This is a head start only: archives that fail here are downloaded again by the install,
+        which reports the errors as usual.
+        """
+        try:
+            import httpx
+        except ImportError:
+            return
+        if self.poks.use_store or self.poks.limiter or not self.poks.use_cache:
+            return
+        entries = await self._run(self.poks.pending_downloads, config)
+        if not entries:
+            return
+        self.poks.cache_dir.mkdir(parents=True, exist_ok=True)
+        async with httpx.AsyncClient(timeout=_DOWNLOAD_TIMEOUT, follow_redirects=True, verify=ssl.create_default_context()) as client:
+            await asyncio.gather(*(self._download(client, entry, config.mirrors) for entry in entries))
+
+    async def _download(self, client: Any, entry: PoksBundleArchive, mirrors: list[PoksMirror]) -> None:
+        """Download *entry* from the first of its sources that serves it, see ``get_cached_or_download``."""
+        import httpx
+
+        sources = [mirror_url(self.poks.mirror, entry.sha256, entry.url)] if self.poks.mirror else list(dict.fromkeys([*resolve_mirror_urls(entry.url, mirrors), entry.url]))
+        cached = cache_path_for(entry.url, self.poks.cache_dir)
+        tmp_path = cached.with_name(f".{cached.name}.{os.getpid()}.tmp")
+        for source in sources:
+            if not source.startswith(("http://", "https://")):
+                continue
+            sha256 = hashlib.sha256()
+            try:
+                async with client.stream("GET", source) as response:
+                    response.raise_for_status()
+                    content_length = response.headers.get("Content-Length")
+                    total = int(content_length) if content_length else None
+                    downloaded = 0
+                    with tmp_path.open("wb") as fh:
+                        async for chunk in response.aiter_bytes():
+                            fh.write(chunk)
+                            sha256.update(chunk)
+                            downloaded += len(chunk)
+                            self._report("download", entry.app, downloaded, total)
+            except (httpx.HTTPError, OSError) as e:
+                logger.debug(f"Asynchronous download of {source} failed: {e}")
+                continue
+            if sha256.hexdigest() == entry.sha256:
+                os.replace(tmp_path, cached)
+                return
+            logger.debug(f"SHA256 mismatch for {source}: expected {entry.sha256}, got {sha256.hexdigest()}")
+        tmp_path.unlink(missing_ok=True)
+
+    async def _run(self, fn: Callable[..., _T], *args: object) -> _T:
+        self._loop = asyncio.get_running_loop()
+        # Tracing and timing contexts of the caller follow the call into the worker thread
+        call = functools.partial(contextvars.copy_context().run, fn, *args)
+        return await self._loop.run_in_executor(self._executor, call)
+
+    def _report(self, kind: Literal["download", "extract"], app_name: str, current: int, total: int | None) -> None:
+        """Progress callback, invoked on the worker threads."""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        with self._pending_lock:
+            self._pending[(kind, app_name)] = ProgressEvent(kind, app_name, current, total)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        try:
+            loop.call_soon_threadsafe(self._flush)
+        except RuntimeError:
+            # The loop is closed, nobody is listening anymore
+            pass
+
+    def _flush(self) -> None:
+        with self._pending_lock:
+            events, self._pending = list(self._pending.values()), {}
+            self._flush_scheduled = False
+        for subscriber in self._subscribers:
+            for event in events:
+                subscriber.put_nowait(event)
@@ -0,0 +1,101 @@
+"""Shared download bandwidth limit with weighted fair sharing that favours small downloads."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import re
+import threading
+import time
+
+_RATE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*([kmg]?)(?:i?b)?(?:/s)?", re.IGNORECASE)
+_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+#: Smallest burst, so that a download chunk always fits into the bucket
+_MIN_BURST = 64 * 1024
+#: Downloads with at least this many bytes left (or of unknown size) get the base share
+_LARGE_DOWNLOAD = 64 * 1024 * 1024
+#: Share of the smallest downloads relative to the base share
+_MAX_WEIGHT = 16.0
+
+
+def parse_rate(value: str) -> int:
+    """
+    Parse a bandwidth such as ``"500K"``, ``"10M"``, ``"1.5MB/s"`` or ``"2048"`` into bytes per second.
+
+    Raises:
+        ValueError: If *value* is not a positive rate.
+
+    """
+    match = _RATE_RE.fullmatch(value.strip())
+    if not match or float(match.group(1)) <= 0:
+        raise ValueError(f"Invalid bandwidth '{value}', expected e.g. 500K, 10M or 1G (bytes per second)")
+    return int(float(match.group(1)) * _UNITS[match.group(2).lower()])
+
+
+class BandwidthLimiter:
+    """
+    Token bucket limiting the combined throughput of all downloads sharing it.
+
+    Downloads call ``acquire`` for every chunk they received. When they have to wait, the
+    bandwidth is shared by self-clocked fair queuing: every chunk gets a virtual finish tag
+    of the current virtual time plus its size divided by the weight of its download, and the
+    smallest tag goes first. The weight grows up to ``_MAX_WEIGHT`` as fewer bytes remain, so
+    small archives finish early, while a large SDK (or a download of unknown size) still gets
+    at least its base share and never starves.
+    """
+
+    def __init__(self, bytes_per_second: int, burst: int | None = None) -> None:
+        if bytes_per_second <= 0:
+            raise ValueError("bytes_per_second must be positive")
+        self.rate = bytes_per_second
+        self.burst = burst or max(bytes_per_second // 10, _MIN_BURST)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        #: Waiting chunks as (virtual finish tag, arrival order)
+        self._waiting: list[tuple[float, int]] = []
+        self._arrivals = itertools.count()
+        #: Finish tag of the last chunk let through
+        self._virtual_time = 0.0
+
+    def acquire(self, nbytes: int, remaining: int | None = None) -> None:
+        """
+        Block until *nbytes* may be transferred.
+
+        Args:
+            nbytes: Size of the chunk.
+            remaining: Bytes the download still has to transfer after this chunk, or None if
+                unknown (such downloads get the base share, like large ones).
+
+        """
+        nbytes = min(nbytes, self.burst)
+        with self._cond:
+            entry = (self._virtual_time + nbytes / _weight(remaining), next(self._arrivals))
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiting[0] == entry:
+                        if self._tokens >= nbytes:
+                            self._tokens -= nbytes
+                            self._virtual_time = entry[0]
+                            return
+                        self._cond.wait((nbytes - self._tokens) / self.rate)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+def _weight(remaining: int | None) -> float:
+    """Return the share of a download with *remaining* bytes left, relative to a large download."""
+    if remaining is None:
+        return 1.0
+    return min(_MAX_WEIGHT, max(1.0, _LARGE_DOWNLOAD / max(remaining, 1)))
@@ -4,11 +4,11 @@ import hashlib
 import json
 from pathlib import Path
 
-from git import Repo
-from git.exc import GitCommandError, InvalidGitRepositoryError, NoSuchPathError
 from py_app_dev.core.logging import logger
 
 from poks.domain import PoksBucket, PoksBucketRegistry
+from poks.timings import span
+from poks.tracing import trace
 
 
 def get_bucket_id(url: str) -> str:
@@ -47,6 +47,8 @@ def save_registry(registry: PoksBucketRegistry, registry_path: Path) -> None:
 
 def _pull_repo(repo_path: Path) -> None:
     """Fetch and reset a local git repository to match its remote tracking branch."""
+    from git import Repo
+
     repo = Repo(repo_path)
     repo.remotes.origin.fetch()
     tracking = repo.active_branch.tracking_branch()
@@ -57,6 +59,10 @@ def _pull_repo(repo_path: Path) -> None:
 
 def sync_bucket(bucket: PoksBucket, buckets_dir: Path) -> Path:
     """Clone or pull a bucket repository and return its local path."""
+    # GitPython is slow to import, only load it when a bucket is actually synced
+    from git import Repo
+    from git.exc import GitCommandError, InvalidGitRepositoryError, NoSuchPathError
+
     # Use ID if available, otherwise name (legacy/config)
     dir_name = bucket.id or bucket.name
     if not dir_name:
@@ -95,7 +101,8 @@ def sync_all_buckets(buckets: list[PoksBucket], buckets_dir: Path) -> dict[str,
     """Sync every bucket and return a ``{name_or_id: local_path}`` mapping."""
     result = {}
     for bucket in buckets:
-        path = sync_bucket(bucket, buckets_dir)
+        with span("bucket sync", target=bucket.name or bucket.id), trace("sync_bucket", {"poks.bucket": bucket.name or bucket.id or "", "poks.url": bucket.url}):
+            path = sync_bucket(bucket, buckets_dir)
         # Map both ID and name if available to ensure lookup works
         if bucket.id:
             result[bucket.id] = path
@@ -179,6 +186,8 @@ def update_local_buckets(buckets_dir: Path) -> None:
     if not buckets_dir.exists():
         return
 
+    from git.exc import GitCommandError, InvalidGitRepositoryError
+
     for bucket_dir in buckets_dir.iterdir():
         if not bucket_dir.is_dir():
             continue
@@ -0,0 +1,140 @@
+"""
+Offline bundles: a single file with the archives, manifests and locked config of an install.
+
+Layout::
+
+    MAGIC | archive bytes ... | index (PoksBundleIndex as JSON) | trailer (index offset, index size, MAGIC)
+
+Archives are stored uncompressed one after the other, once per SHA256, so a reader can
+memory-map the bundle and copy any archive out of it without parsing the others.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from pathlib import Path
+
+from py_app_dev.core.exceptions import UserNotificationException
+
+from poks.domain import PoksBundleArchive, PoksBundleIndex
+from poks.downloader import cache_path_for
+
+BUNDLE_MAGIC = b"POKSBDL1"
+_TRAILER = struct.Struct("<QQ8s")
+_DRIVE_PREFIX = re.compile(r"^[A-Za-z]:")
+
+
+class BundleError(UserNotificationException):
+    """Raised when a bundle file is invalid or does not contain a requested archive."""
+
+
+def platform_key(os_name: str, arch: str) -> str:
+    return f"{os_name}/{arch}"
+
+
+def write_bundle(output: Path, index: PoksBundleIndex, archives: Mapping[str, Path]) -> None:
+    """
+    Write *index* and the *archives* (SHA256 -> file) it references to *output*.
+
+    The offset and size of every entry in ``index.archives`` are filled in.
+    """
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(f"{output.name}.tmp")
+    locations: dict[str, tuple[int, int]] = {}
+    with tmp_path.open("wb") as fh:
+        fh.write(BUNDLE_MAGIC)
+        for entry in index.archives:
+            if entry.sha256 not in locations:
+                offset = fh.tell()
+                with archives[entry.sha256].open("rb") as src:
+                    shutil.copyfileobj(src, fh, 1024 * 1024)
+                locations[entry.sha256] = (offset, fh.tell() - offset)
+            entry.offset, entry.size = locations[entry.sha256]
+        index_offset = fh.tell()
+        data = json.dumps(index.to_dict()).encode()
+        fh.write(data)
+        fh.write(_TRAILER.pack(index_offset, len(data), BUNDLE_MAGIC))
+    os.replace(tmp_path, output)
+
+
+class BundleReader:
+    """Read access to a memory-mapped bundle, see ``open_bundle``."""
+
+    def __init__(self, data: mmap.mmap, index: PoksBundleIndex) -> None:
+        self._data = data
+        self.index = index
+
+    def archives_for(self, os_name: str, arch: str) -> list[PoksBundleArchive]:
+        return [entry for entry in self.index.archives if entry.os == os_name and entry.arch == arch]
+
+    def write_manifests(self, buckets_dir: Path) -> dict[str, Path]:
+        """Write the bundled manifests as one bucket directory per bucket and return ``{bucket: path}``."""
+        bucket_paths = {}
+        for bucket, manifests in self.index.manifests.items():
+            bucket_path = buckets_dir / bucket
+            bucket_path.mkdir(parents=True, exist_ok=True)
+            for app_name, manifest in manifests.items():
+                manifest.to_json_file(bucket_path / f"{app_name}.json")
+            bucket_paths[bucket] = bucket_path
+        return bucket_paths
+
+    def copy_archive(self, entry: PoksBundleArchive, dest: Path) -> Path:
+        """Copy the bytes of *entry* straight from the mapping to *dest*."""
+        if entry.offset + entry.size > len(self._data):
+            raise BundleError(f"Archive of {entry.app}@{entry.version} lies outside the bundle, it is truncated")
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with memoryview(self._data) as view, view[entry.offset : entry.offset + entry.size] as archive, dest.open("wb") as fh:
+            fh.write(archive)
+        return dest
+
+    def seed_cache(self, entry: PoksBundleArchive, cache_dir: Path) -> Path:
+        """Put the archive of *entry* where the download cache looks for its URL."""
+        dest = cache_path_for(entry.url, cache_dir)
+        if not dest.resolve().is_relative_to(cache_dir.resolve()):
+            raise BundleError(f"Archive of {entry.app}@{entry.version} would be written outside the download cache")
+        return self.copy_archive(entry, dest)
+
+
+def _check_index(index: PoksBundleIndex, path: Path) -> None:
+    """
+    Reject indexes whose names would be used as paths outside their directory.
+
+    Bucket and app names become manifest files of the bucket directories, app names and
+    versions become ``apps/<name>/<version>`` install directories.
+    """
+    names = [*index.manifests, *(app for manifests in index.manifests.values() for app in manifests)]
+    names += [value for app in index.config.apps for value in (app.name, app.version)]
+    names += [value for entry in index.archives for value in (entry.app, entry.version)]
+    for name in names:
+        if name in ("", ".", "..") or "/" in name or "\\" in name or _DRIVE_PREFIX.match(name):
+            raise BundleError(f"{path} is corrupt: {name!r} is not a valid bucket, app or version name")
+
+
+@contextmanager
+def open_bundle(path: Path) -> Iterator[BundleReader]:
+    """
+    Memory-map the bundle at *path* and read its index.
+
+    Raises:
+        BundleError: If the file is not a Poks bundle, or its index names paths outside
+            the directories they belong to.
+
+    """
+    if path.stat().st_size < len(BUNDLE_MAGIC) + _TRAILER.size:
+        raise BundleError(f"{path} is not a Poks bundle")
+    with path.open("rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data[: len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+            raise BundleError(f"{path} is not a Poks bundle")
+        index_offset, index_size, magic = _TRAILER.unpack_from(data, len(data) - _TRAILER.size)
+        if magic != BUNDLE_MAGIC or index_offset + index_size > len(data) - _TRAILER.size:
+            raise BundleError(f"{path} is truncated or corrupt")
+        index = PoksBundleIndex.from_dict(json.loads(data[index_offset : index_offset + index_size]))
+        _check_index(index, path)
+        yield BundleReader(data, index)
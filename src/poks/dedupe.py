@@ -0,0 +1,105 @@
+"""File-level deduplication across installed app versions."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import stat
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from py_app_dev.core.logging import logger
+
+from poks.store import clone_file
+
+_HEAD_SIZE = 64 * 1024
+_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class DedupeResult:
+    """Outcome of a deduplication run."""
+
+    #: Number of files replaced by a link
+    files_linked: int = 0
+    #: Bytes no longer stored twice
+    bytes_saved: int = 0
+    #: Linked files per install directory, relative to it
+    linked: dict[Path, list[str]] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class _FileRef:
+    root: Path
+    path: Path
+
+
+def find_duplicates(roots: list[Path]) -> list[list[_FileRef]]:
+    """
+    Group identical regular files below *roots*.
+
+    Files are first bucketed by ``(device, size, mode)``, so files with a unique size are never read.
+    Remaining candidates are narrowed down by a hash of their first 64 KiB and only
+    then fully hashed. Files that are already links of each other (same inode)
+    count once.
+    """
+    by_size: dict[tuple[int, int, int], list[_FileRef]] = defaultdict(list)
+    seen_inodes: set[tuple[int, int]] = set()
+    for root in roots:
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for name in filenames:
+                path = Path(dirpath, name)
+                st = path.lstat()
+                if not stat.S_ISREG(st.st_mode) or st.st_size == 0:
+                    continue
+                if (st.st_dev, st.st_ino) in seen_inodes:
+                    continue
+                seen_inodes.add((st.st_dev, st.st_ino))
+                by_size[(st.st_dev, st.st_size, st.st_mode)].append(_FileRef(root, path))
+
+    groups: list[list[_FileRef]] = []
+    for candidates in by_size.values():
+        if len(candidates) < 2:
+            continue
+        for same_head in _bucket_by(candidates, _head_digest):
+            groups.extend(_bucket_by(same_head, _full_digest) if same_head[0].path.stat().st_size > _HEAD_SIZE else [same_head])
+    return groups
+
+
+def dedupe(roots: list[Path]) -> DedupeResult:
+    """Replace identical files below *roots* with reflinks (or hardlinks) to a single copy."""
+    result = DedupeResult()
+    for group in find_duplicates(roots):
+        canonical = group[0].path
+        for ref in group[1:]:
+            size = ref.path.stat().st_size
+            method = clone_file(canonical, ref.path)
+            if method is None:
+                logger.debug(f"Cannot link {ref.path} to {canonical}, keeping it")
+                continue
+            result.files_linked += 1
+            result.bytes_saved += size
+            result.linked.setdefault(ref.root, []).append(ref.path.relative_to(ref.root).as_posix())
+    return result
+
+
+def _bucket_by(refs: list[_FileRef], key_fn: Callable[[Path], str]) -> list[list[_FileRef]]:
+    buckets: dict[str, list[_FileRef]] = defaultdict(list)
+    for ref in refs:
+        buckets[key_fn(ref.path)].append(ref)
+    return [bucket for bucket in buckets.values() if len(bucket) > 1]
+
+
+def _head_digest(path: Path) -> str:
+    with path.open("rb") as fh:
+        return hashlib.sha256(fh.read(_HEAD_SIZE)).hexdigest()
+
+
+def _full_digest(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with path.open("rb") as fh:
+        while chunk := fh.read(_CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256.hexdigest()
@@ -1,25 +1,39 @@
 from poks.domain.models import (
     InstalledApp,
     InstallResult,
+    PhaseTiming,
     PoksApp,
     PoksAppEnv,
     PoksAppVersion,
     PoksArchive,
     PoksBucket,
     PoksBucketRegistry,
+    PoksBundleArchive,
+    PoksBundleIndex,
     PoksConfig,
+    PoksInstalledEntry,
+    PoksInstalledState,
     PoksManifest,
+    PoksMirror,
+    PoksReceipt,
 )
 
 __all__ = [
     "InstallResult",
     "InstalledApp",
+    "PhaseTiming",
     "PoksApp",
     "PoksAppEnv",
     "PoksAppVersion",
     "PoksArchive",
     "PoksBucket",
     "PoksBucketRegistry",
+    "PoksBundleArchive",
+    "PoksBundleIndex",
     "PoksConfig",
+    "PoksInstalledEntry",
+    "PoksInstalledState",
     "PoksManifest",
+    "PoksMirror",
+    "PoksReceipt",
 ]
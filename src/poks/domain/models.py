@@ -15,6 +15,8 @@ else:
 from mashumaro.config import BaseConfig
 from mashumaro.mixins.json import DataClassJSONMixin
 
+from poks.timings import PhaseTiming
+
 
 @dataclass
 class PoksJsonMixin(DataClassJSONMixin):
@@ -95,6 +97,23 @@ class PoksManifest(PoksJsonMixin):
     license: str | None = None
     homepage: str | None = None
 
+    def get_version(self, version: str) -> PoksAppVersion | None:
+        """Return the entry for *version*, or None if the manifest does not list it."""
+        return next((v for v in self.versions if v.version == version), None)
+
+    @classmethod
+    def read_version(cls, file_path: Path, version: str) -> PoksAppVersion | None:
+        """
+        Decode only the entry for *version* from a manifest file.
+
+        The other versions stay raw JSON and are never turned into
+        ``PoksAppVersion``/``PoksArchive`` objects, which keeps single-version
+        lookups cheap for manifests with a long release history.
+        """
+        data = json.loads(file_path.read_text())
+        raw = next((v for v in data.get("versions", []) if v.get("version") == version), None)
+        return PoksAppVersion.from_dict(raw) if raw is not None else None
+
 
 @dataclass
 class PoksBucket(PoksJsonMixin):
@@ -184,6 +203,66 @@ class PoksAppEnv(PoksJsonMixin):
     env: dict[str, str] | None = None
 
 
+@dataclass
+class PoksInstalledEntry(PoksJsonMixin):
+    """An installed application version as recorded in the installed-state file."""
+
+    name: str
+    version: str
+    #: Archive-resolved bin directories, relative to the install directory
+    bin_dirs: list[str] | None = None
+    #: Archive-resolved environment variables (``${dir}`` not yet expanded)
+    env: dict[str, str] | None = None
+    #: Files (relative to the install directory) replaced by links to identical files by ``poks dedupe``
+    deduped: list[str] | None = None
+
+
+@dataclass
+class PoksInstalledState(PoksJsonMixin):
+    """Index of installed application versions, kept up to date by install and uninstall."""
+
+    apps: list[PoksInstalledEntry] = field(default_factory=list)
+
+    def get(self, name: str, version: str) -> PoksInstalledEntry | None:
+        """Find the entry for an app version."""
+        for entry in self.apps:
+            if entry.name == name and entry.version == version:
+                return entry
+        return None
+
+    def add_or_update(self, entry: PoksInstalledEntry) -> bool:
+        """Add an entry or replace the existing one for the same app version. Returns True if the state changed."""
+        for idx, existing in enumerate(self.apps):
+            if existing.name == entry.name and existing.version == entry.version:
+                if existing == entry:
+                    return False
+                self.apps[idx] = entry
+                return True
+        self.apps.append(entry)
+        return True
+
+    def remove(self, name: str, version: str | None = None) -> None:
+        """Remove one version of an app, or all of its versions when *version* is None."""
+        self.apps = [e for e in self.apps if not (e.name == name and (version is None or e.version == version))]
+
+
+@dataclass
+class PoksReceipt(PoksJsonMixin):
+    """Resolved install record stored next to each installed app version."""
+
+    bucket_id: str | None = None
+    bucket_name: str | None = None
+    bucket_url: str | None = None
+    #: Installed version spec (its ``archives`` list is left empty, see ``archive``)
+    version: PoksAppVersion | None = None
+    #: The archive chosen for the install platform
+    archive: PoksArchive | None = None
+    #: Fully expanded download URL
+    url: str | None = None
+    #: SHA256 digest of the downloaded archive
+    sha256: str | None = None
+
+
 @dataclass
 class InstalledApp:
     """An installed application with resolved paths and environment."""
@@ -202,6 +281,10 @@ class InstalledApp:
     downloaded: bool = False
     #: True if the archive was unpacked (False if already installed)
     extracted: bool = False
+    #: True if the install was linked from the unpacked store
+    linked: bool = False
+    #: Time spent in each install phase, in execution order
+    timings: list[PhaseTiming] = field(default_factory=list)
 
     @property
     def status_label(self) -> str:
@@ -210,6 +293,8 @@ class InstalledApp:
             return "downloaded & unpacked"
         if self.extracted:
             return "cache hit, unpacked"
+        if self.linked:
+            return "store hit, linked"
         return "already installed"
 
     def format_status(self) -> str:
@@ -223,6 +308,8 @@ class InstallResult:
 
     #: Installed apps in config order
     apps: list[InstalledApp]
+    #: Phases shared by all apps, such as bucket syncs
+    timings: list[PhaseTiming] = field(default_factory=list)
 
     @property
     def dirs(self) -> list[Path]:
@@ -243,9 +330,57 @@ class InstallResult:
         return merged
 
 
+@dataclass
+class PoksMirror(PoksJsonMixin):
+    """
+    A URL rewrite rule offering another source for downloads.
+
+    Archives whose URL starts with ``prefix`` can also be downloaded from the same URL with
+    ``prefix`` replaced by ``url``, e.g. ``https://github.com/`` by an internal Artifactory remote.
+    """
+
+    prefix: str
+    url: str
+
+    def rewrite(self, download_url: str) -> str | None:
+        """Return *download_url* on this mirror, or None if the rule does not apply to it."""
+        if not download_url.startswith(self.prefix):
+            return None
+        return self.url + download_url[len(self.prefix) :]
+
+
 @dataclass
 class PoksConfig(PoksJsonMixin):
     """Top-level configuration file listing buckets and apps to install."""
 
     buckets: list[PoksBucket] = field(default_factory=list)
     apps: list[PoksApp] = field(default_factory=list)
+    #: Alternative download sources, raced against each other and the upstream URL
+    mirrors: list[PoksMirror] = field(default_factory=list)
+
+
+@dataclass
+class PoksBundleArchive(PoksJsonMixin):
+    """An archive locked into an offline bundle for one app and platform."""
+
+    app: str
+    version: str
+    os: str
+    arch: str
+    url: str
+    sha256: str
+    #: Position of the archive bytes in the bundle file (archives shared by several entries are stored once)
+    offset: int = 0
+    size: int = 0
+
+
+@dataclass
+class PoksBundleIndex(PoksJsonMixin):
+    """Table of contents of an offline bundle: the config, its manifests and the locked archives."""
+
+    config: PoksConfig
+    #: ``<os>/<arch>`` platforms the bundle holds archives for
+    platforms: list[str]
+    #: Bucket name -> app name -> manifest reduced to the bundled version
+    manifests: dict[str, dict[str, PoksManifest]] = field(default_factory=dict)
+    archives: list[PoksBundleArchive] = field(default_factory=list)
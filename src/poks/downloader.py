@@ -2,18 +2,28 @@
 
 from __future__ import annotations
 
+import functools
 import hashlib
+import itertools
+from collections.abc import Iterator, Sequence
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass
 from pathlib import Path
+from urllib.parse import quote, urlsplit
 from urllib.request import url2pathname
 
-import requests
 from py_app_dev.core.logging import logger
 
+from poks.bandwidth import BandwidthLimiter
 from poks.progress import ProgressCallback
+from poks.timings import span
+from poks.tracing import trace
 
 _HASH_CHUNK_SIZE = 8192
 _DOWNLOAD_TIMEOUT = 60
+#: Number of download sources whose first bytes are raced against each other
+MIRROR_RACE = 3
 
 
 class DownloadError(Exception):
@@ -29,6 +39,7 @@ def download_file(
     dest: Path,
     app_name: str = "",
     progress_callback: ProgressCallback | None = None,
+    limiter: BandwidthLimiter | None = None,
 ) -> Path:
     """
     Download the file at *url* to *dest*.
@@ -38,6 +49,7 @@ def download_file(
         dest: Local file path to write to.
         app_name: Application name passed to the progress callback.
         progress_callback: Optional callback invoked on each chunk.
+        limiter: Optional bandwidth limit shared with other downloads.
 
     Returns:
         The *dest* path.
@@ -46,44 +58,184 @@ def download_file(
         DownloadError: On HTTP or network failures.
 
     """
-    dest.parent.mkdir(parents=True, exist_ok=True)
-    if url.startswith("file://"):
-        src = Path(url2pathname(url[7:]))
-        file_size = src.stat().st_size
-        downloaded = 0
-        with src.open("rb") as src_fh, dest.open("wb") as dst_fh:
-            while chunk := src_fh.read(_HASH_CHUNK_SIZE):
-                dst_fh.write(chunk)
-                downloaded += len(chunk)
-                if progress_callback:
-                    progress_callback(app_name, downloaded, file_size)
-        return dest
-    _download_via_http(url, dest, app_name, progress_callback)
+    with open_url(url) as (total, chunks):
+        _write_chunks(chunks, total, dest, app_name, progress_callback, limiter)
     return dest
 
 
-def _download_via_http(
-    url: str,
+def download_fastest(
+    urls: Sequence[str],
+    dest: Path,
+    app_name: str = "",
+    progress_callback: ProgressCallback | None = None,
+    race: int = MIRROR_RACE,
+    limiter: BandwidthLimiter | None = None,
+    sha256: str | None = None,
+) -> str:
+    """
+    Download the same file from whichever of *urls* answers first.
+
+    The first *race* URLs are requested concurrently and the download continues on the one
+    whose first bytes arrive first. If it fails, or its content does not match *sha256*,
+    the remaining URLs are tried the same way. Without *sha256* the content must be
+    verified afterwards, since any source may win.
+
+    Args:
+        urls: Sources of the file, in order of preference.
+        dest: Local file path to write to.
+        app_name: Application name passed to the progress callback.
+        progress_callback: Optional callback invoked on each chunk.
+        race: Number of sources requested at the same time.
+        limiter: Optional bandwidth limit shared with other downloads.
+        sha256: Expected SHA256 hex digest, checked before a source is accepted.
+
+    Returns:
+        The URL the file was downloaded from.
+
+    Raises:
+        DownloadError: If every source failed or served different content.
+
+    """
+    candidates = list(urls)
+    errors = []
+    while candidates:
+        contenders = candidates[: max(race, 1)]
+        winner = None
+        try:
+            with _open_fastest(contenders) as (winner, total, chunks):
+                # A failure while streaming moves on to the other sources
+                candidates.remove(winner)
+                _write_chunks(chunks, total, dest, app_name, progress_callback, limiter)
+            if sha256:
+                verify_sha256(dest, sha256)
+            return winner
+        except HashMismatchError as exc:
+            # A broken or stale mirror must not win the race, try the remaining sources
+            logger.warning(f"{exc} (from {winner})")
+            errors.append(f"{exc} (from {winner})")
+            dest.unlink(missing_ok=True)
+        except DownloadError as exc:
+            logger.warning(str(exc))
+            errors.append(str(exc))
+            if winner is None:
+                del candidates[: len(contenders)]
+    raise DownloadError("; ".join(errors) or "No download source")
+
+
+@contextmanager
+def _open_fastest(urls: Sequence[str]) -> Iterator[tuple[str, int | None, Iterator[bytes]]]:
+    """Open all *urls* at once and yield the URL, size and chunks of the first one to deliver data."""
+    if len(urls) == 1:
+        with open_url(urls[0]) as (total, chunks):
+            yield urls[0], total, chunks
+        return
+
+    def first_bytes(url: str) -> tuple[ExitStack, int | None, Iterator[bytes]]:
+        with ExitStack() as stack:
+            total, chunks = stack.enter_context(open_url(url))
+            first = next(chunks, b"")
+            return stack.pop_all(), total, itertools.chain([first], chunks)
+
+    def close_loser(future: Future[tuple[ExitStack, int | None, Iterator[bytes]]]) -> None:
+        if not future.cancelled() and future.exception() is None:
+            future.result()[0].close()
+
+    # Losers may still be connecting; they are closed whenever they finish, without waiting for them
+    executor = ThreadPoolExecutor(max_workers=len(urls), thread_name_prefix="poks-race")
+    futures = {executor.submit(first_bytes, url): url for url in urls}
+    executor.shutdown(wait=False)
+    pending = set(futures)
+    errors = []
+    winner = None
+    while pending and winner is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                errors.append(str(future.exception()))
+            elif winner is None:
+                winner = future
+            else:
+                close_loser(future)
+    for future in pending:
+        future.add_done_callback(close_loser)
+    if winner is None:
+        raise DownloadError("; ".join(errors))
+    stack, total, chunks = winner.result()
+    logger.info(f"Downloading from {futures[winner]}")
+    with stack:
+        yield futures[winner], total, chunks
+
+
+def _write_chunks(
+    chunks: Iterator[bytes],
+    total: int | None,
     dest: Path,
     app_name: str,
     progress_callback: ProgressCallback | None,
+    limiter: BandwidthLimiter | None,
 ) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    with dest.open("wb") as fh:
+        downloaded = 0
+        for chunk in chunks:
+            fh.write(chunk)
+            downloaded += len(chunk)
+            if limiter:
+                limiter.acquire(len(chunk), total - downloaded if total is not None else None)
+            if progress_callback:
+                progress_callback(app_name, downloaded, total)
+
+
+@contextmanager
+def open_url(url: str) -> Iterator[tuple[int | None, Iterator[bytes]]]:
+    """
+    Open *url* (``http(s)://`` or ``file://``) for streaming.
+
+    Yields:
+        The size in bytes if known, and an iterator over the content chunks.
+
+    Raises:
+        DownloadError: On HTTP or network failures, also while iterating the chunks.
+
+    """
+    if url.startswith("file://"):
+        src = Path(url2pathname(url[7:]))
+        try:
+            src_fh = src.open("rb")
+        except OSError as exc:
+            raise DownloadError(f"Failed to download {url}: {exc}") from exc
+        with src_fh:
+            yield src.stat().st_size, iter(functools.partial(src_fh.read, _HASH_CHUNK_SIZE), b"")
+        return
+
+    # requests (and urllib3) are only needed for actual HTTP downloads
+    import requests
+
     try:
         with requests.get(url, stream=True, timeout=_DOWNLOAD_TIMEOUT) as response:
             response.raise_for_status()
             content_length = response.headers.get("Content-Length")
-            total: int | None = int(content_length) if content_length else None
-            downloaded = 0
-            with dest.open("wb") as fh:
-                for chunk in response.iter_content(chunk_size=_HASH_CHUNK_SIZE):
-                    fh.write(chunk)
-                    downloaded += len(chunk)
-                    if progress_callback:
-                        progress_callback(app_name, downloaded, total)
+            yield (int(content_length) if content_length else None), response.iter_content(chunk_size=_HASH_CHUNK_SIZE)
     except requests.RequestException as exc:
         raise DownloadError(f"Failed to download {url}: {exc}") from exc
 
 
+def mirror_url(mirror: str, sha256: str, url: str) -> str:
+    """Return the URL under which a ``poks serve`` *mirror* serves the archive *sha256* downloaded from *url*."""
+    filename = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1] or "archive"
+    return f"{mirror.rstrip('/')}/{sha256}/{quote(filename)}?url={quote(url, safe='')}"
+
+
+def file_sha256(file_path: Path) -> str:
+    """Return the SHA256 hex digest of *file_path*."""
+    sha256 = hashlib.sha256()
+    with span("hash verify") as timing, file_path.open("rb") as fh:
+        while chunk := fh.read(_HASH_CHUNK_SIZE):
+            sha256.update(chunk)
+        timing.bytes = fh.tell()
+    return sha256.hexdigest()
+
+
 def verify_sha256(file_path: Path, expected_hash: str) -> None:
     """
     Verify *file_path* matches *expected_hash*.
@@ -92,16 +244,12 @@ def verify_sha256(file_path: Path, expected_hash: str) -> None:
         HashMismatchError: When the computed hash differs from *expected_hash*.
 
     """
-    sha256 = hashlib.sha256()
-    with file_path.open("rb") as fh:
-        while chunk := fh.read(_HASH_CHUNK_SIZE):
-            sha256.update(chunk)
-    actual = sha256.hexdigest()
+    actual = file_sha256(file_path)
     if actual != expected_hash:
         raise HashMismatchError(f"SHA256 mismatch for {file_path.name}: expected {expected_hash}, got {actual}")
 
 
-def _cache_path_for(url: str, cache_dir: Path) -> Path:
+def cache_path_for(url: str, cache_dir: Path) -> Path:
     """Derive a deterministic cache file path from a URL."""
     filename = Path(url.split("?")[0].rstrip("/")).name
     url_hash = hashlib.sha256(url.encode()).hexdigest()[:8]
@@ -123,6 +271,9 @@ def get_cached_or_download(
     app_name: str = "",
     progress_callback: ProgressCallback | None = None,
     use_cache: bool = True,
+    mirror: str | None = None,
+    alternates: Sequence[str] = (),
+    limiter: BandwidthLimiter | None = None,
 ) -> DownloadResult:
     """
     Return a cached copy of the archive, downloading if necessary.
@@ -137,21 +288,62 @@ def get_cached_or_download(
         app_name: Application name passed to the progress callback.
         progress_callback: Optional callback invoked during download.
         use_cache: If False, skip the cache and always download.
+        mirror: Base URL of a ``poks serve`` mirror to download through instead of *url*.
+        alternates: Other URLs serving the same archive (see ``resolve_mirror_urls``), raced
+            against *url* with ``download_fastest``. The archive is still cached under *url*.
+        limiter: Optional bandwidth limit shared with other downloads.
 
     Returns:
         Path to the verified archive in the cache.
 
     """
-    cached = _cache_path_for(url, cache_dir)
-    if use_cache and cached.exists():
-        try:
-            verify_sha256(cached, sha256)
-            logger.info(f"Cache hit: {cached}")
-            return DownloadResult(path=cached, downloaded=False)
-        except HashMismatchError:
-            logger.warning(f"Corrupt cache entry {cached}, re-downloading")
-            cached.unlink()
+    with trace("get_cached_or_download", {"poks.app": app_name, "poks.url": url}) as trace_span:
+        result = _get_cached_or_download(url, sha256, cache_dir, app_name, progress_callback, use_cache, mirror, alternates, limiter)
+        if trace_span.is_recording():
+            trace_span.set_attribute("poks.cache_hit", not result.downloaded)
+            trace_span.set_attribute("poks.bytes", result.path.stat().st_size)
+    return result
+
+
+def cached_archive(url: str, sha256: str, cache_dir: Path) -> Path | None:
+    """Return the cached download of *url* if it exists and matches *sha256*; a corrupt entry is deleted."""
+    cached = cache_path_for(url, cache_dir)
+    with span("cache lookup"):
+        cache_hit = cached.exists()
+    if not cache_hit:
+        return None
+    try:
+        verify_sha256(cached, sha256)
+    except HashMismatchError:
+        logger.warning(f"Corrupt cache entry {cached}, re-downloading")
+        cached.unlink()
+        return None
+    logger.info(f"Cache hit: {cached}")
+    return cached
+
+
+def _get_cached_or_download(
+    url: str,
+    sha256: str,
+    cache_dir: Path,
+    app_name: str,
+    progress_callback: ProgressCallback | None,
+    use_cache: bool,
+    mirror: str | None,
+    alternates: Sequence[str],
+    limiter: BandwidthLimiter | None,
+) -> DownloadResult:
+    if use_cache and (cached := cached_archive(url, sha256, cache_dir)):
+        return DownloadResult(path=cached, downloaded=False)
+    cached = cache_path_for(url, cache_dir)
     cache_dir.mkdir(parents=True, exist_ok=True)
-    download_file(url, cached, app_name=app_name, progress_callback=progress_callback)
-    verify_sha256(cached, sha256)
+    sources = [mirror_url(mirror, sha256, url)] if mirror else list(dict.fromkeys([*alternates, url]))
+    with span("download") as timing:
+        if len(sources) == 1:
+            download_file(sources[0], cached, app_name=app_name, progress_callback=progress_callback, limiter=limiter)
+        else:
+            download_fastest(sources, cached, app_name=app_name, progress_callback=progress_callback, limiter=limiter, sha256=sha256)
+        timing.bytes = cached.stat().st_size
+    if len(sources) == 1:
+        verify_sha256(cached, sha256)
     return DownloadResult(path=cached, downloaded=True)
@@ -2,23 +2,31 @@
 
 from __future__ import annotations
 
+import functools
 import io
 import json
+import os
+import posixpath
+import re
 import shutil
+import subprocess
 import tarfile
+import tempfile
 import time
 import zipfile
-from collections.abc import Generator
+from collections.abc import Callable, Generator, Iterable, Mapping
 from contextlib import contextmanager
+from dataclasses import replace
 from pathlib import Path
-from typing import Any, Literal, cast
+from typing import IO, Any, Literal, cast
 
-import py7zr
-import zstandard
 from py_app_dev.core.exceptions import UserNotificationException
 
-from poks.poker import PatchEntry, poke
+from poks.poker import POKE_WORKERS, PatchEntry, PokeReport, poke
 from poks.progress import ProgressCallback
+from poks.relocation import save_relocation_index
+from poks.timings import span
+from poks.tracing import trace
 
 SUPPORTED_FORMATS: dict[str, str] = {
     ".conda": "conda",
@@ -29,9 +37,34 @@ SUPPORTED_FORMATS: dict[str, str] = {
     ".txz": "tar:xz",
     ".tar.bz2": "tar:bz2",
     ".tbz2": "tar:bz2",
+    ".tar.zst": "tar:zst",
+    ".tzst": "tar:zst",
+    ".tar.lz4": "tar:lz4",
     ".7z": "7z",
 }
 
+#: External decompressors tried, in order, for the compression of tar archives.
+#: Each command reads the compressed stream on stdin and writes the tar stream to stdout.
+#: The in-process codec is used when none of them is on PATH.
+DECOMPRESSORS: dict[str, list[list[str]]] = {
+    "xz": [["xz", "-dc", "-T0"], ["pixz", "-d"]],
+    "bz2": [["lbzip2", "-dc"], ["pbzip2", "-dc"]],
+    "gz": [["pigz", "-dc"]],
+    "lz4": [["lz4", "-dc"]],
+}
+
+
+#: Minimum seconds between two extraction progress callbacks
+PROGRESS_INTERVAL = 0.1
+
+_DRIVE_PREFIX = re.compile(r"^[A-Za-z]:")
+_PERCENT = re.compile(rb"(\d+)%")
+#: ``Attributes`` of a symlink in the 7-Zip technical listing: the Windows reparse point
+#: flag (``L``) or a Unix mode string of type ``l``, e.g. ``A_ lrwxrwxrwx``
+_7Z_SYMLINK_ATTRIBUTES = re.compile(r"^[A-Za-z0-9_]*L|(?:^|\s)l[rwxsStT-]{9}")
+#: Same limit as Linux (``MAXSYMLINKS``), guards against symlink loops
+_MAX_SYMLINK_DEPTH = 40
+
 
 def _detect_format(archive_path: Path) -> str:
     """Return the format key for the given archive path based on its suffix(es)."""
@@ -43,66 +76,312 @@ def _detect_format(archive_path: Path) -> str:
     raise ValueError(f"Unsupported archive format: {archive_path.name}. Supported: {supported}")
 
 
-def _validate_entry_paths(names: list[str], dest_dir: Path) -> None:
-    """Reject archive entries that would escape *dest_dir* via path traversal."""
-    resolved_dest = dest_dir.resolve()
+def _validate_entry_paths(names: Iterable[str], symlinks: Mapping[str, str] | None = None) -> None:
+    """
+    Reject archive entries that would escape the destination directory via path traversal.
+
+    This is a pure string check, no filesystem access per entry: names are normalized
+    as POSIX paths (backslashes count as separators) and must neither be absolute nor
+    climb above the archive root. *symlinks* maps the normalized names of the archive's
+    symlink entries to their targets; paths through them are resolved within the
+    archive, so links (or chains of links) pointing outside are rejected as well.
+    """
     for name in names:
-        target = (dest_dir / name).resolve()
-        if not target.is_relative_to(resolved_dest):
+        normalized = name.replace("\\", "/")
+        if normalized.startswith("/") or _DRIVE_PREFIX.match(normalized):
+            raise ValueError(f"Path traversal detected in archive entry: {name!r}")
+        if symlinks:
+            escapes = _resolve_in_archive(normalized, symlinks) is None
+        else:
+            normalized = posixpath.normpath(normalized)
+            escapes = normalized == ".." or normalized.startswith("../")
+        if escapes:
             raise ValueError(f"Path traversal detected in archive entry: {name!r}")
 
 
+def _resolve_in_archive(path: str, symlinks: Mapping[str, str], depth: int = 0) -> list[str] | None:
+    """Resolve *path* through the archive's own symlinks; None if it leaves the archive root."""
+    parts: list[str] = []
+    for part in path.split("/"):
+        if part in ("", "."):
+            continue
+        if part == "..":
+            if not parts:
+                return None
+            parts.pop()
+            continue
+        parts.append(part)
+        target = symlinks.get("/".join(parts))
+        if target is None:
+            continue
+        target = target.replace("\\", "/")
+        if depth >= _MAX_SYMLINK_DEPTH or target.startswith("/") or _DRIVE_PREFIX.match(target):
+            return None
+        resolved = _resolve_in_archive("/".join([*parts[:-1], target]), symlinks, depth + 1)
+        if resolved is None:
+            return None
+        parts = resolved
+    return parts
+
+
+def _tar_symlinks(members: Iterable[tarfile.TarInfo]) -> dict[str, str]:
+    return {posixpath.normpath(member.name.replace("\\", "/")): member.linkname for member in members if member.issym()}
+
+
 @contextmanager
-def _open_archive(archive_path: Path, fmt: str) -> Generator[Any, None, None]:
-    """Open an archive file and yield the archive object."""
+def _open_archive(archive_path: Path, fmt: str) -> Generator[tuple[Any, Callable[[], int]], None, None]:
+    """Open an archive file and yield the archive object with a function returning the compressed bytes read so far."""
     if fmt == "zip":
         with zipfile.ZipFile(archive_path) as zf:
-            yield zf
+            yield zf, lambda: 0
     elif fmt == "7z":
-        with py7zr.SevenZipFile(archive_path, mode="r") as sz:
-            yield sz
+        # py7zr pulls in several compression backends, only import it for .7z archives
+        import py7zr
+
+        try:
+            with py7zr.SevenZipFile(archive_path, mode="r") as sz:
+                yield sz, lambda: 0
+        except py7zr.exceptions.UnsupportedCompressionMethodError as exc:
+            raise UserNotificationException(f"Cannot extract '{archive_path.name}': {exc}. Install 7-Zip (7zz or 7z on PATH) and Poks will use it instead.") from exc
     else:
-        tar_mode = cast(Literal["r:gz", "r:xz", "r:bz2"], f"r:{fmt.split(':')[1]}")
-        with tarfile.open(archive_path, tar_mode) as tf:
-            yield tf
+        compression = fmt.split(":")[1]
+        command = _find_decompressor(compression)
+        # Tar archives are read in a single sequential pass over the compressed data; the
+        # position in the compressed file, shared with an external decompressor, tracks progress.
+        # Only decompressor output is streamed, the stdlib codecs keep the archive seekable.
+        with archive_path.open("rb") as fh:
+            if command:
+                with _external_decompress(command, fh, archive_path.name) as stream, tarfile.open(fileobj=stream, mode="r|") as tf:
+                    yield tf, fh.tell
+            elif compression in ("zst", "lz4"):
+                with _decompressing_reader(fh, compression, archive_path.name) as stream, tarfile.open(fileobj=stream, mode="r|") as tf:
+                    yield tf, fh.tell
+            else:
+                tar_mode = cast(Literal["r:gz", "r:xz", "r:bz2"], f"r:{compression}")
+                with tarfile.open(fileobj=fh, mode=tar_mode) as tf:
+                    yield tf, fh.tell
 
 
-def _extract_all(
-    archive: Any,
-    fmt: str,
-    dest_dir: Path,
-    progress_callback: ProgressCallback | None = None,
-    app_name: str = "",
-) -> None:
-    """Extract all contents of an archive into dest_dir after validating paths."""
+def _decompressing_reader(fh: IO[bytes], compression: str, archive_name: str) -> IO[bytes]:
+    """Wrap *fh* in a streaming zstd or lz4 decoder."""
+    if compression == "zst":
+        import zstandard
+
+        # Archives written by pzstd or zstd -T consist of several frames
+        return cast(IO[bytes], zstandard.ZstdDecompressor().stream_reader(fh, read_across_frames=True))
+    try:
+        import lz4.frame
+    except ImportError:
+        raise UserNotificationException(f"Cannot extract '{archive_name}': install the 'lz4' command line tool or Python package.") from None
+    return cast(IO[bytes], lz4.frame.open(fh, mode="rb"))
+
+
+@functools.cache
+def _find_decompressor(compression: str) -> list[str] | None:
+    """Return the first available command from ``DECOMPRESSORS`` for *compression*, if any."""
+    for command in DECOMPRESSORS.get(compression, []):
+        executable = shutil.which(command[0])
+        if executable:
+            return [executable, *command[1:]]
+    return None
+
+
+@contextmanager
+def _external_decompress(command: list[str], src: IO[bytes], archive_name: str) -> Generator[IO[bytes], None, None]:
+    """Run *command* on the compressed file *src* and yield its decompressed stdout."""
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(command, stdin=src, stdout=subprocess.PIPE, stderr=stderr)  # noqa: S603
+        stdout = cast(IO[bytes], proc.stdout)
+        try:
+            yield stdout
+            # tarfile stops at the end-of-archive marker; drain the padding so the process can exit
+            while stdout.read(1024 * 1024):
+                pass
+        except (tarfile.ReadError, EOFError) as exc:
+            # A truncated stream means the decompressor closed its output, so it is exiting
+            stdout.close()
+            if proc.wait() == 0:
+                raise
+            raise _decompress_error(command, archive_name, stderr) from exc
+        except BaseException:
+            proc.kill()
+            stdout.close()
+            proc.wait()
+            raise
+        stdout.close()
+        if proc.wait() != 0:
+            raise _decompress_error(command, archive_name, stderr)
+
+
+def _decompress_error(command: list[str], archive_name: str, stderr: IO[bytes]) -> ValueError:
+    stderr.seek(0)
+    message = stderr.read().decode(errors="replace").strip()
+    return ValueError(f"{Path(command[0]).name} failed to decompress {archive_name}: {message}")
+
+
+@functools.cache
+def _find_7zip() -> list[str] | None:
+    """Return the command of a native 7-Zip binary, if one is installed; py7zr is used otherwise."""
+    for name in ("7zz", "7z", "7za"):
+        executable = shutil.which(name)
+        if executable:
+            return [executable]
+    program_files = os.environ.get("ProgramFiles")
+    if program_files and (Path(program_files) / "7-Zip" / "7z.exe").is_file():
+        return [str(Path(program_files) / "7-Zip" / "7z.exe")]
+    return None
+
+
+def _run_7zip(command: list[str], archive_path: Path, on_percent: Callable[[int], None] | None = None) -> str:
+    """Run 7-Zip and return its output; with *on_percent*, its ``-bsp1`` progress is forwarded while it runs."""
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)  # noqa: S603
+        stdout = cast(io.BufferedReader, proc.stdout)
+        output = bytearray()
+        while chunk := stdout.read1(64 * 1024):
+            if on_percent and (percents := _PERCENT.findall(bytes(output[-8:]) + chunk)):
+                on_percent(int(percents[-1]))
+            output += chunk
+        stdout.close()
+        if proc.wait() != 0:
+            stderr.seek(0)
+            message = (stderr.read() or output).decode(errors="replace").strip()
+            raise UserNotificationException(f"Cannot extract '{archive_path.name}' with {Path(command[0]).name}: {message}")
+    return output.decode(errors="replace")
+
+
+def _list_7z(seven_zip: list[str], archive_path: Path) -> tuple[list[str], int, list[str]]:
+    """
+    List a .7z archive with the technical listing (``l -slt -ba``) of 7-Zip.
+
+    Returns the entry paths, the total uncompressed size and the paths of the symlink entries.
+    """
+    output = _run_7zip([*seven_zip, "l", "-slt", "-ba", "-sccUTF-8", str(archive_path)], archive_path)
+    names = []
+    symlinks = []
+    total_size = 0
+    for block in output.replace("\r\n", "\n").split("\n\n"):
+        fields = dict(line.split(" = ", 1) for line in block.splitlines() if " = " in line)
+        # Skip the archive's own properties block, which older 7-Zip versions print despite -ba
+        if "Path" in fields and "Physical Size" not in fields:
+            names.append(fields["Path"])
+            total_size += int(fields.get("Size") or 0)
+            if _7Z_SYMLINK_ATTRIBUTES.search(fields.get("Attributes", "")):
+                symlinks.append(fields["Path"])
+    return names, total_size, symlinks
+
+
+class _Progress:
+    """Report extraction progress in bytes, coalescing updates to at most one callback per *interval* seconds."""
+
+    def __init__(self, callback: ProgressCallback | None, app_name: str, total: int, interval: float) -> None:
+        self.callback = callback
+        self.app_name = app_name
+        self.total = total
+        self.interval = interval
+        #: Archive members extracted so far
+        self.files = 0
+        self._last_report = time.monotonic()
+
+    def update(self, done: int) -> None:
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.callback(self.app_name, done, self.total)
+
+    def finish(self) -> None:
+        if self.callback:
+            self.callback(self.app_name, self.total, self.total)
+
+
+def _extract_all(archive: Any, fmt: str, dest_dir: Path, consumed: Callable[[], int], progress: _Progress) -> None:
+    """
+    Extract all contents of an archive into dest_dir after validating paths.
+
+    Progress is reported in uncompressed bytes for zip and 7z, and in compressed bytes
+    read for the streamed tar formats, whose uncompressed size is unknown up front.
+    """
     if fmt == "zip":
         members = archive.infolist()
-        _validate_entry_paths(archive.namelist(), dest_dir)
-        total = len(members)
-        for idx, member in enumerate(members, 1):
+        _validate_entry_paths(archive.namelist())
+        progress.total = sum(member.file_size for member in members)
+        done = 0
+        for member in members:
             archive.extract(member, dest_dir)
-            if progress_callback:
-                progress_callback(app_name, idx, total)
+            done += member.file_size
+            progress.files += 1
+            progress.update(done)
     elif fmt == "7z":
         names = archive.getnames()
-        _validate_entry_paths(names, dest_dir)
-        archive.extractall(path=dest_dir)  # noqa: S202
-        if progress_callback:
-            progress_callback(app_name, len(names), len(names))
+        _validate_entry_paths(names)
+        progress.total = archive.archiveinfo().uncompressed
+        archive.extractall(path=dest_dir, callback=_py7zr_callback(progress))  # noqa: S202
+        progress.files = len(names)
     else:
-        members = archive.getmembers()
-        total = len(members)
-        if hasattr(tarfile, "data_filter"):
-            for idx, member in enumerate(members, 1):
-                archive.extract(member, dest_dir, filter="data")
-                if progress_callback:
-                    progress_callback(app_name, idx, total)
-        else:
-            _validate_entry_paths([m.name for m in members], dest_dir)
-            for idx, member in enumerate(members, 1):
-                archive.extract(member, dest_dir)
-                if progress_callback:
-                    progress_callback(app_name, idx, total)
+        symlinks: dict[str, str] = {}
+        for member in archive:
+            if not hasattr(tarfile, "data_filter"):
+                symlinks.update(_tar_symlinks([member]))
+                _validate_entry_paths([member.name, member.linkname] if member.islnk() else [member.name], symlinks)
+            try:
+                if hasattr(tarfile, "data_filter"):
+                    archive.extract(member, dest_dir, filter="data")
+                else:
+                    archive.extract(member, dest_dir)
+            except tarfile.StreamError:
+                # A link that cannot be created (no symlink privilege on Windows) is replaced by a
+                # copy of its target, which tarfile reads again from the archive: not possible in a stream
+                if not (member.issym() or member.islnk()):
+                    raise
+                _copy_link_target(member, dest_dir)
+            progress.files += 1
+            progress.update(consumed())
+    progress.finish()
+
+
+def _copy_link_target(member: tarfile.TarInfo, dest_dir: Path) -> None:
+    """Create the link *member* as a copy of its already extracted target."""
+    target = member.linkname if member.islnk() else posixpath.join(posixpath.dirname(member.name), member.linkname)
+    source = (dest_dir / target).resolve()
+    if not source.is_relative_to(dest_dir.resolve()):
+        return
+    destination = dest_dir / member.name
+    if source.is_dir():
+        shutil.copytree(source, destination, symlinks=True, dirs_exist_ok=True)
+    elif source.is_file():
+        shutil.copy2(source, destination)
+    # Like tarfile, links to members that are not in the archive are skipped
+
+
+def _py7zr_callback(progress: _Progress) -> Any:
+    from py7zr.callbacks import ExtractCallback
+
+    class _Callback(ExtractCallback):
+        def __init__(self) -> None:
+            self.done = 0
+
+        def report_update(self, decompressed_bytes: str) -> None:
+            self.done += int(decompressed_bytes)
+            progress.update(self.done)
+
+        def report_start_preparation(self) -> None:
+            pass
+
+        def report_start(self, processing_file_path: str, processing_bytes: str) -> None:
+            pass
+
+        def report_end(self, processing_file_path: str, wrote_bytes: str) -> None:
+            pass
+
+        def report_warning(self, message: str) -> None:
+            pass
+
+        def report_postprocess(self) -> None:
+            pass
+
+    return _Callback()
 
 
 def _rename_with_retry(src: Path, dst: Path, retries: int = 5, delay_seconds: float = 1.0) -> None:
@@ -143,18 +422,22 @@ def _relocate_extract_dir(dest_dir: Path, extract_dir: str) -> None:
 
 def _decompress_zstd(data: bytes) -> bytes:
     """Decompress zstandard-compressed bytes."""
+    import zstandard
+
     dctx = zstandard.ZstdDecompressor()
     return dctx.decompress(data, max_output_size=256 * 1024 * 1024)
 
 
-def _extract_tar_from_bytes(data: bytes, dest_dir: Path) -> None:
-    """Extract a tar archive from raw bytes into dest_dir with path validation."""
+def _extract_tar_from_bytes(data: bytes, dest_dir: Path) -> int:
+    """Extract a tar archive from raw bytes into dest_dir with path validation and return the number of members."""
     with tarfile.open(fileobj=io.BytesIO(data), mode="r:") as tf:
+        members = tf.getmembers()
         if hasattr(tarfile, "data_filter"):
-            tf.extractall(dest_dir, filter="data")
+            tf.extractall(dest_dir, members=members, filter="data")
         else:
-            _validate_entry_paths([member.name for member in tf.getmembers()], dest_dir)
-            tf.extractall(dest_dir)  # noqa: S202
+            _validate_entry_paths([m.name for m in members] + [m.linkname for m in members if m.islnk()], _tar_symlinks(members))
+            tf.extractall(dest_dir, members=members)  # noqa: S202
+    return len(members)
 
 
 def _parse_conda_patches(info_tar_zst_bytes: bytes) -> list[PatchEntry]:
@@ -179,25 +462,54 @@ def _parse_conda_patches(info_tar_zst_bytes: bytes) -> list[PatchEntry]:
     return []
 
 
-def _extract_conda(archive_path: Path, dest_dir: Path) -> None:
-    """Extract a .conda archive: unzip outer, extract inner tar.zst, apply poking."""
-    patches: list[PatchEntry] = []
+def _read_conda_members(archive_path: Path) -> tuple[bytes | None, bytes]:
+    """Return the raw ``(info, pkg)`` tar.zst members of a .conda archive."""
     with zipfile.ZipFile(archive_path) as zf:
         names = zf.namelist()
         info_members = [name for name in names if name.startswith("info-") and name.endswith(".tar.zst")]
         pkg_members = [name for name in names if name.startswith("pkg-") and name.endswith(".tar.zst")]
         if not pkg_members:
             raise ValueError(f"Invalid .conda archive: no pkg-*.tar.zst found in {archive_path.name}")
-        if info_members:
-            info_data = zf.read(info_members[0])
-            patches = _parse_conda_patches(info_data)
-        pkg_data = zf.read(pkg_members[0])
+        info_data = zf.read(info_members[0]) if info_members else None
+        return info_data, zf.read(pkg_members[0])
+
+
+def read_conda_patches(archive_path: Path) -> list[PatchEntry]:
+    """Return the prefix patch entries declared by a .conda archive (empty for other formats)."""
+    if _detect_format(archive_path) != "conda":
+        return []
+    with zipfile.ZipFile(archive_path) as zf:
+        info_members = [name for name in zf.namelist() if name.startswith("info-") and name.endswith(".tar.zst")]
+        return _parse_conda_patches(zf.read(info_members[0])) if info_members else []
+
+
+def _extract_conda(archive_path: Path, dest_dir: Path, apply_patches: bool = True, poke_workers: int = POKE_WORKERS) -> tuple[int, PokeReport]:
+    """
+    Extract a .conda archive: unzip outer, extract inner tar.zst and apply poking.
+
+    Returns the number of extracted members and the patch sites, to be recorded for relocation.
+    """
+    info_data, pkg_data = _read_conda_members(archive_path)
+    patches = _parse_conda_patches(info_data) if info_data and apply_patches else []
 
     pkg_tar_bytes = _decompress_zstd(pkg_data)
-    _extract_tar_from_bytes(pkg_tar_bytes, dest_dir)
+    files = _extract_tar_from_bytes(pkg_tar_bytes, dest_dir)
 
+    report = PokeReport()
     if patches:
-        poke(dest_dir, patches)
+        with span("poke") as timing:
+            report = poke(dest_dir, patches, workers=poke_workers)
+            timing.files = len({p.path for p in patches})
+    return files, report
+
+
+def _strip_extract_dir(report: PokeReport, extract_dir: str) -> PokeReport:
+    """Make the patched paths of *report* relative to *extract_dir*, as ``_relocate_extract_dir`` moved the files."""
+    prefix = posixpath.normpath(extract_dir.replace("\\", "/")) + "/"
+    top_dir = prefix.split("/", 1)[0] + "/"
+    # Files of the top directory outside extract_dir were deleted with it, the others did not move
+    report.patched = [replace(f, path=f.path.removeprefix(prefix)) for f in report.patched if f.path.startswith(prefix) or not f.path.startswith(top_dir)]
+    return report
 
 
 def extract_archive(
@@ -206,20 +518,50 @@ def extract_archive(
     extract_dir: str | None = None,
     progress_callback: ProgressCallback | None = None,
     app_name: str = "",
+    apply_patches: bool = True,
+    progress_interval: float = PROGRESS_INTERVAL,
+    poke_workers: int = POKE_WORKERS,
 ) -> Path:
-    """Extract an archive into *dest_dir* and return *dest_dir*."""
+    """
+    Extract an archive into *dest_dir* and return *dest_dir*.
+
+    For .conda archives the build prefix is patched to *dest_dir* unless
+    *apply_patches* is False (see ``read_conda_patches`` to apply them later),
+    on at most *poke_workers* threads.
+    *progress_callback* receives bytes (see ``_extract_all``), at most once per
+    *progress_interval* seconds plus a final call when extraction is complete.
+    """
     fmt = _detect_format(archive_path)
     dest_dir.mkdir(parents=True, exist_ok=True)
-    try:
+    seven_zip = _find_7zip() if fmt == "7z" else None
+    archive_size = archive_path.stat().st_size
+    progress = _Progress(progress_callback, app_name, archive_size, progress_interval)
+    relocation = PokeReport()
+    with span("extract") as timing, trace("extract_archive", {"poks.app": app_name, "poks.format": fmt, "poks.bytes": archive_size}) as trace_span:
+        listing = _list_7z(seven_zip, archive_path) if seven_zip else None
+        if listing and listing[2]:
+            # The listing has no link targets, so a link could lead 7-Zip outside dest_dir;
+            # py7zr resolves the targets and refuses links pointing out of it
+            listing = None
         if fmt == "conda":
-            _extract_conda(archive_path, dest_dir)
-            if progress_callback:
-                progress_callback(app_name, 1, 1)
+            progress.files, relocation = _extract_conda(archive_path, dest_dir, apply_patches=apply_patches, poke_workers=poke_workers)
+            progress.finish()
+        elif listing and seven_zip:
+            names, progress.total, _ = listing
+            _validate_entry_paths(names)
+            command = [*seven_zip, "x", "-y", "-bsp1", f"-o{dest_dir}", str(archive_path)]
+            _run_7zip(command, archive_path, on_percent=lambda percent: progress.update(progress.total * percent // 100))
+            progress.files = len(names)
+            progress.finish()
         else:
-            with _open_archive(archive_path, fmt) as archive:
-                _extract_all(archive, fmt, dest_dir, progress_callback, app_name)
-    except py7zr.exceptions.UnsupportedCompressionMethodError as exc:
-        raise UserNotificationException(f"Cannot extract '{archive_path.name}': {exc}. Try installing 7-Zip and extracting manually.") from exc
+            with _open_archive(archive_path, fmt) as (archive, consumed):
+                _extract_all(archive, fmt, dest_dir, consumed, progress)
+        # Throughput is measured against the archive size, the uncompressed size is not known for every format
+        timing.bytes, timing.files = archive_size, progress.files
+        trace_span.set_attribute("poks.files", progress.files)
     if extract_dir:
         _relocate_extract_dir(dest_dir, extract_dir)
+    # Recorded once the files are where they stay, relative to dest_dir
+    if relocation.patched:
+        save_relocation_index(dest_dir, _strip_extract_dir(relocation, extract_dir) if extract_dir else relocation)
     return dest_dir
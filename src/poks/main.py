@@ -1,6 +1,7 @@
 """CLI entry point for Poks package manager."""
 
 import sys
+from enum import Enum
 from pathlib import Path
 from typing import Annotated
 
@@ -9,9 +10,10 @@ from py_app_dev.core.exceptions import UserNotificationException
 from py_app_dev.core.logging import logger, setup_logger, time_it
 
 from poks import __version__
-from poks.extractor import extract_archive
-from poks.poks import Poks
-from poks.scoop import convert_scoop_manifest
+from poks.activation import Shell, get_activation, render_activation
+
+# Commands import their backends (GitPython, requests, py7zr, rich, ...) lazily
+# so that quick invocations such as ``poks --version`` or ``poks list`` start fast.
 
 package_name = "poks"
 DEFAULT_ROOT_DIR = Path.home() / ".poks"
@@ -41,6 +43,8 @@ def search(
     update: Annotated[bool, typer.Option("--update/--no-update", help="Update buckets before searching.")] = True,
     root_dir: Annotated[Path, typer.Option("--root", help="Root directory for Poks.")] = DEFAULT_ROOT_DIR,
 ) -> None:
+    from poks.poks import Poks
+
     poks = Poks(root_dir=root_dir)
     results = poks.search(query, update=update)
 
@@ -59,14 +63,18 @@ def _validate_install_args(
     version: str | None,
     manifest: Path | None,
     bucket: str | None,
+    from_bundle: Path | None = None,
 ) -> bool:
     """Validate install command arguments. Returns True if valid, logs error and returns False otherwise."""
-    modes = sum(bool(x) for x in (config_file, app_name, manifest))
+    modes = sum(bool(x) for x in (config_file, app_name, manifest, from_bundle))
     if modes == 0:
-        logger.error("Specify one of: --config, --app, or --manifest")
+        logger.error("Specify one of: --config, --app, --manifest, or --from-bundle")
         return False
     if modes > 1:
-        logger.error("Options --config, --app, and --manifest are mutually exclusive.")
+        logger.error("Options --config, --app, --manifest, and --from-bundle are mutually exclusive.")
+        return False
+    if from_bundle and (version or bucket):
+        logger.error("--version and --bucket cannot be used with --from-bundle.")
         return False
     if (app_name or manifest) and not version:
         logger.error("--version is required with --app or --manifest.")
@@ -80,6 +88,24 @@ def _validate_install_args(
     return True
 
 
+def _parse_bandwidth(value: str | None) -> int | None:
+    if value is None:
+        return None
+    from poks.bandwidth import parse_rate
+
+    try:
+        return parse_rate(value)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--max-bandwidth") from e
+
+
+class TimingsFormat(str, Enum):
+    """Output formats supported by ``poks install --timings``."""
+
+    TABLE = "table"
+    JSONL = "jsonl"
+
+
 @app.command(help="Install apps from a config file, a bucket, or a manifest file.")
 @time_it("install")
 def install(
@@ -88,29 +114,47 @@ def install(
     manifest: Annotated[Path | None, typer.Option("--manifest", "-m", help="Path to an app manifest file.")] = None,
     config_file: Annotated[Path | None, typer.Option("-c", "--config", help="Path to poks.json configuration file.")] = None,
     bucket: Annotated[str | None, typer.Option("--bucket", help="Bucket name or URL.")] = None,
+    from_bundle: Annotated[Path | None, typer.Option("--from-bundle", help="Install offline from a bundle created with 'poks bundle create'.")] = None,
     cache: Annotated[bool, typer.Option("--cache/--no-cache", help="Use download cache.")] = True,
+    store: Annotated[bool, typer.Option("--store/--no-store", help="Link installs from the unpacked store instead of extracting each time.")] = False,
     root_dir: Annotated[Path, typer.Option("--root", help="Root directory for Poks.")] = DEFAULT_ROOT_DIR,
+    timings: Annotated[TimingsFormat | None, typer.Option("--timings", help="Print the time spent in each install phase.")] = None,
+    trace_file: Annotated[Path | None, typer.Option("--trace-file", help="Append OpenTelemetry spans of the install to this file (OTLP/JSON lines).")] = None,
+    mirror: Annotated[str | None, typer.Option("--mirror", envvar="POKS_MIRROR", help="Download archives through this 'poks serve' mirror URL.")] = None,
+    max_bandwidth: Annotated[str | None, typer.Option("--max-bandwidth", envvar="POKS_MAX_BANDWIDTH", help="Limit all downloads together, e.g. 500K or 10M (per second).")] = None,
 ) -> None:
-    if not _validate_install_args(config_file, app_name, version, manifest, bucket):
+    if not _validate_install_args(config_file, app_name, version, manifest, bucket, from_bundle):
         raise typer.Exit(1)
 
-    poks = Poks(root_dir=root_dir, use_cache=cache)
+    from poks.domain import InstallResult
+    from poks.poks import Poks
+    from poks.tracing import OtlpJsonFileExporter, Tracer
+
+    tracer = Tracer(OtlpJsonFileExporter(trace_file)) if trace_file else None
+    poks = Poks(root_dir=root_dir, use_cache=cache, use_store=store, tracer=tracer, mirror=mirror, max_bandwidth=_parse_bandwidth(max_bandwidth))
 
     try:
-        if config_file:
-            result = poks.install(config_file)
+        if config_file or from_bundle:
+            result = poks.install(config_file) if config_file else poks.install_from_bundle(from_bundle)  # type: ignore[arg-type]
             for app in result.apps:
                 logger.info(app.format_status())
         elif manifest:
             app = poks.install_from_manifest(manifest, version)  # type: ignore[arg-type]
             logger.info(app.format_status())
+            result = InstallResult(apps=[app])
         elif app_name:
             app = poks.install_app(app_name, version, bucket)  # type: ignore[arg-type]
             logger.info(app.format_status())
+            result = InstallResult(apps=[app])
     except (ValueError, FileNotFoundError) as e:
         logger.error(str(e))
         raise typer.Exit(1) from e
 
+    if timings:
+        from poks.timings import format_timings_table, timings_to_jsonl
+
+        typer.echo(format_timings_table(result) if timings == TimingsFormat.TABLE else timings_to_jsonl(result))
+
 
 @app.command(help="Uninstall apps.")
 @time_it("uninstall")
@@ -120,6 +164,8 @@ def uninstall(
     wipe: Annotated[bool, typer.Option("--wipe", help="Also remove the download cache.")] = False,
     root_dir: Annotated[Path, typer.Option("--root", help="Root directory for Poks.")] = DEFAULT_ROOT_DIR,
 ) -> None:
+    from poks.poks import Poks
+
     poks = Poks(root_dir=root_dir)
 
     if all_apps:
@@ -140,6 +186,8 @@ def uninstall(
 def list_apps(
     root_dir: Annotated[Path, typer.Option("--root", help="Root directory for Poks.")] = DEFAULT_ROOT_DIR,
 ) -> None:
+    from poks.poks import Poks
+
     poks = Poks(root_dir=root_dir)
     result = poks.list_installed()
 
@@ -154,6 +202,105 @@ def list_apps(
         typer.echo(f"{installed_app.name:<20} {installed_app.version:<15} {installed_app.install_dir}")
 
 
+@app.command(help="Replace identical files across installed app versions with links to a single copy.")
+@time_it("dedupe")
+def dedupe(
+    root_dir: Annotated[Path, typer.Option("--root", help="Root directory for Poks.")] = DEFAULT_ROOT_DIR,
+) -> None:
+    from poks.poks import Poks
+
+    result = Poks(root_dir=root_dir).dedupe()
+    typer.echo(f"Linked {result.files_linked} duplicate files, saved {result.bytes_saved / (1024 * 1024):.1f} MiB.")
+
+
+@app.command(help="Re-point installed apps after the Poks root directory was moved.")
+@time_it("relocate")
+def relocate(
+    new_root: Annotated[Path, typer.Argument(help="The new location of the Poks root directory.")],
+) -> None:
+    from poks.poks import Poks
+
+    relocated = Poks(root_dir=new_root).relocate()
+    typer.echo(f"Rewrote {relocated} patch sites.")
+
+
+bundle_app = typer.Typer(help="Offline bundles of archives and manifests for air-gapped installs.", no_args_is_help=True)
+app.add_typer(bundle_app, name="bundle")
+
+
+def _parse_platform(value: str) -> tuple[str, str]:
+    os_name, sep, arch = value.partition("/")
+    if not sep or not os_name or not arch:
+        raise typer.BadParameter(f"Expected <os>/<arch>, e.g. linux/x86_64, got '{value}'")
+    return os_name, arch
+
+
+@bundle_app.command(name="create", help="Bundle the apps of a config file with their archives for the given platforms.")
+@time_it("bundle create")
+def bundle_create(
+    config_file: Annotated[Path, typer.Option("-c", "--config", help="Path to poks.json configuration file.")],
+    output: Annotated[Path, typer.Option("--output", "-o", help="Bundle file to write.")],
+    platforms: Annotated[list[str] | None, typer.Option("--platform", help="<os>/<arch> to bundle archives for, repeatable. Defaults to the current platform.")] = None,
+    root_dir: Annotated[Path, typer.Option("--root", help="Root directory for Poks.")] = DEFAULT_ROOT_DIR,
+    mirror: Annotated[str | None, typer.Option("--mirror", envvar="POKS_MIRROR", help="Download archives through this 'poks serve' mirror URL.")] = None,
+) -> None:
+    from poks.platform import get_current_platform
+    from poks.poks import Poks
+
+    targets = [_parse_platform(value) for value in platforms] if platforms else [get_current_platform()]
+    try:
+        index = Poks(root_dir=root_dir, mirror=mirror).create_bundle(config_file, targets, output)
+    except (ValueError, FileNotFoundError) as e:
+        logger.error(str(e))
+        raise typer.Exit(1) from e
+    typer.echo(f"Bundle written to: {output} ({len(index.archives)} archives for {', '.join(index.platforms)})")
+
+
+@app.command(help="Download and verify the archives of a config for several platforms, without installing them.")
+@time_it("fetch")
+def fetch(
+    config_file: Annotated[Path, typer.Option("-c", "--config", help="Path to poks.json configuration file.")],
+    platforms: Annotated[list[str] | None, typer.Option("--platform", help="<os>/<arch> to fetch archives for, repeatable. Defaults to every platform of each app.")] = None,
+    root_dir: Annotated[Path, typer.Option("--root", help="Root directory for Poks.")] = DEFAULT_ROOT_DIR,
+    mirror: Annotated[str | None, typer.Option("--mirror", envvar="POKS_MIRROR", help="Download archives through this 'poks serve' mirror URL.")] = None,
+    max_bandwidth: Annotated[str | None, typer.Option("--max-bandwidth", envvar="POKS_MAX_BANDWIDTH", help="Limit all downloads together, e.g. 500K or 10M (per second).")] = None,
+) -> None:
+    from poks.poks import Poks
+
+    targets = [_parse_platform(value) for value in platforms] if platforms else None
+    try:
+        results = Poks(root_dir=root_dir, mirror=mirror, max_bandwidth=_parse_bandwidth(max_bandwidth)).prefetch(config_file, targets)
+    except (ValueError, FileNotFoundError) as e:
+        logger.error(str(e))
+        raise typer.Exit(1) from e
+    downloaded = sum(result.downloaded for result in results.values())
+    typer.echo(f"Fetched {len(results)} archives ({downloaded} downloaded, {len(results) - downloaded} already cached).")
+
+
+@app.command(help="Serve the download cache as a mirror for other Poks clients (see install --mirror).")
+def serve(
+    host: Annotated[str, typer.Option("--host", help="Interface to listen on.")] = "127.0.0.1",
+    port: Annotated[int, typer.Option("--port", help="Port to listen on.")] = 8080,
+    root_dir: Annotated[Path, typer.Option("--root", help="Root directory for Poks.")] = DEFAULT_ROOT_DIR,
+    allowed_upstreams: Annotated[
+        list[str] | None, typer.Option("--allow-upstream", help="URL prefix the mirror may fetch misses from, e.g. https://github.com/, repeatable.")
+    ] = None,
+) -> None:
+    from poks.mirror import serve as serve_mirror
+
+    serve_mirror(root_dir, host, port, allowed_upstreams or [])
+
+
+@app.command(name="env", help="Print shell commands that activate the apps of a config file (PATH and env vars).")
+def env(
+    config_file: Annotated[Path, typer.Option("-c", "--config", help="Path to poks.json configuration file.")],
+    shell: Annotated[Shell, typer.Option("--shell", help="Output format.")] = Shell.BASH,
+    root_dir: Annotated[Path, typer.Option("--root", help="Root directory for Poks.")] = DEFAULT_ROOT_DIR,
+) -> None:
+    activation = get_activation(config_file, root_dir)
+    typer.echo(render_activation(activation, shell))
+
+
 @app.command(name="convert-scoop", help="Convert a Scoop manifest to a Poks manifest.")
 def convert_scoop(
     scoop_manifest: Annotated[Path, typer.Argument(help="Path to a Scoop manifest.json file.")],
@@ -163,6 +310,8 @@ def convert_scoop(
         logger.error(f"File not found: {scoop_manifest}")
         raise typer.Exit(1)
 
+    from poks.scoop import convert_scoop_manifest
+
     manifest = convert_scoop_manifest(scoop_manifest)
 
     if output is None:
@@ -187,6 +336,9 @@ def unpack(
     if not archive.exists():
         logger.error(f"File not found: {archive}")
         raise typer.Exit(1)
+
+    from poks.extractor import extract_archive
+
     try:
         extract_archive(archive, output, extract_dir=extract_dir)
         logger.info(f"Extracted '{archive.name}' to '{output}'.")
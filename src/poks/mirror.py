@@ -0,0 +1,330 @@
+"""
+Download mirror: serve archives by SHA256 over HTTP and fetch missing ones from upstream once.
+
+Clients request ``GET /<sha256>/<file name>?url=<upstream url>`` (see ``poks.downloader.mirror_url``).
+Archives that are already mirrored are served with ``Range`` support. On a miss the
+server downloads the upstream URL in a background thread, verifying the SHA256 on the
+fly, while every client asking for the same archive streams it from the partial file.
+
+Only upstream URLs below one of the ``allowed_upstreams`` prefixes are fetched, otherwise
+the server would be an open proxy to any host it can reach.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+from collections.abc import Sequence
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import IO
+from urllib.parse import parse_qs, urlsplit
+
+from py_app_dev.core.logging import logger
+
+from poks.downloader import DownloadError, cache_path_for, file_sha256, open_url
+
+MIRROR_DIR_NAME = "sha256"
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+_CHUNK_SIZE = 64 * 1024
+
+
+class _Fetch:
+    """An upstream download in progress, observed by the clients streaming it."""
+
+    def __init__(self, part_path: Path) -> None:
+        self.part_path = part_path
+        self.cond = threading.Condition()
+        #: Bytes written and flushed to the partial file
+        self.written = 0
+        #: Upstream size, once the response headers arrived (None if the upstream did not send one)
+        self.total: int | None = None
+        self.started = False
+        self.done = False
+        self.error: str | None = None
+
+    def update(self, **changes: object) -> None:
+        with self.cond:
+            for key, value in changes.items():
+                setattr(self, key, value)
+            self.cond.notify_all()
+
+    def wait_past(self, offset: int) -> tuple[int, bool, str | None]:
+        """Block until more than *offset* bytes were written or the fetch ended; return ``(written, done, error)``."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.written > offset or self.done or self.error is not None)
+            return self.written, self.done, self.error
+
+
+def upstream_allowed(url: str, allowed_upstreams: Sequence[str]) -> bool:
+    """
+    Check that *url* is an http(s) URL below one of the *allowed_upstreams* URL prefixes.
+
+    Scheme, host and port must match exactly and the path must start with the path of the
+    prefix, so ``https://github.com`` allows neither ``https://github.com.example.org/``
+    nor ``http://github.com/``.
+    """
+    try:
+        origin, path = _origin_and_path(url)
+        allowed = [_origin_and_path(prefix) for prefix in allowed_upstreams]
+    except ValueError:
+        return False
+    if origin[0] not in ("http", "https") or not origin[1]:
+        return False
+    return any(origin == allowed_origin and path.startswith(allowed_path.rstrip("/") + "/") for allowed_origin, allowed_path in allowed)
+
+
+def _origin_and_path(url: str) -> tuple[tuple[str, str | None, int | None], str]:
+    parts = urlsplit(url)
+    return (parts.scheme, parts.hostname, parts.port), parts.path
+
+
+class MirrorServer(ThreadingHTTPServer):
+    """
+    HTTP server exposing the archives of ``<root>/cache/sha256``, keyed by their SHA256.
+
+    Misses are fetched only from upstream URLs below one of the *allowed_upstreams*
+    prefixes (see ``upstream_allowed``). Without any, the server only serves the archives
+    it already holds.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, root_dir: Path, host: str = "127.0.0.1", port: int = 8080, allowed_upstreams: Sequence[str] = ()) -> None:
+        super().__init__((host, port), _MirrorHandler)
+        self.cache_dir = root_dir / "cache"
+        self.mirror_dir = self.cache_dir / MIRROR_DIR_NAME
+        self.mirror_dir.mkdir(parents=True, exist_ok=True)
+        self.allowed_upstreams = list(allowed_upstreams)
+        #: Digests of download cache entries as {path: (size, mtime, sha256)}
+        self._cache_digests: dict[Path, tuple[int, int, str]] = {}
+        self._fetches: dict[str, _Fetch] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def lookup(self, sha256: str, upstream: str | None) -> Path | _Fetch | None:
+        """
+        Return the mirrored archive, the fetch in progress for it, or None if it is unknown and cannot be fetched.
+
+        A fetch in progress is only returned to clients asking with an allowed upstream, so
+        nobody streams unverified bytes that were not requested from an allowed upstream.
+        """
+        path = self.mirror_dir / sha256
+        if path.is_file():
+            return path
+        if not upstream or not upstream_allowed(upstream, self.allowed_upstreams):
+            return None
+        # Hashing a cached archive can take a while, so it is done outside the lock
+        if sha256 not in self._fetches and self._adopt_cached(upstream, sha256, path):
+            return path
+        with self._lock:
+            if path.is_file():
+                return path
+            fetch = self._fetches.get(sha256)
+            if fetch:
+                return fetch
+            fetch = _Fetch(self.mirror_dir / f"{sha256}.part")
+            self._fetches[sha256] = fetch
+        threading.Thread(target=self._fetch, args=(sha256, upstream, fetch), name=f"poks-mirror-{sha256[:12]}", daemon=True).start()
+        return fetch
+
+    def _adopt_cached(self, upstream: str, sha256: str, path: Path) -> bool:
+        """
+        Link an archive that the Poks download cache of this root already holds.
+
+        Clients choose the SHA256, so a mismatch leaves the cache entry alone, and the digest
+        of an entry is remembered instead of hashing the file again on every request.
+        """
+        cached = cache_path_for(upstream, self.cache_dir)
+        try:
+            stat = cached.stat()
+        except FileNotFoundError:
+            return False
+        known = self._cache_digests.get(cached)
+        if known is None or known[:2] != (stat.st_size, stat.st_mtime_ns):
+            known = self._cache_digests[cached] = (stat.st_size, stat.st_mtime_ns, file_sha256(cached))
+        if known[2] != sha256:
+            return False
+        tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        try:
+            os.link(cached, tmp_path)
+        except OSError:
+            shutil.copyfile(cached, tmp_path)
+        os.replace(tmp_path, path)
+        return True
+
+    def _fetch(self, sha256: str, upstream: str, fetch: _Fetch) -> None:
+        logger.info(f"Mirror miss for {sha256}, fetching {upstream}")
+        digest = hashlib.sha256()
+        try:
+            with open_url(upstream) as (total, chunks), fetch.part_path.open("wb") as fh:
+                fetch.update(total=total, started=True)
+                for chunk in chunks:
+                    fh.write(chunk)
+                    fh.flush()
+                    digest.update(chunk)
+                    fetch.update(written=fetch.written + len(chunk))
+            if digest.hexdigest() != sha256:
+                raise DownloadError(f"SHA256 mismatch for {upstream}: expected {sha256}, got {digest.hexdigest()}")
+            self._publish(fetch.part_path, self.mirror_dir / sha256)
+        except Exception as e:
+            # Any failure must reach the waiting clients, or they would wait forever
+            logger.warning(f"Mirror fetch of {upstream} failed: {e}")
+            fetch.part_path.unlink(missing_ok=True)
+            fetch.update(error=str(e))
+        else:
+            fetch.update(done=True)
+        finally:
+            with self._lock:
+                del self._fetches[sha256]
+
+    @staticmethod
+    def _publish(part_path: Path, path: Path) -> None:
+        try:
+            os.replace(part_path, path)
+        except PermissionError:
+            # Windows refuses to rename a file that clients are still streaming
+            shutil.copyfile(part_path, path)
+            part_path.unlink(missing_ok=True)
+
+
+class _MirrorHandler(BaseHTTPRequestHandler):
+    server: MirrorServer
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self) -> None:
+        self._handle(send_body=False)
+
+    def do_GET(self) -> None:
+        self._handle(send_body=True)
+
+    def log_message(self, format: str, *args: object) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _handle(self, send_body: bool) -> None:
+        parts = urlsplit(self.path)
+        sha256 = parts.path.strip("/").split("/", 1)[0].lower()
+        if not _SHA256_RE.fullmatch(sha256):
+            self.send_error(HTTPStatus.NOT_FOUND, "Expected /<sha256>/<file name>")
+            return
+        upstream = parse_qs(parts.query).get("url", [None])[0]
+        found = self.server.lookup(sha256, upstream)
+        if found is None:
+            self.send_error(HTTPStatus.NOT_FOUND, f"{sha256} is not mirrored and no allowed upstream url was given")
+        elif isinstance(found, Path):
+            self._send_file(found, send_body)
+        elif self.headers.get("Range") or not send_body:
+            # Partial content of an archive that is still being fetched: wait for the complete file
+            with found.cond:
+                found.cond.wait_for(lambda: found.done or found.error is not None)
+            if found.error is not None:
+                self.send_error(HTTPStatus.BAD_GATEWAY, found.error)
+            else:
+                self._send_file(self.server.mirror_dir / sha256, send_body)
+        else:
+            self._stream_fetch(found, sha256)
+
+    def _send_file(self, path: Path, send_body: bool) -> None:
+        size = path.stat().st_size
+        start, end = 0, size - 1
+        status = HTTPStatus.OK
+        requested = self._parse_range(self.headers.get("Range"), size)
+        if requested is not None and requested[0] > requested[1]:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if requested is not None:
+            start, end = requested
+            status = HTTPStatus.PARTIAL_CONTENT
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if send_body:
+            with path.open("rb") as fh:
+                fh.seek(start)
+                self._copy(fh, end - start + 1)
+
+    @staticmethod
+    def _parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+        """Return the inclusive ``(start, end)`` of a single byte range (empty if unsatisfiable), or None to send the whole file."""
+        match = _RANGE_RE.fullmatch(header.strip()) if header else None
+        if match is None or match.groups() == ("", ""):
+            return None
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1
+        return start, end
+
+    def _copy(self, fh: IO[bytes], remaining: int) -> None:
+        while remaining > 0 and (chunk := fh.read(min(_CHUNK_SIZE, remaining))):
+            self.wfile.write(chunk)
+            remaining -= len(chunk)
+
+    def _stream_fetch(self, fetch: _Fetch, sha256: str) -> None:
+        """Stream an archive while it is being fetched, following the partial file as it grows."""
+        with fetch.cond:
+            fetch.cond.wait_for(lambda: fetch.started or fetch.error is not None)
+        # The partial file is renamed once complete and verified
+        fh = self._open_first(fetch.part_path, self.server.mirror_dir / sha256)
+        if fh is None or fetch.error is not None:
+            self.send_error(HTTPStatus.BAD_GATEWAY, fetch.error or "Upstream fetch failed")
+            return
+        total = fetch.total
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/octet-stream")
+        if total is None:
+            # Without a length the end of the body is the end of the connection
+            self.close_connection = True
+        else:
+            self.send_header("Content-Length", str(total))
+        self.end_headers()
+        sent = 0
+        with fh:
+            while True:
+                available, done, error = fetch.wait_past(sent)
+                if error is not None:
+                    # Headers are gone already, dropping the connection is the only way to signal the failure
+                    self.close_connection = True
+                    return
+                self._copy(fh, available - sent)
+                sent = available
+                if done:
+                    return
+
+    @staticmethod
+    def _open_first(*paths: Path) -> IO[bytes] | None:
+        for path in paths:
+            try:
+                return path.open("rb")
+            except FileNotFoundError:
+                continue
+        return None
+
+
+def serve(root_dir: Path, host: str = "127.0.0.1", port: int = 8080, allowed_upstreams: Sequence[str] = ()) -> None:
+    """Run a mirror server for *root_dir* until interrupted."""
+    with MirrorServer(root_dir, host, port, allowed_upstreams) as server:
+        if not allowed_upstreams:
+            logger.warning("No --allow-upstream given, only archives already in the mirror are served")
+        logger.info(f"Serving {server.mirror_dir} on {server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -3,11 +3,20 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
+import mmap
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from poks.tracing import trace
+
 logger = logging.getLogger(__name__)
 
+#: Default number of threads patching the files of one install. Installs of several apps
+#: already run in parallel, so each of them only gets a few.
+POKE_WORKERS = 4
+
 
 @dataclass
 class PatchEntry:
@@ -18,48 +27,166 @@ class PatchEntry:
     file_mode: str  # "text" or "binary"
 
 
-def poke(install_dir: Path, patches: list[PatchEntry]) -> None:
+@dataclass
+class PatchSite:
+    """A location in a patched file where the install prefix was written."""
+
+    offset: int
+    #: Bytes owned by the site: the placeholder length in binary mode, the written prefix length in text mode
+    length: int
+    #: Whether the forward-slash spelling of a Windows prefix was written
+    forward_slashes: bool = False
+
+
+@dataclass
+class PatchedFile:
+    """A file rewritten by ``poke`` and the sites that were patched in it."""
+
+    path: str
+    file_mode: str
+    sites: list[PatchSite]
+
+
+@dataclass
+class PokeReport:
+    """Outcome of patching an install directory."""
+
+    #: Files that contained a placeholder and were rewritten
+    patched: list[PatchedFile] = field(default_factory=list)
+    #: Files listed in the patches but not present in the install directory
+    missing: list[str] = field(default_factory=list)
+    #: Files that could not be patched, with the reason
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+class PokeError(ValueError):
+    """Raised by ``poke`` when at least one file could not be patched; lists every failure."""
+
+    def __init__(self, report: PokeReport) -> None:
+        self.report = report
+        details = "\n".join(f"  {path}: {error}" for path, error in report.errors.items())
+        super().__init__(f"Failed to patch {len(report.errors)} file(s):\n{details}")
+
+
+def poke(install_dir: Path, patches: list[PatchEntry], workers: int = POKE_WORKERS) -> PokeReport:
     """
     Replace conda build prefixes with the actual install directory.
 
-    Text-mode patches do a straightforward string replacement.
-    Binary-mode patches do a null-padded byte replacement preserving file size.
+    All placeholders of a file are found in a single regex pass over a memory map
+    of the file; files without any hit are never written. Text-mode patches do a
+    straightforward replacement. Binary-mode patches overwrite each hit in place
+    with the null-padded new prefix, preserving the file size.
     On Windows, backslash delimiters in the placeholder are matched in the replacement.
+
+    Files are independent of each other and patched on a thread pool of at most
+    *workers* threads (``1`` patches serially).
+
+    Returns:
+        Which files were patched, at which offsets, and which were missing.
+
+    Raises:
+        PokeError: If any file could not be patched, e.g. because the install path is longer
+            than a binary placeholder. All files are attempted before raising.
+
     """
     new_prefix = str(install_dir)
+    placeholders_by_file: dict[tuple[str, str], list[str]] = {}
     for entry in patches:
-        target = install_dir / entry.path
-        if not target.is_file():
-            logger.warning("Skipping patch for missing file: %s", entry.path)
+        if entry.file_mode not in ("text", "binary"):
+            logger.warning("Unknown file_mode %r for %s, skipping", entry.file_mode, entry.path)
             continue
+        placeholders_by_file.setdefault((entry.path, entry.file_mode), []).append(entry.prefix_placeholder)
+
+    def poke_file(item: tuple[tuple[str, str], list[str]]) -> list[PatchSite] | Exception | None:
+        (path, file_mode), placeholders = item
+        target = install_dir / path
+        if not target.is_file():
+            return None
+        replacements = _replacements(placeholders, new_prefix)
+        try:
+            poke_fn = _poke_binary if file_mode == "binary" else _poke_text
+            return poke_fn(target, replacements, new_prefix.encode("utf-8"))
+        except (OSError, ValueError) as e:
+            return e
 
-        if entry.file_mode == "text":
-            _poke_text(target, entry.prefix_placeholder, new_prefix)
-        elif entry.file_mode == "binary":
-            _poke_binary(target, entry.prefix_placeholder, new_prefix)
+    items = list(placeholders_by_file.items())
+    with trace("poke", {"poks.files": len(items)}) as trace_span:
+        workers = min(workers, len(items))
+        if workers < 2:
+            outcomes = [poke_file(item) for item in items]
         else:
-            logger.warning("Unknown file_mode %r for %s, skipping", entry.file_mode, entry.path)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                outcomes = list(executor.map(poke_file, items))
+        if trace_span.is_recording():
+            trace_span.set_attribute("poks.sites", sum(len(outcome) for outcome in outcomes if isinstance(outcome, list)))
+
+    report = PokeReport()
+    for ((path, file_mode), _), outcome in zip(items, outcomes, strict=True):
+        if outcome is None:
+            report.missing.append(path)
+        elif isinstance(outcome, Exception):
+            report.errors[path] = str(outcome)
+        elif outcome:
+            report.patched.append(PatchedFile(path=path, file_mode=file_mode, sites=outcome))
+    if report.missing:
+        logger.warning("Skipping patches for %d missing file(s): %s", len(report.missing), ", ".join(report.missing))
+    if report.errors:
+        raise PokeError(report)
+    return report
+
+
+def _replacements(placeholders: list[str], new_prefix: str) -> dict[bytes, bytes]:
+    """Map every placeholder spelling to its replacement, including the forward-slash variant of Windows paths."""
+    replacements = {}
+    for placeholder in placeholders:
+        replacements[placeholder.encode("utf-8")] = new_prefix.encode("utf-8")
+        if "\\" in placeholder:
+            replacements[placeholder.replace("\\", "/").encode("utf-8")] = new_prefix.replace("\\", "/").encode("utf-8")
+    return replacements
+
+
+def _pattern(replacements: dict[bytes, bytes]) -> re.Pattern[bytes]:
+    # Longest first, so a placeholder that prefixes another one never shadows it
+    return re.compile(b"|".join(re.escape(p) for p in sorted(replacements, key=len, reverse=True)))
+
+
+def _poke_text(target: Path, replacements: dict[bytes, bytes], native: bytes) -> list[PatchSite]:
+    if target.stat().st_size == 0:
+        return []
+    sites = []
+    with target.open("rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        chunks: list[bytes] = []
+        pos = out_pos = 0
+        for match in _pattern(replacements).finditer(mm):
+            replacement = replacements[match.group()]
+            chunks.append(mm[pos : match.start()])
+            out_pos += match.start() - pos
+            sites.append(PatchSite(offset=out_pos, length=len(replacement), forward_slashes=replacement != native))
+            chunks.append(replacement)
+            out_pos += len(replacement)
+            pos = match.end()
+        if not chunks:
+            return []
+        chunks.append(mm[pos:])
+    target.write_bytes(b"".join(chunks))
+    return sites
+
 
+def _poke_binary(target: Path, replacements: dict[bytes, bytes], native: bytes) -> list[PatchSite]:
+    if target.stat().st_size == 0:
+        return []
+    padded = {}
+    for placeholder, new_bytes in replacements.items():
+        if len(new_bytes) > len(placeholder):
+            raise ValueError(f"Cannot poke '{target.name}': install path ({len(new_bytes)} bytes) exceeds placeholder ({len(placeholder)} bytes)")
+        padded[placeholder] = new_bytes + b"\x00" * (len(placeholder) - len(new_bytes))
 
-def _poke_text(target: Path, placeholder: str, new_prefix: str) -> None:
-    content = target.read_text(encoding="utf-8", errors="surrogateescape")
-    updated = content.replace(placeholder, new_prefix)
-    if "\\" in placeholder:
-        updated = updated.replace(placeholder.replace("\\", "/"), new_prefix.replace("\\", "/"))
-    target.write_text(updated, encoding="utf-8", errors="surrogateescape")
-
-
-def _poke_binary(target: Path, placeholder: str, new_prefix: str) -> None:
-    placeholder_bytes = placeholder.encode("utf-8")
-    new_bytes = new_prefix.encode("utf-8")
-    if len(new_bytes) > len(placeholder_bytes):
-        raise ValueError(f"Cannot poke '{target.name}': install path ({len(new_bytes)} bytes) exceeds placeholder ({len(placeholder_bytes)} bytes)")
-    padded = new_bytes + b"\x00" * (len(placeholder_bytes) - len(new_bytes))
-    data = target.read_bytes()
-    updated = data.replace(placeholder_bytes, padded)
-    if "\\" in placeholder:
-        fwd_placeholder = placeholder.replace("\\", "/").encode("utf-8")
-        fwd_new = new_prefix.replace("\\", "/").encode("utf-8")
-        fwd_padded = fwd_new + b"\x00" * (len(fwd_placeholder) - len(fwd_new))
-        updated = updated.replace(fwd_placeholder, fwd_padded)
-    target.write_bytes(updated)
+    with target.open("rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        hits = [(match.start(), match.group()) for match in _pattern(padded).finditer(mm)]
+    if not hits:
+        return []
+    with target.open("r+b") as rw_fh, mmap.mmap(rw_fh.fileno(), 0) as mm:
+        for offset, placeholder in hits:
+            mm[offset : offset + len(placeholder)] = padded[placeholder]
+        mm.flush()
+    return [PatchSite(offset=offset, length=len(placeholder), forward_slashes=replacements[placeholder] != native) for offset, placeholder in hits]
@@ -1,13 +1,15 @@
-import json
+import contextvars
 import shutil
+import tempfile
+from collections.abc import Sequence
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
 from pathlib import Path
 
-from git import Repo
-from git.exc import InvalidGitRepositoryError, NoSuchPathError
 from py_app_dev.core.exceptions import UserNotificationException
 from py_app_dev.core.logging import logger
 
+from poks.bandwidth import BandwidthLimiter
 from poks.bucket import (
     find_manifest,
     get_bucket_id,
@@ -19,12 +21,39 @@ from poks.bucket import (
     sync_all_buckets,
     update_local_buckets,
 )
-from poks.domain import InstalledApp, InstallResult, PoksApp, PoksAppVersion, PoksBucket, PoksBucketRegistry, PoksConfig, PoksManifest
-from poks.downloader import get_cached_or_download
+from poks.bundle import open_bundle, platform_key, write_bundle
+from poks.dedupe import DedupeResult, dedupe
+from poks.domain import (
+    InstalledApp,
+    InstallResult,
+    PoksApp,
+    PoksAppVersion,
+    PoksArchive,
+    PoksBucket,
+    PoksBucketRegistry,
+    PoksBundleArchive,
+    PoksBundleIndex,
+    PoksConfig,
+    PoksInstalledEntry,
+    PoksInstalledState,
+    PoksManifest,
+    PoksMirror,
+    PoksReceipt,
+)
+from poks.downloader import DownloadResult, cache_path_for, get_cached_or_download
 from poks.extractor import extract_archive
 from poks.platform import get_current_platform
+from poks.poker import POKE_WORKERS, PokeError
 from poks.progress import ProgressCallback, default_progress
-from poks.resolver import resolve_archive, resolve_download_url
+from poks.relocation import pending_relocation, relocate_install
+from poks.resolver import resolve_archive, resolve_download_url, resolve_mirror_urls
+from poks.state import RECEIPT_FILE_NAME, STATE_FILE_NAME, STATE_LOCK_FILE_NAME, load_installed_state, save_installed_state, state_lock
+from poks.store import add_to_store, break_link, is_stored, materialize, store_entry_dir
+from poks.timings import record_timings, span
+from poks.tracing import Tracer, trace, use_tracer
+
+#: Upper bound for concurrent downloads when fetching the archives of many apps and platforms
+_MAX_FETCH_WORKERS = 16
 
 
 class Poks:
@@ -36,6 +65,11 @@ class Poks:
         progress_callback: ProgressCallback | None = default_progress.on_download,
         extract_callback: ProgressCallback | None = default_progress.on_extract,
         use_cache: bool = True,
+        use_store: bool = False,
+        tracer: Tracer | None = None,
+        mirror: str | None = None,
+        max_bandwidth: int | None = None,
+        poke_workers: int = POKE_WORKERS,
     ) -> None:
         """
         Initialize Poks with a root directory.
@@ -47,19 +81,38 @@ class Poks:
                 Defaults to a Rich progress bar.
                 Pass ``None`` explicitly to disable download progress.
             extract_callback: Callback invoked during extraction
-                with ``(app_name, files_extracted, total_files)``.
+                with ``(app_name, bytes_extracted, total_bytes)``.
                 Defaults to a Rich progress bar.
                 Pass ``None`` explicitly to disable extraction progress.
             use_cache: If False, skip the download cache and always re-download.
+            use_store: If True, keep unpacked archives in a content-addressed store and
+                create installs from it with reflinks or hardlinks (copies as fallback),
+                so reinstalling the same archive needs neither a download nor an extraction.
+            tracer: Optional tracer receiving spans for bucket syncs, downloads, extractions and
+                prefix patching of installs. Tracing is disabled by default.
+            mirror: Base URL of a ``poks serve`` mirror. Archives are downloaded through it
+                (it fetches them from their upstream URL on a miss) instead of directly.
+            max_bandwidth: Limit in bytes per second for all downloads together. While downloads
+                are throttled, those with few bytes left get a larger share of it.
+            poke_workers: Threads patching the conda prefix of the files of one install.
+                Several apps are installed in parallel, each with its own threads.
 
         """
         self.root_dir = root_dir
         self.apps_dir = root_dir / "apps"
         self.buckets_dir = root_dir / "buckets"
         self.cache_dir = root_dir / "cache"
+        self.store_dir = root_dir / "store"
+        self.state_path = self.apps_dir / STATE_FILE_NAME
+        self._state_lock_path = root_dir / STATE_LOCK_FILE_NAME
         self.progress_callback = progress_callback
         self.extract_callback = extract_callback
         self.use_cache = use_cache
+        self.use_store = use_store
+        self.tracer = tracer
+        self.mirror = mirror
+        self.limiter = BandwidthLimiter(max_bandwidth) if max_bandwidth else None
+        self.poke_workers = poke_workers
 
     def install_app(self, app_name: str, version: str, bucket: str | None = None) -> InstalledApp:
         """
@@ -94,7 +147,10 @@ class Poks:
         )
 
         result = self.install(config)
-        return result.apps[0]
+        installed = result.apps[0]
+        # The only app also carries the bucket sync it waited for
+        installed.timings[:0] = result.timings
+        return installed
 
     def install_from_manifest(self, manifest_path: Path, version: str) -> InstalledApp:
         """
@@ -113,45 +169,201 @@ class Poks:
 
         """
         app_name = manifest_path.stem
-        manifest = PoksManifest.from_json_file(manifest_path)
         current_os, current_arch = get_current_platform()
 
-        app_version = next((v for v in manifest.versions if v.version == version), None)
-        if not app_version:
-            raise ValueError(f"Version {version} not found for app {app_name} in manifest")
-        if app_version.yanked:
-            raise ValueError(f"Version {version} of {app_name} is yanked: {app_version.yanked}")
-        try:
-            archive = resolve_archive(app_version, current_os, current_arch)
-        except ValueError as e:
-            raise UserNotificationException(f"Cannot install '{app_name}': {e}") from e
+        with record_timings() as timings, use_tracer(self.tracer), trace("install_app", {"poks.app": app_name, "poks.version": version}):
+            with span("manifest parse"):
+                app_version = PoksManifest.read_version(manifest_path, version)
+            if not app_version:
+                raise ValueError(f"Version {version} not found for app {app_name} in manifest")
+            if app_version.yanked:
+                raise ValueError(f"Version {version} of {app_name} is yanked: {app_version.yanked}")
+            try:
+                archive = resolve_archive(app_version, current_os, current_arch)
+            except ValueError as e:
+                raise UserNotificationException(f"Cannot install '{app_name}': {e}") from e
 
-        install_dir = self.apps_dir / app_name / version
-        try:
-            if not install_dir.exists():
-                effective = app_version.resolve_for_archive(archive)
+            try:
+                installed = self._install_version(app_name, app_version, archive, "", [])
+            finally:
+                default_progress.close()
+        installed.timings = timings
+        return installed
+
+    def create_bundle(self, config_or_path: Path | PoksConfig, platforms: list[tuple[str, str]], output: Path) -> PoksBundleIndex:
+        """
+        Write an offline bundle with everything needed to install a config on other machines.
+
+        Every app is resolved for every platform it supports among *platforms*, the archives are
+        downloaded in parallel (through the download cache) and written to *output* together with
+        the config and the manifests of the bundled versions. See ``install_from_bundle``.
+
+        Args:
+            config_or_path: Path to poks.json or a PoksConfig object.
+            platforms: ``(os, arch)`` pairs to bundle archives for.
+            output: Path of the bundle file to write.
+
+        Returns:
+            The index written into the bundle.
+
+        Raises:
+            UserNotificationException: If an app has no archive for one of the platforms it supports.
+
+        """
+        config = PoksConfig.from_json_file(config_or_path) if isinstance(config_or_path, Path) else config_or_path
+        index = self._lock_archives(config, platforms, strict=True)
+        archives = {sha256: result.path for sha256, result in self._fetch_archives(index.archives, config.mirrors).items()}
+        write_bundle(output, index, archives)
+        logger.info(f"Bundled {len(archives)} archives for {len(config.apps)} apps into {output}")
+        return index
+
+    def prefetch(self, config_or_path: Path | PoksConfig, platforms: list[tuple[str, str]] | None = None) -> dict[str, DownloadResult]:
+        """
+        Download and verify the archives of a config for other platforms too, without installing anything.
+
+        This warms the download cache of a machine serving others, e.g. a ``poks serve`` mirror
+        on Linux for Windows and macOS agents. All archives are downloaded concurrently.
+
+        Args:
+            config_or_path: Path to poks.json or a PoksConfig object.
+            platforms: ``(os, arch)`` pairs to fetch archives for. None fetches the archives of every
+                platform each app supports.
+
+        Returns:
+            The cached archives by SHA256.
+
+        """
+        config = PoksConfig.from_json_file(config_or_path) if isinstance(config_or_path, Path) else config_or_path
+        index = self._lock_archives(config, platforms, strict=False)
+        return self._fetch_archives(index.archives, config.mirrors)
+
+    def pending_downloads(self, config_or_path: Path | PoksConfig) -> list[PoksBundleArchive]:
+        """
+        Return the archives ``install`` would download for the current platform, once per SHA256.
+
+        Apps that are installed already and archives present in the download cache are left out;
+        cached archives are only verified by the install itself.
+
+        Args:
+            config_or_path: Path to poks.json or a PoksConfig object.
+
+        Returns:
+            The archives missing from the download cache.
+
+        """
+        config = PoksConfig.from_json_file(config_or_path) if isinstance(config_or_path, Path) else config_or_path
+        index = self._lock_archives(config, [get_current_platform()], strict=False)
+        pending: dict[str, PoksBundleArchive] = {}
+        for entry in index.archives:
+            if (self.apps_dir / entry.app / entry.version).exists():
+                continue
+            if self.use_cache and cache_path_for(entry.url, self.cache_dir).exists():
+                continue
+            pending.setdefault(entry.sha256, entry)
+        return list(pending.values())
+
+    def _lock_archives(self, config: PoksConfig, platforms: list[tuple[str, str]] | None, strict: bool) -> PoksBundleIndex:
+        """
+        Resolve the archive of every app of *config* for each of *platforms* (all of them if None).
+
+        Apps without an archive for a platform they support are an error if *strict*, otherwise skipped.
+        """
+        self._ensure_buckets_registered(config.buckets)
+        bucket_paths = sync_all_buckets(config.buckets, self.buckets_dir)
+
+        index = PoksBundleIndex(config=config, platforms=[platform_key(os_name, arch) for os_name, arch in platforms or []])
+        for app in config.apps:
+            bucket_path = bucket_paths.get(app.bucket)
+            if not bucket_path:
+                raise ValueError(f"Bucket '{app.bucket}' not found. Available buckets: {', '.join(bucket_paths)}")
+            with span("manifest parse", target=app.name):
+                manifest = PoksManifest.from_json_file(find_manifest(app.name, bucket_path))
+            app_version = manifest.get_version(app.version)
+            if not app_version:
+                raise ValueError(f"Version {app.version} not found for app {app.name} in manifest")
+            if app_version.yanked:
+                raise ValueError(f"Version {app.version} of {app.name} is yanked: {app_version.yanked}")
+            bucket_manifests = index.manifests.setdefault(app.bucket, {})
+            if app.name not in bucket_manifests:
+                bucket_manifests[app.name] = replace(manifest, versions=[app_version])
+            elif app_version not in bucket_manifests[app.name].versions:
+                # The config pins several versions of the app, the bundled manifest must offer all of them
+                bucket_manifests[app.name].versions.append(app_version)
+            targets = platforms if platforms is not None else list(dict.fromkeys((archive.os, archive.arch) for archive in app_version.archives))
+            for os_name, arch in targets:
+                if not app.is_supported(os_name, arch):
+                    continue
+                try:
+                    archive = resolve_archive(app_version, os_name, arch)
+                except ValueError as e:
+                    if strict:
+                        raise UserNotificationException(f"Cannot bundle '{app.name}': {e}") from e
+                    logger.warning(f"Skipping {app.name} for {platform_key(os_name, arch)}: {e}")
+                    continue
                 url = resolve_download_url(app_version, archive)
-                download_result = get_cached_or_download(
-                    url,
-                    archive.sha256,
-                    self.cache_dir,
-                    app_name=app_name,
-                    progress_callback=self.progress_callback,
-                    use_cache=self.use_cache,
-                )
-                extract_archive(download_result.path, install_dir, extract_dir=effective.extract_dir, progress_callback=self.extract_callback, app_name=app_name)
-                (install_dir / ".manifest.json").write_text(manifest.to_json_string())
-                self._create_receipt(install_dir, "", [])
-                downloaded = download_result.downloaded
-                extracted = True
-            else:
-                effective = app_version.resolve_for_archive(archive)
-                downloaded = False
-                extracted = False
+                index.archives.append(PoksBundleArchive(app=app.name, version=app.version, os=os_name, arch=arch, url=url, sha256=archive.sha256))
+        return index
+
+    def _fetch_archives(self, entries: list[PoksBundleArchive], mirrors: list[PoksMirror]) -> dict[str, DownloadResult]:
+        """Download (or find in the cache) the archive of every entry concurrently, once per SHA256."""
+        unique = {entry.sha256: entry for entry in entries}
+        try:
+            with ThreadPoolExecutor(max_workers=min(max(len(unique), 1), _MAX_FETCH_WORKERS)) as executor:
+                downloads = {
+                    sha256: executor.submit(
+                        contextvars.copy_context().run,
+                        get_cached_or_download,
+                        entry.url,
+                        sha256,
+                        self.cache_dir,
+                        app_name=entry.app,
+                        progress_callback=self.progress_callback,
+                        mirror=self.mirror,
+                        alternates=resolve_mirror_urls(entry.url, mirrors),
+                        limiter=self.limiter,
+                    )
+                    for sha256, entry in unique.items()
+                }
+                return {sha256: future.result() for sha256, future in downloads.items()}
         finally:
             default_progress.close()
 
-        return self._build_installed_app(app_name, version, install_dir, effective, downloaded=downloaded, extracted=extracted)
+    def install_from_bundle(self, bundle_path: Path) -> InstallResult:
+        """
+        Install the apps of a bundle written by ``create_bundle``, without network access.
+
+        The archives for the current platform are copied from the memory-mapped bundle into the
+        download cache, then the apps are installed from the bundled manifests like ``install`` does.
+
+        Args:
+            bundle_path: Path to the bundle file.
+
+        Returns:
+            Install result with per-app details and aggregated environment helpers.
+
+        Raises:
+            UserNotificationException: If the bundle is invalid or has no archives for the current platform,
+                or the download cache is disabled.
+
+        """
+        if not self.use_cache:
+            raise UserNotificationException("Installing from a bundle goes through the download cache, it cannot be disabled")
+        current_os, current_arch = get_current_platform()
+        with open_bundle(bundle_path) as bundle, tempfile.TemporaryDirectory(prefix="poks-bundle-") as tmp:
+            config = bundle.index.config
+            if platform_key(current_os, current_arch) not in bundle.index.platforms:
+                raise UserNotificationException(f"Bundle {bundle_path} has no archives for {platform_key(current_os, current_arch)}, only for {', '.join(bundle.index.platforms)}")
+            with use_tracer(self.tracer), trace("install", {"poks.apps": len(config.apps)}):
+                with record_timings() as timings, span("bundle read", target=bundle_path.name):
+                    bucket_paths = bundle.write_manifests(Path(tmp))
+                    for entry in bundle.archives_for(current_os, current_arch):
+                        if not (self.apps_dir / entry.app / entry.version).exists():
+                            bundle.seed_cache(entry, self.cache_dir)
+                try:
+                    installed_apps = self._install_apps_parallel(config.apps, bucket_paths, config.buckets, current_os, current_arch, [])
+                finally:
+                    default_progress.close()
+        return InstallResult(apps=installed_apps, timings=timings)
 
     def _resolve_bucket(self, bucket_arg: str | None, app_name: str, registry: PoksBucketRegistry) -> PoksBucket:
         """Resolve the bucket logic for installation to avoid nesting."""
@@ -184,6 +396,9 @@ class Poks:
             raise ValueError(f"Bucket '{name}' not found in registry or {self.buckets_dir}")
 
         # Try to infer URL from git config
+        from git import Repo
+        from git.exc import InvalidGitRepositoryError, NoSuchPathError
+
         url = ""
         try:
             url = Repo(bucket_path).remotes.origin.url
@@ -224,13 +439,15 @@ class Poks:
         self._ensure_buckets_registered(config.buckets)
 
         current_os, current_arch = get_current_platform()
-        bucket_paths = sync_all_buckets(config.buckets, self.buckets_dir)
+        with use_tracer(self.tracer), trace("install", {"poks.apps": len(config.apps)}):
+            with record_timings() as timings:
+                bucket_paths = sync_all_buckets(config.buckets, self.buckets_dir)
 
-        try:
-            installed_apps = self._install_apps_parallel(config.apps, bucket_paths, config.buckets, current_os, current_arch)
-        finally:
-            default_progress.close()
-        return InstallResult(apps=installed_apps)
+            try:
+                installed_apps = self._install_apps_parallel(config.apps, bucket_paths, config.buckets, current_os, current_arch, config.mirrors)
+            finally:
+                default_progress.close()
+        return InstallResult(apps=installed_apps, timings=timings)
 
     def _install_apps_parallel(
         self,
@@ -239,14 +456,19 @@ class Poks:
         buckets_list: list[PoksBucket],
         current_os: str,
         current_arch: str,
+        mirrors: list[PoksMirror],
     ) -> list[InstalledApp]:
         if len(apps) <= 1:
-            results = [self._install_single_app(app, bucket_paths, buckets_list, current_os, current_arch) for app in apps]
+            results = [self._install_single_app(app, bucket_paths, buckets_list, current_os, current_arch, mirrors) for app in apps]
             return [r for r in results if r is not None]
 
         # Map future -> index to preserve config ordering
         with ThreadPoolExecutor(max_workers=len(apps)) as executor:
-            futures = {executor.submit(self._install_single_app, app, bucket_paths, buckets_list, current_os, current_arch): idx for idx, app in enumerate(apps)}
+            # Each worker runs in a copy of the caller's context, so its spans nest under the current trace
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._install_single_app, app, bucket_paths, buckets_list, current_os, current_arch, mirrors): idx
+                for idx, app in enumerate(apps)
+            }
             ordered: dict[int, InstalledApp | None] = {}
             for future in as_completed(futures):
                 ordered[futures[future]] = future.result()
@@ -280,18 +502,32 @@ class Poks:
         buckets_list: list[PoksBucket],
         current_os: str,
         current_arch: str,
+        mirrors: list[PoksMirror],
     ) -> InstalledApp | None:
         if not app.is_supported(current_os, current_arch):
             logger.info(f"Skipping {app.name}: not supported on {current_os}/{current_arch}")
             return None
 
+        with record_timings() as timings, trace("install_app", {"poks.app": app.name, "poks.version": app.version}):
+            installed = self._install_bucket_app(app, bucket_paths, buckets_list, current_os, current_arch, mirrors)
+        installed.timings = timings
+        return installed
+
+    def _install_bucket_app(
+        self,
+        app: PoksApp,
+        bucket_paths: dict[str, Path],
+        buckets_list: list[PoksBucket],
+        current_os: str,
+        current_arch: str,
+        mirrors: list[PoksMirror],
+    ) -> InstalledApp:
         bucket_path = bucket_paths.get(app.bucket)
         if not bucket_path:
             raise ValueError(f"Bucket '{app.bucket}' not found. Available buckets: {', '.join(bucket_paths)}")
-        manifest_path = find_manifest(app.name, bucket_path)
-        manifest = PoksManifest.from_json_file(manifest_path)
-
-        app_version = next((v for v in manifest.versions if v.version == app.version), None)
+        with span("manifest parse"):
+            manifest_path = find_manifest(app.name, bucket_path)
+            app_version = PoksManifest.read_version(manifest_path, app.version)
 
         if not app_version:
             raise ValueError(f"Version {app.version} not found for app {app.name} in manifest")
@@ -303,55 +539,148 @@ class Poks:
         except ValueError as e:
             raise UserNotificationException(f"Cannot install '{app.name}': {e}") from e
 
-        install_dir = self.apps_dir / app.name / app.version
+        return self._install_version(app.name, app_version, archive, app.bucket, buckets_list, mirrors)
+
+    def _install_version(
+        self,
+        app_name: str,
+        app_version: PoksAppVersion,
+        archive: PoksArchive,
+        bucket_ref: str,
+        buckets_list: list[PoksBucket],
+        mirrors: Sequence[PoksMirror] = (),
+    ) -> InstalledApp:
+        """Download and extract the chosen archive unless the version is already installed."""
+        version = app_version.version
+        install_dir = self.apps_dir / app_name / version
+        effective = app_version.resolve_for_archive(archive)
+        downloaded = extracted = linked = False
         if not install_dir.exists():
-            effective = app_version.resolve_for_archive(archive)
             url = resolve_download_url(app_version, archive)
-            download_result = get_cached_or_download(
-                url,
-                archive.sha256,
-                self.cache_dir,
-                app_name=app.name,
-                progress_callback=self.progress_callback,
-                use_cache=self.use_cache,
-            )
-            extract_archive(download_result.path, install_dir, extract_dir=effective.extract_dir, progress_callback=self.extract_callback, app_name=app.name)
-
-            # Persist manifest and receipt for future reference
-            (install_dir / ".manifest.json").write_text(manifest.to_json_string())
-            self._create_receipt(install_dir, app.bucket, buckets_list)
-            downloaded = download_result.downloaded
-            extracted = True
-        else:
-            effective = app_version.resolve_for_archive(archive)
-            downloaded = False
-            extracted = False
+            if self.use_store:
+                entry_dir = store_entry_dir(self.store_dir, archive.sha256, effective.extract_dir)
+                if not is_stored(entry_dir):
+                    download_result = self._download(url, archive, app_name, mirrors)
+                    add_to_store(entry_dir, download_result.path, extract_dir=effective.extract_dir, progress_callback=self.extract_callback, app_name=app_name)
+                    downloaded = download_result.downloaded
+                    extracted = True
+                with span("link"):
+                    materialize(entry_dir, install_dir, poke_workers=self.poke_workers)
+                linked = True
+            else:
+                download_result = self._download(url, archive, app_name, mirrors)
+                extract_archive(
+                    download_result.path,
+                    install_dir,
+                    extract_dir=effective.extract_dir,
+                    progress_callback=self.extract_callback,
+                    app_name=app_name,
+                    poke_workers=self.poke_workers,
+                )
+                downloaded = download_result.downloaded
+                extracted = True
 
-        return self._build_installed_app(app.name, app.version, install_dir, effective, downloaded=downloaded, extracted=extracted)
+            # Persist the resolved receipt for future reference
+            with span("receipt write"):
+                self._create_receipt(install_dir, bucket_ref, buckets_list, app_version, archive, url)
+
+        self._record_installed(app_name, version, effective)
+        return self._build_installed_app(app_name, version, install_dir, effective, downloaded=downloaded, extracted=extracted, linked=linked)
+
+    def _download(self, url: str, archive: PoksArchive, app_name: str, mirrors: Sequence[PoksMirror]) -> DownloadResult:
+        return get_cached_or_download(
+            url,
+            archive.sha256,
+            self.cache_dir,
+            app_name=app_name,
+            progress_callback=self.progress_callback,
+            use_cache=self.use_cache,
+            mirror=self.mirror,
+            alternates=resolve_mirror_urls(url, mirrors),
+            limiter=self.limiter,
+        )
 
-    def _create_receipt(self, install_dir: Path, bucket_ref: str, buckets_list: list[PoksBucket]) -> None:
-        receipt: dict[str, str | None] = {"bucket_id": None, "bucket_name": None, "bucket_url": None}
+    def _create_receipt(
+        self,
+        install_dir: Path,
+        bucket_ref: str,
+        buckets_list: list[PoksBucket],
+        app_version: PoksAppVersion,
+        archive: PoksArchive,
+        url: str,
+    ) -> None:
+        # Only the installed version and its chosen archive are kept, not the whole manifest
+        receipt = PoksReceipt(
+            version=replace(app_version, archives=[]),
+            archive=archive,
+            url=url,
+            sha256=archive.sha256,
+        )
 
         matched_bucket = next((b for b in buckets_list if b.name == bucket_ref or b.id == bucket_ref), None)
         if matched_bucket:
-            receipt["bucket_id"] = matched_bucket.id
-            receipt["bucket_name"] = matched_bucket.name
-            receipt["bucket_url"] = matched_bucket.url
-
-        (install_dir / ".receipt.json").write_text(json.dumps(receipt, indent=2))
+            receipt.bucket_id = matched_bucket.id
+            receipt.bucket_name = matched_bucket.name
+            receipt.bucket_url = matched_bucket.url
+
+        receipt.to_json_file(install_dir / RECEIPT_FILE_NAME)
+
+    def _record_installed(self, app_name: str, version: str, effective: PoksAppVersion) -> None:
+        """Add or refresh the installed-state entry for an app version."""
+        entry = PoksInstalledEntry(name=app_name, version=version, bin_dirs=effective.bin_dirs, env=effective.env)
+        with state_lock(self._state_lock_path):
+            state = load_installed_state(self.state_path) or self._scan_installed()
+            existing = state.get(app_name, version)
+            if existing:
+                entry.deduped = existing.deduped
+            if state.add_or_update(entry) or not self.state_path.exists():
+                save_installed_state(state, self.state_path)
+
+    def _forget_installed(self, app_name: str | None = None, version: str | None = None) -> None:
+        """Drop installed-state entries for an app (or a single version), or all entries when *app_name* is None."""
+        with state_lock(self._state_lock_path):
+            if app_name is None:
+                self.state_path.unlink(missing_ok=True)
+                return
+            state = load_installed_state(self.state_path)
+            if state is not None:
+                state.remove(app_name, version)
+                save_installed_state(state, self.state_path)
 
     def list_installed(self) -> InstallResult:
         """
         List all installed applications.
 
+        Reads the installed-state file. If it does not exist yet (installs made
+        by an older Poks), the apps directory is scanned once and the state file is written.
+        Entries whose install directory was removed behind Poks's back are dropped.
+
         Returns:
             Install result with per-app details and aggregated environment helpers.
 
         """
-        installed_apps: list[InstalledApp] = []
         if not self.apps_dir.exists():
             return InstallResult(apps=[])
 
+        with state_lock(self._state_lock_path):
+            state = load_installed_state(self.state_path)
+            if state is None:
+                state = self._scan_installed()
+                save_installed_state(state, self.state_path)
+            missing = [e for e in state.apps if not (self.apps_dir / e.name / e.version).is_dir()]
+            if missing:
+                for entry in missing:
+                    state.remove(entry.name, entry.version)
+                save_installed_state(state, self.state_path)
+
+        return InstallResult(apps=[self._build_installed_app(e.name, e.version, self.apps_dir / e.name / e.version, e) for e in state.apps])
+
+    def _scan_installed(self) -> PoksInstalledState:
+        """Rebuild the installed state by walking the apps directory."""
+        state = PoksInstalledState()
+        if not self.apps_dir.exists():
+            return state
+
         for app_dir in self.apps_dir.iterdir():
             if not app_dir.is_dir():
                 continue
@@ -360,48 +689,60 @@ class Poks:
                 if not version_dir.is_dir():
                     continue
 
-                installed = self._load_installed_app(app_dir.name, version_dir)
-                if installed:
-                    installed_apps.append(installed)
+                effective = self._load_installed_version(app_dir.name, version_dir)
+                state.add_or_update(
+                    PoksInstalledEntry(
+                        name=app_dir.name,
+                        version=version_dir.name,
+                        bin_dirs=effective.bin_dirs if effective else None,
+                        env=effective.env if effective else None,
+                    )
+                )
 
-        return InstallResult(apps=installed_apps)
+        return state
 
-    def _load_installed_app(self, app_name: str, version_dir: Path) -> InstalledApp | None:
+    def _load_installed_version(self, app_name: str, version_dir: Path) -> PoksAppVersion | None:
+        """Return the archive-resolved version spec stored alongside an installed app, if available."""
         version = version_dir.name
+        receipt_path = version_dir / RECEIPT_FILE_NAME
         manifest_path = version_dir / ".manifest.json"
 
-        if not manifest_path.exists():
-            return InstalledApp(name=app_name, version=version, install_dir=version_dir, bin_dirs=[], env={})
-
         try:
-            manifest = PoksManifest.from_json_file(manifest_path)
-            app_version = next((v for v in manifest.versions if v.version == version), None)
+            if receipt_path.exists():
+                receipt = PoksReceipt.from_json_file(receipt_path)
+                if receipt.version and receipt.archive:
+                    return receipt.version.resolve_for_archive(receipt.archive)
+
+            # Legacy installs only carry a full copy of the manifest
+            if not manifest_path.exists():
+                return None
+
+            app_version = PoksManifest.read_version(manifest_path, version)
 
             if not app_version:
                 logger.warning(f"Version {version} not found in stored manifest for {app_name}")
-                return InstalledApp(name=app_name, version=version, install_dir=version_dir, bin_dirs=[], env={})
+                return None
 
             current_os, current_arch = get_current_platform()
             try:
                 archive = resolve_archive(app_version, current_os, current_arch)
-                effective = app_version.resolve_for_archive(archive)
+                return app_version.resolve_for_archive(archive)
             except ValueError:
-                effective = app_version
-
-            return self._build_installed_app(app_name, version, version_dir, effective)
+                return app_version
 
         except Exception as e:
-            logger.warning(f"Failed to load manifest for {app_name}@{version}: {e}")
-            return InstalledApp(name=app_name, version=version, install_dir=version_dir, bin_dirs=[], env={})
+            logger.warning(f"Failed to load install metadata for {app_name}@{version}: {e}")
+            return None
 
     @staticmethod
     def _build_installed_app(
         name: str,
         version: str,
         install_dir: Path,
-        app_version: PoksAppVersion,
+        app_version: PoksAppVersion | PoksInstalledEntry,
         downloaded: bool = False,
         extracted: bool = False,
+        linked: bool = False,
     ) -> InstalledApp:
         bin_dirs = [install_dir / entry for entry in app_version.bin_dirs] if app_version.bin_dirs else []
         env: dict[str, str] = {}
@@ -417,6 +758,7 @@ class Poks:
             env=env,
             downloaded=downloaded,
             extracted=extracted,
+            linked=linked,
         )
 
     def uninstall(self, app_name: str | None = None, version: str | None = None, all_apps: bool = False, wipe: bool = False) -> None:
@@ -438,9 +780,9 @@ class Poks:
                 if item.is_dir():
                     shutil.rmtree(item)
                     logger.info(f"Removed {item.name}")
-            if wipe and self.cache_dir.exists():
-                shutil.rmtree(self.cache_dir)
-                logger.info("Removed download cache")
+            self._forget_installed()
+            if wipe:
+                self._wipe_caches()
             return
 
         if not app_name:
@@ -456,6 +798,7 @@ class Poks:
             else:
                 logger.info(f"Uninstalling {app_name}@{version}")
                 shutil.rmtree(version_dir)
+                self._forget_installed(app_name, version)
                 logger.info(f"Removed {app_name}@{version}")
                 if app_dir.exists() and not any(app_dir.iterdir()):
                     app_dir.rmdir()
@@ -466,11 +809,100 @@ class Poks:
             else:
                 logger.info(f"Uninstalling all versions of {app_name}")
                 shutil.rmtree(app_dir)
+                self._forget_installed(app_name)
                 logger.info(f"Removed {app_name}")
 
-        if wipe and self.cache_dir.exists():
+        if wipe:
+            self._wipe_caches()
+
+    def _wipe_caches(self) -> None:
+        if self.cache_dir.exists():
             shutil.rmtree(self.cache_dir)
             logger.info("Removed download cache")
+        if self.store_dir.exists():
+            shutil.rmtree(self.store_dir)
+            logger.info("Removed unpacked store")
+
+    def dedupe(self) -> DedupeResult:
+        """
+        Replace identical files across all installed app versions with links to a single copy.
+
+        Reflinks are used where the filesystem supports them, hardlinks otherwise. The
+        linked files are recorded per app version in the installed state. Uninstalling
+        a version only drops its own links and record; the other versions keep their data,
+        and ``relocate`` gives recorded files a private copy before rewriting them.
+
+        Returns:
+            Number of linked files, saved bytes and the linked paths per install directory.
+
+        """
+        installed = self.list_installed()
+        result = dedupe([app.install_dir for app in installed.apps])
+        if not result.linked:
+            return result
+
+        with state_lock(self._state_lock_path):
+            state = load_installed_state(self.state_path) or self._scan_installed()
+            for app in installed.apps:
+                entry = state.get(app.name, app.version)
+                linked = result.linked.get(app.install_dir)
+                if entry and linked:
+                    entry.deduped = sorted({*(entry.deduped or []), *linked})
+            save_installed_state(state, self.state_path)
+        logger.info(f"Linked {result.files_linked} duplicate files, saved {result.bytes_saved} bytes")
+        return result
+
+    def relocate(self) -> int:
+        """
+        Re-point every installed app at its current location after the root directory was moved.
+
+        Only conda packages carry the install prefix inside their files; the sites that
+        were patched at install time are read from each install's relocation index and
+        rewritten in place. Apps that did not move are left alone. Files linked by
+        ``dedupe`` get a private copy first and are no longer recorded as deduped.
+
+        Returns:
+            The number of rewritten patch sites.
+
+        Raises:
+            UserNotificationException: If any app could not be relocated. All apps are attempted first.
+
+        """
+        installed = self.list_installed().apps
+        self._unshare_deduped(installed)
+        relocated = 0
+        failures = []
+        for app in installed:
+            try:
+                relocated += relocate_install(app.install_dir)
+            except PokeError as e:
+                failures.append(f"{app.name}@{app.version}: {e}")
+        # Cached activations hold absolute paths of the old location
+        shutil.rmtree(self.cache_dir / "activation", ignore_errors=True)
+        if failures:
+            raise UserNotificationException("Failed to relocate:\n" + "\n".join(failures))
+        logger.info(f"Relocated {relocated} patch sites to {self.apps_dir}")
+        return relocated
+
+    def _unshare_deduped(self, apps: list[InstalledApp]) -> None:
+        """Give deduped files that a relocation is about to rewrite a private copy, and drop them from the dedupe record."""
+        with state_lock(self._state_lock_path):
+            state = load_installed_state(self.state_path)
+            if state is None:
+                return
+            changed = False
+            for app in apps:
+                entry = state.get(app.name, app.version)
+                if entry is None or not entry.deduped:
+                    continue
+                shared = set(entry.deduped) & pending_relocation(app.install_dir)
+                for path in sorted(shared):
+                    break_link(app.install_dir / path)
+                if shared:
+                    entry.deduped = sorted(set(entry.deduped) - shared) or None
+                    changed = True
+            if changed:
+                save_installed_state(state, self.state_path)
 
     def search(self, query: str, update: bool = True) -> list[str]:
         """
@@ -1,87 +1,167 @@
 """Download and extraction progress reporting for Poks."""
 
+from __future__ import annotations
+
+import queue
 import threading
+import time
 from collections.abc import Callable
+from typing import TYPE_CHECKING, cast
+
+from py_app_dev.core.logging import logger
 
-from rich.console import Group
-from rich.live import Live
-from rich.progress import (
-    BarColumn,
-    DownloadColumn,
-    Progress,
-    TaskID,
-    TaskProgressColumn,
-    TextColumn,
-    TimeRemainingColumn,
-    TransferSpeedColumn,
-)
+if TYPE_CHECKING:
+    from rich.live import Live
+    from rich.progress import Progress, TaskID
 
 ProgressCallback = Callable[[str, int, int | None], None]
 # Signature: (app_name, current, total_or_none)
 
 
+#: Progress event: (bar, app_name, current, total_or_none), where bar is "download" or "extract"
+_Event = tuple[str, str, int, int | None]
+_STOP = object()
+
+
 class RichProgressHandler:
-    """Rich-based progress display with separate download and extraction bars grouped in a single live display."""
+    """
+    Rich-based progress display with separate download and extraction bars grouped in a single live display.
+
+    Workers only push events onto a queue, so reporting progress never blocks on the
+    display. A renderer thread, started on the first event, drains the queue, keeps the
+    latest value per bar and updates Rich at most *refresh_per_second* times.
+    Rich is imported by that thread, so creating the handler is free.
+    """
+
+    def __init__(self, refresh_per_second: float = 10) -> None:
+        self.refresh_per_second = refresh_per_second
+        self._events: queue.SimpleQueue[_Event | threading.Event | object] = queue.SimpleQueue()
+        self._renderer: threading.Thread | None = None
+        # Only guards starting and stopping the renderer, never taken per event once it runs
+        self._renderer_lock = threading.Lock()
 
-    def __init__(self) -> None:
         self._download_tasks: dict[str, TaskID] = {}
         self._extract_tasks: dict[str, TaskID] = {}
-        self._lock = threading.Lock()
-
-        self._download_progress = Progress(
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            DownloadColumn(),
-            TransferSpeedColumn(),
-            TimeRemainingColumn(),
-        )
-        self._extract_progress = Progress(
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TaskProgressColumn(),
-            TimeRemainingColumn(),
-        )
-
+        self._download_progress: Progress | None = None
+        self._extract_progress: Progress | None = None
         self._live: Live | None = None
 
-    def _ensure_live(self) -> None:
-        """Ensure the single Live context is running."""
-        if self._live is None:
-            group = Group(self._download_progress, self._extract_progress)
-            self._live = Live(group, refresh_per_second=10)
-            self._live.start()
+    def on_download(self, app_name: str, downloaded: int, total: int | None) -> None:
+        """Report download progress for an app."""
+        self._post(("download", app_name, downloaded, total))
+
+    def on_extract(self, app_name: str, extracted: int, total: int | None) -> None:
+        """Report extraction progress for an app."""
+        self._post(("extract", app_name, extracted, total))
+
+    def flush(self) -> None:
+        """Block until every event reported so far has been rendered."""
+        if self._renderer is None:
+            return
+        rendered = threading.Event()
+        self._events.put(rendered)
+        rendered.wait()
 
     def close(self) -> None:
-        """Stop the live display. Call this after all work is done."""
-        with self._lock:
+        """Render the pending events and stop the live display. Call this after all work is done."""
+        with self._renderer_lock:
+            if self._renderer is not None:
+                self._events.put(_STOP)
+                self._renderer.join()
+                self._renderer = None
             if self._live is not None:
                 self._live.stop()
                 self._live = None
 
-    def on_download(self, app_name: str, downloaded: int, total: int | None) -> None:
-        """Report download progress for an app."""
-        with self._lock:
-            self._ensure_live()
-            if app_name not in self._download_tasks:
-                self._download_tasks[app_name] = self._download_progress.add_task(app_name, total=total or 0)
-            task_id = self._download_tasks[app_name]
-
-            if total is not None and self._download_progress.tasks[task_id].total != total:
-                self._download_progress.update(task_id, total=total)
-            self._download_progress.update(task_id, completed=downloaded)
+    def _post(self, event: _Event) -> None:
+        self._events.put(event)
+        if self._renderer is None:
+            with self._renderer_lock:
+                if self._renderer is None:
+                    self._renderer = threading.Thread(target=self._render_loop, name="poks-progress", daemon=True)
+                    self._renderer.start()
+
+    def _render_loop(self) -> None:
+        interval = 1 / self.refresh_per_second
+        while True:
+            batch = [self._events.get()]
+            while True:
+                try:
+                    batch.append(self._events.get_nowait())
+                except queue.Empty:
+                    break
+            latest: dict[tuple[str, str], tuple[int, int | None]] = {}
+            waiters = []
+            stop = False
+            for event in batch:
+                if event is _STOP:
+                    stop = True
+                elif isinstance(event, threading.Event):
+                    waiters.append(event)
+                else:
+                    bar, app_name, current, total = cast(_Event, event)
+                    latest[(bar, app_name)] = (current, total)
+            try:
+                self._render(latest)
+            except Exception as e:
+                # A broken display must never fail an install
+                logger.debug(f"Progress rendering failed: {e}")
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+            time.sleep(interval)
+
+    def _render(self, latest: dict[tuple[str, str], tuple[int, int | None]]) -> None:
+        if not latest:
+            return
+        download_progress, extract_progress = self._ensure_live()
+        for (bar, app_name), (current, total) in latest.items():
+            if bar == "download":
+                progress, tasks, description = download_progress, self._download_tasks, app_name
+            else:
+                progress, tasks, description = extract_progress, self._extract_tasks, f"Unpack {app_name}"
+            if app_name not in tasks:
+                tasks[app_name] = progress.add_task(description, total=total)
+            task_id = tasks[app_name]
+            if total is not None and progress.tasks[task_id].total != total:
+                progress.update(task_id, total=total)
+            progress.update(task_id, completed=current)
+
+    def _ensure_live(self) -> tuple[Progress, Progress]:
+        """Ensure the single Live context is running and return the ``(download, extract)`` progress bars."""
+        if self._download_progress is None or self._extract_progress is None:
+            from rich.progress import (
+                BarColumn,
+                DownloadColumn,
+                Progress,
+                TaskProgressColumn,
+                TextColumn,
+                TimeRemainingColumn,
+                TransferSpeedColumn,
+            )
+
+            self._download_progress = Progress(
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                DownloadColumn(),
+                TransferSpeedColumn(),
+                TimeRemainingColumn(),
+            )
+            self._extract_progress = Progress(
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TaskProgressColumn(),
+                TimeRemainingColumn(),
+            )
+        if self._live is None:
+            from rich.console import Group
+            from rich.live import Live
 
-    def on_extract(self, app_name: str, extracted: int, total: int | None) -> None:
-        """Report extraction progress for an app."""
-        with self._lock:
-            self._ensure_live()
-            desc = f"Unpack {app_name}"
-            if app_name not in self._extract_tasks:
-                self._extract_tasks[app_name] = self._extract_progress.add_task(desc, total=total or 0)
-            task_id = self._extract_tasks[app_name]
-
-            if total is not None and self._extract_progress.tasks[task_id].total != total:
-                self._extract_progress.update(task_id, total=total)
-            self._extract_progress.update(task_id, completed=extracted)
+            group = Group(self._download_progress, self._extract_progress)
+            self._live = Live(group, refresh_per_second=self.refresh_per_second)
+            self._live.start()
+        return self._download_progress, self._extract_progress
 
 
 default_progress = RichProgressHandler()
@@ -0,0 +1,144 @@
+"""Relocation index of conda prefix patch sites, used to re-point an install after its directory moved."""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+from py_app_dev.core.logging import logger
+
+from poks.poker import PatchedFile, PatchSite, PokeError, PokeReport
+
+RELOCATION_FILE_NAME = ".relocation.json"
+
+
+def save_relocation_index(install_dir: Path, report: PokeReport) -> None:
+    """Record where ``poke`` wrote the install prefix, so a later move only has to revisit those offsets."""
+    if report.patched:
+        _write_index(install_dir, [asdict(f) for f in report.patched])
+
+
+def _write_index(install_dir: Path, files: list[dict[str, Any]]) -> None:
+    """
+    Write the relocation index of *install_dir*.
+
+    Files hold *install_dir* as their prefix unless their entry names another ``prefix``
+    (files a relocation failed for).
+    """
+    index = {"prefix": str(install_dir), "files": files}
+    tmp_path = install_dir / f"{RELOCATION_FILE_NAME}.{os.getpid()}.tmp"
+    tmp_path.write_text(json.dumps(index))
+    os.replace(tmp_path, install_dir / RELOCATION_FILE_NAME)
+
+
+def pending_relocation(install_dir: Path) -> set[str]:
+    """Return the files of *install_dir*'s relocation index that still hold another prefix."""
+    index_path = install_dir / RELOCATION_FILE_NAME
+    if not index_path.is_file():
+        return set()
+    index = json.loads(index_path.read_text())
+    return {f["path"] for f in index["files"] if f.get("prefix", index["prefix"]) != str(install_dir)}
+
+
+def relocate_install(install_dir: Path) -> int:
+    """
+    Rewrite the recorded prefix patch sites of *install_dir* to point at *install_dir* itself.
+
+    Only the offsets listed in the relocation index are touched: binary sites are
+    overwritten in place through a memory map, text files are spliced at their sites.
+    Hardlinked files (from the store or ``poks dedupe``) get a private copy first.
+
+    Returns:
+        The number of rewritten patch sites (0 if there is no index or the install did not move).
+
+    Raises:
+        PokeError: If any file could not be relocated. All files are attempted before raising;
+            files that were relocated are recorded under the new prefix, the others keep
+            their old prefix in the index, so a later relocation retries them.
+
+    """
+    # Imported here because the store depends on the extractor, which records relocation indexes
+    from poks.store import break_link
+
+    index_path = install_dir / RELOCATION_FILE_NAME
+    if not index_path.is_file():
+        return 0
+    index = json.loads(index_path.read_text())
+    new_prefix = str(install_dir)
+    prefixes = [f.get("prefix", index["prefix"]) for f in index["files"]]
+    if all(prefix == new_prefix for prefix in prefixes):
+        return 0
+
+    report = PokeReport()
+    relocated = 0
+    entries = []
+    for entry, old_prefix in zip(index["files"], prefixes, strict=True):
+        patched = PatchedFile(path=entry["path"], file_mode=entry["file_mode"], sites=[PatchSite(**site) for site in entry["sites"]])
+        target = install_dir / patched.path
+        try:
+            if old_prefix != new_prefix:
+                if not target.is_file():
+                    raise FileNotFoundError(f"{patched.path} no longer exists")
+                break_link(target)
+                if patched.file_mode == "binary":
+                    _relocate_binary(target, patched.sites, old_prefix, new_prefix)
+                else:
+                    patched.sites = _relocate_text(target, patched.sites, old_prefix, new_prefix)
+                relocated += len(patched.sites)
+        except (OSError, ValueError) as e:
+            report.errors[patched.path] = str(e)
+            entries.append({**asdict(patched), "prefix": old_prefix})
+            continue
+        report.patched.append(patched)
+        entries.append(asdict(patched))
+
+    _write_index(install_dir, entries)
+    if report.errors:
+        raise PokeError(report)
+    logger.debug(f"Relocated {relocated} patch sites in {install_dir}")
+    return relocated
+
+
+def _spelling(prefix: str, site: PatchSite) -> bytes:
+    return (prefix.replace("\\", "/") if site.forward_slashes else prefix).encode("utf-8")
+
+
+def _relocate_binary(target: Path, sites: list[PatchSite], old_prefix: str, new_prefix: str) -> None:
+    # Validate every site before writing, so a file is never left half relocated
+    for site in sites:
+        new_bytes = _spelling(new_prefix, site)
+        if len(new_bytes) > site.length:
+            raise ValueError(f"Cannot relocate '{target.name}': install path ({len(new_bytes)} bytes) exceeds placeholder ({site.length} bytes)")
+    with target.open("r+b") as fh, mmap.mmap(fh.fileno(), 0) as mm:
+        for site in sites:
+            old_bytes = _spelling(old_prefix, site)
+            if mm[site.offset : site.offset + len(old_bytes)] != old_bytes:
+                raise ValueError(f"Cannot relocate '{target.name}': prefix not found at offset {site.offset}")
+        for site in sites:
+            new_bytes = _spelling(new_prefix, site)
+            mm[site.offset : site.offset + site.length] = new_bytes + b"\x00" * (site.length - len(new_bytes))
+        mm.flush()
+
+
+def _relocate_text(target: Path, sites: list[PatchSite], old_prefix: str, new_prefix: str) -> list[PatchSite]:
+    with target.open("rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        chunks: list[bytes] = []
+        new_sites = []
+        pos = out_pos = 0
+        for site in sites:
+            if mm[site.offset : site.offset + site.length] != _spelling(old_prefix, site):
+                raise ValueError(f"Cannot relocate '{target.name}': prefix not found at offset {site.offset}")
+            new_bytes = _spelling(new_prefix, site)
+            chunks.append(mm[pos : site.offset])
+            out_pos += site.offset - pos
+            new_sites.append(PatchSite(offset=out_pos, length=len(new_bytes), forward_slashes=site.forward_slashes))
+            chunks.append(new_bytes)
+            out_pos += len(new_bytes)
+            pos = site.offset + site.length
+        chunks.append(mm[pos:])
+    target.write_bytes(b"".join(chunks))
+    return new_sites
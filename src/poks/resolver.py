@@ -1,8 +1,9 @@
 """Variable expansion and archive resolution for Poks manifests."""
 
 import re
+from collections.abc import Sequence
 
-from poks.domain import PoksAppVersion, PoksArchive
+from poks.domain import PoksAppVersion, PoksArchive, PoksMirror
 
 
 def expand_variables(template: str, variables: dict[str, str]) -> str:
@@ -56,3 +57,9 @@ def resolve_download_url(version: PoksAppVersion, archive: PoksArchive) -> str:
     if archive.ext:
         variables["ext"] = archive.ext
     return expand_variables(template, variables)
+
+
+def resolve_mirror_urls(url: str, mirrors: Sequence[PoksMirror]) -> list[str]:
+    """Return the sources for *url*: its rewrites by the matching *mirrors* in order, then *url* itself."""
+    candidates = [rewritten for mirror in mirrors if (rewritten := mirror.rewrite(url))]
+    return list(dict.fromkeys([*candidates, url]))
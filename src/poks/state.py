@@ -0,0 +1,94 @@
+"""Installed-state file that indexes every installed app version."""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from py_app_dev.core.logging import logger
+
+if TYPE_CHECKING:
+    from poks.domain import PoksInstalledState
+
+STATE_FILE_NAME = ".installed.json"
+RECEIPT_FILE_NAME = ".receipt.json"
+#: Lock file in the root directory, outside ``apps/`` so that uninstalling everything leaves it empty
+STATE_LOCK_FILE_NAME = ".installed.lock"
+
+
+def load_installed_state(state_path: Path) -> PoksInstalledState | None:
+    """Load the installed-state file. Returns None if it is missing or unreadable, so callers can rebuild it."""
+    if not state_path.exists():
+        return None
+    from poks.domain import PoksInstalledState
+
+    try:
+        return PoksInstalledState.from_json_file(state_path)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Installed-state file at {state_path} is corrupted: {e}")
+        return None
+    except Exception as e:
+        logger.warning(f"Failed to load installed-state from {state_path}: {e}")
+        return None
+
+
+def save_installed_state(state: PoksInstalledState, state_path: Path) -> None:
+    """Atomically write the installed-state file so concurrent readers never see a partial file."""
+    try:
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = state_path.with_name(f"{state_path.name}.{os.getpid()}.tmp")
+        state.to_json_file(tmp_path)
+        os.replace(tmp_path, state_path)
+    except OSError as e:
+        logger.error(f"Failed to save installed-state to {state_path}: {e}")
+
+
+@contextmanager
+def state_lock(lock_path: Path) -> Iterator[None]:
+    """
+    Hold an exclusive lock on *lock_path* for a read-modify-write of the installed-state file.
+
+    The lock is a file lock, so it serializes threads and separate Poks processes sharing
+    the root directory alike.
+    """
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        _lock_file(fd)
+        try:
+            yield
+        finally:
+            _unlock_file(fd)
+    finally:
+        os.close(fd)
+
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock_file(fd: int) -> None:
+        while True:
+            try:
+                # Gives up after about 10 seconds, keep waiting for long installs of other processes
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock_file(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock_file(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _unlock_file(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
@@ -0,0 +1,186 @@
+"""Content-addressed store of unpacked archives, materialized into installs via reflinks or hardlinks."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import uuid
+from dataclasses import asdict
+from pathlib import Path
+
+from py_app_dev.core.logging import logger
+
+from poks.extractor import extract_archive, read_conda_patches
+from poks.poker import POKE_WORKERS, PatchEntry, poke
+from poks.progress import ProgressCallback
+from poks.relocation import save_relocation_index
+from poks.timings import span
+
+_CONTENT_DIR = "content"
+_PATCHES_FILE = "patches.json"
+#: Linux ``FICLONE`` ioctl request (``_IOW(0x94, 9, int)``)
+_FICLONE = 0x40049409
+
+
+def store_entry_dir(store_dir: Path, sha256: str, extract_dir: str | None = None) -> Path:
+    """Return the store entry for an archive digest, keyed separately per ``extract_dir``."""
+    if not extract_dir:
+        return store_dir / sha256
+    return store_dir / f"{sha256}-{hashlib.sha256(extract_dir.encode()).hexdigest()[:8]}"
+
+
+def is_stored(entry_dir: Path) -> bool:
+    return (entry_dir / _CONTENT_DIR).is_dir()
+
+
+def add_to_store(
+    entry_dir: Path,
+    archive_path: Path,
+    extract_dir: str | None = None,
+    progress_callback: ProgressCallback | None = None,
+    app_name: str = "",
+) -> None:
+    """
+    Extract *archive_path* into the store entry *entry_dir*.
+
+    The archive is unpacked into a private staging directory and renamed into place,
+    so concurrent installs of the same archive never see a half-populated entry.
+    Conda prefix patches are not applied; they are recorded so that
+    ``materialize`` can apply them to private copies in each install.
+    """
+    staging = entry_dir.with_name(f".tmp-{entry_dir.name}-{uuid.uuid4().hex[:8]}")
+    try:
+        extract_archive(archive_path, staging / _CONTENT_DIR, extract_dir=extract_dir, progress_callback=progress_callback, app_name=app_name, apply_patches=False)
+        patches = read_conda_patches(archive_path)
+        if extract_dir and patches:
+            # Patch paths are relative to the archive root, the stored content to extract_dir
+            prefix = extract_dir.strip("/") + "/"
+            patches = [PatchEntry(path=p.path.removeprefix(prefix), prefix_placeholder=p.prefix_placeholder, file_mode=p.file_mode) for p in patches]
+        (staging / _PATCHES_FILE).write_text(json.dumps([asdict(p) for p in patches]))
+        try:
+            staging.rename(entry_dir)
+        except OSError:
+            if not is_stored(entry_dir):
+                raise
+            # Another install stored the same archive first
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging)
+
+
+def materialize(entry_dir: Path, install_dir: Path, poke_workers: int = POKE_WORKERS) -> None:
+    """
+    Populate *install_dir* from a store entry.
+
+    Files are reflinked where the filesystem supports it, hardlinked otherwise, and
+    copied as a last resort. Files that need conda prefix patching always get a
+    private copy before being poked on at most *poke_workers* threads, so the store
+    content is never modified.
+    """
+    patches = [PatchEntry(**entry) for entry in json.loads((entry_dir / _PATCHES_FILE).read_text())]
+    linker = _Linker()
+    linker.link_tree(entry_dir / _CONTENT_DIR, install_dir, private={os.path.normpath(p.path) for p in patches})
+    if patches:
+        with span("poke") as timing:
+            save_relocation_index(install_dir, poke(install_dir, patches, workers=poke_workers))
+            timing.files = len({p.path for p in patches})
+    logger.debug(f"Materialized {install_dir} from store ({linker.mode})")
+
+
+class _Linker:
+    """Clone files with the cheapest method that works, remembering what the filesystem rejected."""
+
+    def __init__(self) -> None:
+        self.reflink = sys.platform == "linux"
+        self.hardlink = True
+        self.mode = "reflink" if self.reflink else "hardlink"
+
+    def link_tree(self, src: Path, dst: Path, private: set[str]) -> None:
+        dst.mkdir(parents=True, exist_ok=True)
+        for dirpath, dirnames, filenames in os.walk(src):
+            rel_dir = os.path.relpath(dirpath, src)
+            target_dir = dst / rel_dir
+            for name in dirnames:
+                source = Path(dirpath, name)
+                if source.is_symlink():
+                    os.symlink(os.readlink(source), target_dir / name)
+                else:
+                    (target_dir / name).mkdir(exist_ok=True)
+            for name in filenames:
+                source = Path(dirpath, name)
+                target = target_dir / name
+                if source.is_symlink():
+                    os.symlink(os.readlink(source), target)
+                elif os.path.normpath(os.path.join(rel_dir, name)) in private:
+                    shutil.copy2(source, target)
+                else:
+                    self.link_file(source, target)
+
+    def link_file(self, src: Path, dst: Path) -> None:
+        if self.reflink:
+            try:
+                _reflink(src, dst)
+                return
+            except OSError:
+                self.reflink = False
+                self.mode = "hardlink"
+        if self.hardlink:
+            try:
+                os.link(src, dst)
+                return
+            except OSError:
+                self.hardlink = False
+                self.mode = "copy"
+        shutil.copy2(src, dst)
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    """Create *dst* as a copy-on-write clone of *src* (Linux btrfs/XFS/bcachefs)."""
+    import fcntl
+
+    with src.open("rb") as src_fh, dst.open("wb") as dst_fh:
+        try:
+            fcntl.ioctl(dst_fh.fileno(), _FICLONE, src_fh.fileno())
+        except OSError:
+            dst_fh.close()
+            dst.unlink()
+            raise
+    shutil.copystat(src, dst)
+
+
+def clone_file(src: Path, dst: Path) -> str | None:
+    """
+    Atomically replace *dst* with a reflink or hardlink of *src*.
+
+    Returns the method used, or None if neither is possible (for example across
+    filesystems), in which case *dst* is left untouched.
+    """
+    linker = _Linker()
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex[:8]}.tmp")
+    if linker.reflink:
+        try:
+            _reflink(src, tmp)
+            os.replace(tmp, dst)
+            return "reflink"
+        except OSError:
+            tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+        os.replace(tmp, dst)
+        return "hardlink"
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        return None
+
+
+def break_link(path: Path) -> bool:
+    """Give a hardlinked file its own private copy so it can be modified in place. Returns True if a link was broken."""
+    if path.is_symlink() or path.stat().st_nlink <= 1:
+        return False
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    shutil.copy2(path, tmp)
+    os.replace(tmp, path)
+    return True
@@ -0,0 +1,113 @@
+"""Per-phase install timings: recording spans and exporting them as JSON lines or a summary table."""
+
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from poks.domain.models import InstallResult
+
+
+@dataclass
+class PhaseTiming:
+    """Wall-clock duration of one install phase, with the amount of work it did where that is meaningful."""
+
+    #: Phase name (e.g. 'download', 'extract', 'poke')
+    phase: str
+    #: Elapsed wall-clock time
+    seconds: float = 0.0
+    #: Bytes processed by the phase
+    bytes: int | None = None
+    #: Files processed by the phase
+    files: int | None = None
+    #: What the phase worked on when it is not the app itself (e.g. the synced bucket)
+    target: str | None = None
+
+    @property
+    def bytes_per_second(self) -> float | None:
+        return self.bytes / self.seconds if self.bytes is not None and self.seconds > 0 else None
+
+    @property
+    def files_per_second(self) -> float | None:
+        return self.files / self.seconds if self.files is not None and self.seconds > 0 else None
+
+
+_recorder: ContextVar[list[PhaseTiming] | None] = ContextVar("poks_timings", default=None)
+
+
+@contextmanager
+def record_timings() -> Iterator[list[PhaseTiming]]:
+    """
+    Collect the spans of the current context into the yielded list.
+
+    The recorder is a context variable: a plain thread does not inherit it and records
+    nothing, while work run with ``contextvars.copy_context().run`` appends to the list
+    of the context it was copied from. A worker that calls ``record_timings`` itself
+    gets its own list, which keeps the timings of parallel installs apart without
+    passing a recorder around.
+    """
+    timings: list[PhaseTiming] = []
+    token = _recorder.set(timings)
+    try:
+        yield timings
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def span(phase: str, target: str | None = None) -> Iterator[PhaseTiming]:
+    """
+    Time the enclosed block as *phase*.
+
+    Set ``bytes`` and ``files`` on the yielded timing to report the work done.
+    It is only kept if a recorder is active (see ``record_timings``); spans that raise are dropped.
+    """
+    timing = PhaseTiming(phase=phase, target=target)
+    start = time.perf_counter()
+    yield timing
+    timing.seconds = time.perf_counter() - start
+    timings = _recorder.get()
+    if timings is not None:
+        timings.append(timing)
+
+
+def timings_to_jsonl(result: InstallResult) -> str:
+    """Render all timings of *result* as JSON lines, one span per line; shared phases have no ``app``."""
+    lines = [_timing_record(None, None, timing) for timing in result.timings]
+    lines.extend(_timing_record(app.name, app.version, timing) for app in result.apps for timing in app.timings)
+    return "\n".join(json.dumps(line) for line in lines)
+
+
+def format_timings_table(result: InstallResult) -> str:
+    """Render all timings of *result* as a table with throughput columns, followed by per-phase totals."""
+    header = f"{'App':<30} {'Phase':<14} {'Seconds':>9} {'MiB/s':>9} {'Files/s':>9}"
+    rows = [header, "-" * len(header)]
+    totals: dict[str, float] = {}
+    entries = [(timing.target or "", timing) for timing in result.timings]
+    entries.extend((f"{app.name}@{app.version}", timing) for app in result.apps for timing in app.timings)
+    for label, timing in entries:
+        totals[timing.phase] = totals.get(timing.phase, 0.0) + timing.seconds
+        mib_per_second = _format_rate(timing.bytes_per_second, 1024 * 1024)
+        files_per_second = _format_rate(timing.files_per_second, 1)
+        rows.append(f"{label:<30} {timing.phase:<14} {timing.seconds:>9.3f} {mib_per_second:>9} {files_per_second:>9}")
+    rows.append("-" * len(header))
+    rows.extend(f"{'total':<30} {phase:<14} {seconds:>9.3f}" for phase, seconds in totals.items())
+    return "\n".join(rows)
+
+
+def _timing_record(app: str | None, version: str | None, timing: PhaseTiming) -> dict[str, object]:
+    record: dict[str, object] = {"app": app, "version": version, "phase": timing.phase, "seconds": round(timing.seconds, 6)}
+    for key, value in (("bytes", timing.bytes), ("files", timing.files), ("target", timing.target)):
+        if value is not None:
+            record[key] = value
+    return record
+
+
+def _format_rate(rate: float | None, unit: int) -> str:
+    return "-" if rate is None else f"{rate / unit:.1f}"
@@ -0,0 +1,206 @@
+"""
+Optional tracing of Poks operations as OpenTelemetry-style spans.
+
+Spans are only created while a ``Tracer`` is active (see ``use_tracer``); otherwise
+``trace`` hands out a shared no-op span. Finished spans are passed to an exporter
+once their root span ends: ``OtlpJsonFileExporter`` appends them to a file in the
+OTLP/JSON format read by OpenTelemetry collectors, ``InMemorySpanExporter`` keeps
+them in a list for tests.
+"""
+
+from __future__ import annotations
+
+import json
+import secrets
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Protocol
+
+from poks import __version__
+
+AttributeValue = str | int | float | bool
+
+
+@dataclass
+class TraceSpan:
+    """A timed operation with attributes, linked to its parent by ids."""
+
+    name: str
+    #: 32 hex digits, shared by all spans below the same root span
+    trace_id: str
+    #: 16 hex digits
+    span_id: str
+    parent_span_id: str | None
+    start_time_ns: int
+    end_time_ns: int = 0
+    attributes: dict[str, AttributeValue] = field(default_factory=dict)
+    #: Message of the exception that ended the span, if any
+    error: str | None = None
+
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        self.attributes[key] = value
+
+    def is_recording(self) -> bool:
+        """Whether attributes are kept; use it to skip computing expensive attributes when tracing is disabled."""
+        return True
+
+
+class _NoopSpan(TraceSpan):
+    def set_attribute(self, key: str, value: AttributeValue) -> None:
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan(name="", trace_id="", span_id="", parent_span_id=None, start_time_ns=0)
+_NOOP_CONTEXT = nullcontext(_NOOP_SPAN)
+
+
+class SpanExporter(Protocol):
+    """Receives the finished spans of a trace."""
+
+    def export(self, spans: Sequence[TraceSpan]) -> None: ...
+
+
+class InMemorySpanExporter:
+    """Keep exported spans in memory, in the order they finished."""
+
+    def __init__(self) -> None:
+        self.spans: list[TraceSpan] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[TraceSpan]) -> None:
+        with self._lock:
+            self.spans.extend(spans)
+
+    def by_name(self, name: str) -> list[TraceSpan]:
+        """Return the exported spans called *name*."""
+        return [span for span in self.spans if span.name == name]
+
+
+class OtlpJsonFileExporter:
+    """Append each exported trace as one line of OTLP/JSON (an ``ExportTraceServiceRequest``) to *path*."""
+
+    def __init__(self, path: Path, service_name: str = "poks") -> None:
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[TraceSpan]) -> None:
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                    "scopeSpans": [{"scope": {"name": "poks", "version": __version__}, "spans": [_otlp_span(span) for span in spans]}],
+                }
+            ]
+        }
+        line = json.dumps(request, separators=(",", ":")) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as fh:
+                fh.write(line)
+
+
+def _otlp_span(span: TraceSpan) -> dict[str, object]:
+    otlp: dict[str, object] = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_time_ns),
+        "endTimeUnixNano": str(span.end_time_ns),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": {"code": 2, "message": span.error} if span.error is not None else {"code": 1},
+    }
+    if span.parent_span_id:
+        otlp["parentSpanId"] = span.parent_span_id
+    return otlp
+
+
+def _otlp_attributes(attributes: dict[str, AttributeValue]) -> list[dict[str, object]]:
+    result: list[dict[str, object]] = []
+    for key, value in attributes.items():
+        # bool first, it is a subclass of int
+        if isinstance(value, bool):
+            result.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            result.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            result.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            result.append({"key": key, "value": {"stringValue": str(value)}})
+    return result
+
+
+_current_span: ContextVar[TraceSpan | None] = ContextVar("poks_current_span", default=None)
+_active_tracer: ContextVar[Tracer | None] = ContextVar("poks_active_tracer", default=None)
+
+
+class Tracer:
+    """Create spans and hand each finished trace to *exporter* when its root span ends."""
+
+    def __init__(self, exporter: SpanExporter) -> None:
+        self.exporter = exporter
+        self._pending: dict[str, list[TraceSpan]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def start_span(self, name: str, attributes: dict[str, AttributeValue] | None = None) -> Iterator[TraceSpan]:
+        """Run the enclosed block in a new span, a child of the current span if there is one."""
+        parent = _current_span.get()
+        span = TraceSpan(
+            name=name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_span_id=parent.span_id if parent else None,
+            start_time_ns=time.time_ns(),
+            attributes=dict(attributes or {}),
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = str(e) or type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_time_ns = time.time_ns()
+            self._finish(span)
+
+    def _finish(self, span: TraceSpan) -> None:
+        with self._lock:
+            spans = self._pending.setdefault(span.trace_id, [])
+            spans.append(span)
+            if span.parent_span_id is not None:
+                return
+            del self._pending[span.trace_id]
+        self.exporter.export(spans)
+
+
+@contextmanager
+def use_tracer(tracer: Tracer | None) -> Iterator[None]:
+    """Make *tracer* receive the spans created by ``trace`` in the enclosed block (``None`` disables tracing)."""
+    token = _active_tracer.set(tracer)
+    try:
+        yield
+    finally:
+        _active_tracer.reset(token)
+
+
+def trace(name: str, attributes: dict[str, AttributeValue] | None = None) -> AbstractContextManager[TraceSpan]:
+    """
+    Run the enclosed block in a span of the active tracer.
+
+    Without an active tracer this returns a shared no-op context whose span ignores attributes.
+    """
+    tracer = _active_tracer.get()
+    if tracer is None:
+        return _NOOP_CONTEXT
+    return tracer.start_span(name, attributes)
@@ -2,18 +2,25 @@
 
 from __future__ import annotations
 
+import bz2
+import gzip
 import hashlib
 import json
+import lzma
+import shutil
+import subprocess
 import tarfile
 import zipfile
-from collections.abc import Callable
+from collections.abc import Callable, Mapping
 from io import BytesIO
 from pathlib import Path
 
+import py7zr
 import zstandard
 from git import Repo
 
 from poks.domain import InstalledApp, InstallResult
+from poks.extractor import SUPPORTED_FORMATS
 
 
 def assert_install_result(result: InstallResult, expected_count: int) -> list[InstalledApp]:
@@ -37,7 +44,7 @@ def assert_installed_app(
 
 def create_archive(
     base_dir: Path,
-    files: dict[str, str],
+    files: Mapping[str, str | bytes],
     fmt: str = "tar.gz",
     top_dir: str | None = None,
     conda_patches: list[dict[str, str]] | None = None,
@@ -47,8 +54,9 @@ def create_archive(
 
     Args:
         base_dir: Directory where the archive file will be written.
-        files: Mapping of filename → text content.
-        fmt: Archive format, ``"tar.gz"``, ``"zip"``, or ``"conda"``.
+        files: Mapping of filename → text or binary content.
+        fmt: Archive format, any ``SUPPORTED_FORMATS`` extension without the leading dot
+            (e.g. ``"tar.gz"``, ``"zip"``, ``"tzst"``, ``"7z"`` or ``"conda"``).
         top_dir: Optional top-level directory inside the archive.
         conda_patches: Optional list of patch entries for .conda archives (paths.json content).
 
@@ -56,14 +64,19 @@ def create_archive(
         Tuple of (archive_path, sha256_hex).
 
     """
-    if fmt == "conda":
-        archive_path = _create_conda(base_dir, files, top_dir, patches=conda_patches)
+    kind = SUPPORTED_FORMATS.get(f".{fmt}")
+    if kind is None:
+        raise ValueError(f"Unsupported test archive format: {fmt!r}. Use one of {', '.join(ext[1:] for ext in SUPPORTED_FORMATS)}.")
+    entries = {(f"{top_dir}/{name}" if top_dir else name): content.encode() if isinstance(content, str) else content for name, content in files.items()}
+    archive_path = base_dir / f"archive.{fmt}"
+    if kind == "conda":
+        _create_conda(archive_path, entries, patches=conda_patches)
+    elif kind == "zip":
+        _create_zip(archive_path, entries)
+    elif kind == "7z":
+        _create_7z(archive_path, entries)
     else:
-        creators: dict[str, Callable[..., Path]] = {"tar.gz": _create_tar_gz, "zip": _create_zip}
-        creator = creators.get(fmt)
-        if creator is None:
-            raise ValueError(f"Unsupported test archive format: {fmt!r}. Use 'tar.gz', 'zip', or 'conda'.")
-        archive_path = creator(base_dir, files, top_dir)
+        archive_path.write_bytes(_compress(_make_tar(entries), kind.split(":")[1]))
     sha256 = hashlib.sha256(archive_path.read_bytes()).hexdigest()
     return archive_path, sha256
 
@@ -102,49 +115,53 @@ def update_test_bucket_repo(repo_dir: Path, manifests: dict[str, str]) -> str:
 # ---------------------------------------------------------------------------
 
 
-def _create_tar_gz(base_dir: Path, files: dict[str, str], top_dir: str | None) -> Path:
-    archive_path = base_dir / "archive.tar.gz"
-    with tarfile.open(archive_path, "w:gz") as tf:
-        for name, content in files.items():
-            entry_name = f"{top_dir}/{name}" if top_dir else name
-            data = content.encode()
-            info = tarfile.TarInfo(name=entry_name)
+def _make_tar(files: Mapping[str, bytes]) -> bytes:
+    tar_buf = BytesIO()
+    with tarfile.open(fileobj=tar_buf, mode="w:") as tf:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name=name)
             info.size = len(data)
             tf.addfile(info, BytesIO(data))
-    return archive_path
+    return tar_buf.getvalue()
+
 
+def _compress(data: bytes, compression: str) -> bytes:
+    if compression == "gz":
+        return gzip.compress(data)
+    if compression == "xz":
+        return lzma.compress(data)
+    if compression == "bz2":
+        return bz2.compress(data)
+    if compression == "zst":
+        return zstandard.ZstdCompressor().compress(data)
+    if shutil.which("lz4"):
+        return subprocess.run(["lz4", "-q", "-c"], input=data, capture_output=True, check=True).stdout  # noqa: S607
+    import lz4.frame
 
-def _create_zip(base_dir: Path, files: dict[str, str], top_dir: str | None) -> Path:
-    archive_path = base_dir / "archive.zip"
+    return lz4.frame.compress(data)
+
+
+def _create_zip(archive_path: Path, files: Mapping[str, bytes]) -> None:
     with zipfile.ZipFile(archive_path, "w") as zf:
-        for name, content in files.items():
-            entry_name = f"{top_dir}/{name}" if top_dir else name
-            zf.writestr(entry_name, content)
-    return archive_path
+        for name, data in files.items():
+            zf.writestr(name, data)
 
 
-def _make_tar_zst(files: dict[str, bytes]) -> bytes:
-    """Build a tar.zst archive in memory from a dict of name -> bytes."""
-    tar_buf = BytesIO()
-    with tarfile.open(fileobj=tar_buf, mode="w:") as tf:
+def _create_7z(archive_path: Path, files: Mapping[str, bytes]) -> None:
+    with py7zr.SevenZipFile(archive_path, "w") as sz:
         for name, data in files.items():
-            info = tarfile.TarInfo(name=name)
-            info.size = len(data)
-            tf.addfile(info, BytesIO(data))
-    cctx = zstandard.ZstdCompressor()
-    return cctx.compress(tar_buf.getvalue())
+            sz.writef(BytesIO(data), name)
 
 
-def _create_conda(
-    base_dir: Path,
-    files: dict[str, str],
-    top_dir: str | None,
-    patches: list[dict[str, str]] | None = None,
-) -> Path:
+def _make_tar_zst(files: Mapping[str, bytes]) -> bytes:
+    """Build a tar.zst archive in memory from a dict of name -> bytes."""
+    return _compress(_make_tar(files), "zst")
+
+
+def _create_conda(archive_path: Path, files: Mapping[str, bytes], patches: list[dict[str, str]] | None = None) -> None:
     """Build a .conda archive (zip with pkg-*.tar.zst and info-*.tar.zst inside)."""
     pkg_name = "test-pkg-1.0-h0_0"
-    pkg_files = {(f"{top_dir}/{name}" if top_dir else name): content.encode() for name, content in files.items()}
-    pkg_tar_zst = _make_tar_zst(pkg_files)
+    pkg_tar_zst = _make_tar_zst(files)
 
     paths_json: dict[str, list[dict[str, str]]] = {"paths": patches or []}
     info_files = {"paths.json": json.dumps(paths_json).encode()}
@@ -152,9 +169,7 @@ def _create_conda(
 
     metadata = json.dumps({"conda_pkg_format_version": 2}).encode()
 
-    archive_path = base_dir / "archive.conda"
     with zipfile.ZipFile(archive_path, "w") as zf:
         zf.writestr("metadata.json", metadata)
         zf.writestr(f"pkg-{pkg_name}.tar.zst", pkg_tar_zst)
         zf.writestr(f"info-{pkg_name}.tar.zst", info_tar_zst)
-    return archive_path
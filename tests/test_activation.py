@@ -0,0 +1,118 @@
+"""Tests for the cached shell activation behind ``poks env``."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from py_app_dev.core.exceptions import UserNotificationException
+from typer.testing import CliRunner
+
+from poks.activation import Activation, Shell, get_activation, render_activation
+from poks.domain import PoksApp, PoksAppVersion, PoksBucket, PoksConfig, PoksManifest
+from poks.main import app
+from tests.conftest import PoksEnv
+
+runner = CliRunner()
+
+
+def _install_fake_app(env: PoksEnv, name: str, version: str, bin_dirs: list[str] | None = None, env_vars: dict[str, str] | None = None) -> Path:
+    install_dir = env.apps_dir / name / version
+    install_dir.mkdir(parents=True)
+    manifest = PoksManifest(description=name, versions=[PoksAppVersion(version=version, archives=[], bin_dirs=bin_dirs, env=env_vars)])
+    (install_dir / ".manifest.json").write_text(manifest.to_json_string())
+    return install_dir
+
+
+def _write_config(env: PoksEnv, apps: list[PoksApp]) -> Path:
+    config_path = env.root_dir / "poks.json"
+    PoksConfig(buckets=[PoksBucket(name="test", url=env.bucket_url)], apps=apps).to_json_file(config_path)
+    return config_path
+
+
+def test_activation_collects_config_apps(poks_env: PoksEnv) -> None:
+    tool_dir = _install_fake_app(poks_env, "tool", "1.0.0", bin_dirs=["bin"], env_vars={"TOOL_HOME": "${dir}"})
+    _install_fake_app(poks_env, "other", "2.0.0", bin_dirs=["bin"])
+    config_path = _write_config(poks_env, [PoksApp(name="tool", version="1.0.0", bucket="test")])
+
+    activation = get_activation(config_path, poks_env.root_dir)
+
+    assert activation == Activation(dirs=[str(tool_dir / "bin")], env={"TOOL_HOME": str(tool_dir)})
+
+
+def test_activation_skips_unsupported_platform(poks_env: PoksEnv) -> None:
+    _install_fake_app(poks_env, "tool", "1.0.0", bin_dirs=["bin"])
+    config_path = _write_config(poks_env, [PoksApp(name="win-only", version="1.0.0", bucket="test", os=["windows"])])
+
+    with patch("poks.platform.get_current_platform", return_value=("linux", "x86_64")):
+        assert get_activation(config_path, poks_env.root_dir) == Activation(dirs=[], env={})
+
+
+def test_activation_requires_installed_apps(poks_env: PoksEnv) -> None:
+    config_path = _write_config(poks_env, [PoksApp(name="missing", version="1.0.0", bucket="test")])
+
+    with pytest.raises(UserNotificationException, match=r"missing@1\.0\.0 is not installed"):
+        get_activation(config_path, poks_env.root_dir)
+
+
+def test_activation_served_from_cache(poks_env: PoksEnv) -> None:
+    _install_fake_app(poks_env, "tool", "1.0.0", bin_dirs=["bin"])
+    config_path = _write_config(poks_env, [PoksApp(name="tool", version="1.0.0", bucket="test")])
+    first = get_activation(config_path, poks_env.root_dir)
+
+    with patch("poks.activation._compute_activation", side_effect=AssertionError("cache not used")):
+        assert get_activation(config_path, poks_env.root_dir) == first
+
+
+def test_activation_cache_invalidated_by_config_change(poks_env: PoksEnv) -> None:
+    tool_dir = _install_fake_app(poks_env, "tool", "1.0.0", bin_dirs=["bin"])
+    other_dir = _install_fake_app(poks_env, "other", "2.0.0", bin_dirs=["bin"])
+    config_path = _write_config(poks_env, [PoksApp(name="tool", version="1.0.0", bucket="test")])
+    assert get_activation(config_path, poks_env.root_dir).dirs == [str(tool_dir / "bin")]
+
+    _write_config(poks_env, [PoksApp(name="tool", version="1.0.0", bucket="test"), PoksApp(name="other", version="2.0.0", bucket="test")])
+
+    assert get_activation(config_path, poks_env.root_dir).dirs == [str(tool_dir / "bin"), str(other_dir / "bin")]
+
+
+def test_activation_cache_invalidated_by_installed_state_change(poks_env: PoksEnv) -> None:
+    _install_fake_app(poks_env, "tool", "1.0.0", bin_dirs=["bin"])
+    config_path = _write_config(poks_env, [PoksApp(name="tool", version="1.0.0", bucket="test")])
+    get_activation(config_path, poks_env.root_dir)
+
+    poks_env.poks.uninstall("tool", "1.0.0")
+
+    with pytest.raises(UserNotificationException, match="not installed"):
+        get_activation(config_path, poks_env.root_dir)
+
+
+@pytest.mark.parametrize(
+    ("shell", "expected"),
+    [
+        (Shell.BASH, "export PATH='/opt/a b':'/opt/c':\"$PATH\"\nexport HOME_DIR='/opt/it'\"'\"'s'"),
+        (Shell.FISH, "set -gx PATH '/opt/a b' '/opt/c' $PATH\nset -gx HOME_DIR '/opt/it\\'s'"),
+        (Shell.PWSH, f"$env:PATH = '/opt/a b{os.pathsep}/opt/c' + [IO.Path]::PathSeparator + $env:PATH\n$env:HOME_DIR = '/opt/it''s'"),
+        (Shell.CMD, 'set "PATH=/opt/a b;/opt/c;%PATH%"\nset "HOME_DIR=/opt/it\'s"'),
+    ],
+)
+def test_render_activation(shell: Shell, expected: str) -> None:
+    activation = Activation(dirs=["/opt/a b", "/opt/c"], env={"HOME_DIR": "/opt/it's"})
+    assert render_activation(activation, shell) == expected
+
+
+def test_render_activation_json() -> None:
+    activation = Activation(dirs=["/opt/a"], env={"K": "v"})
+    assert json.loads(render_activation(activation, Shell.JSON)) == {"dirs": ["/opt/a"], "env": {"K": "v"}}
+
+
+def test_cli_env_command(poks_env: PoksEnv) -> None:
+    tool_dir = _install_fake_app(poks_env, "tool", "1.0.0", bin_dirs=["bin"])
+    config_path = _write_config(poks_env, [PoksApp(name="tool", version="1.0.0", bucket="test")])
+
+    result = runner.invoke(app, ["env", "-c", str(config_path), "--shell", "json", "--root", str(poks_env.root_dir)])
+
+    assert result.exit_code == 0
+    assert json.loads(result.stdout) == {"dirs": [str(tool_dir / "bin")], "env": {}}
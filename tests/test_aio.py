@@ -0,0 +1,151 @@
+"""Tests for the asyncio facade."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from poks.aio import AsyncPoks, ProgressEvent
+from poks.domain import PoksAppVersion, PoksArchive, PoksConfig, PoksManifest
+from poks.downloader import cache_path_for
+from poks.poks import Poks
+from tests.conftest import PoksEnv
+from tests.helpers import create_archive
+
+PLATFORM_PATCH = patch("poks.poks.get_current_platform", return_value=("linux", "x86_64"))
+
+
+def _add_app(poks_env: PoksEnv, name: str, base_url: str | None = None) -> Path:
+    archive_dir = poks_env.archives_dir / name
+    archive_dir.mkdir()
+    archive, sha256 = create_archive(archive_dir, {f"bin/{name}": "#!/bin/sh\n" * 1000})
+    url = f"{base_url}/{name}/{archive.name}" if base_url else archive.as_uri()
+    poks_env.add_manifest(
+        name,
+        PoksManifest(description=name, versions=[PoksAppVersion(version="1.0", url=url, archives=[PoksArchive(os="linux", arch="x86_64", sha256=sha256)])]),
+    )
+    return archive
+
+
+@contextmanager
+def _serve(directory: Path) -> Iterator[str]:
+    """Serve *directory* over HTTP in a thread and yield its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(SimpleHTTPRequestHandler, directory=str(directory)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_install_reports_progress(poks_env: PoksEnv) -> None:
+    archive = _add_app(poks_env, "tool")
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+
+    async def main() -> tuple[list[ProgressEvent], list[str]]:
+        async with AsyncPoks(poks_env.root_dir) as poks:
+            events: list[ProgressEvent] = []
+
+            async def collect() -> None:
+                events.extend([event async for event in poks.progress()])
+
+            collector = asyncio.create_task(collect())
+            await asyncio.sleep(0)
+            await poks.install(config_path)
+            installed = await poks.list_installed()
+        await collector
+        return events, [app.name for app in installed.apps]
+
+    with PLATFORM_PATCH:
+        events, installed = asyncio.run(main())
+
+    assert installed == ["tool"]
+    downloads = [event for event in events if event.kind == "download"]
+    assert downloads[-1] == ProgressEvent("download", "tool", archive.stat().st_size, archive.stat().st_size)
+    assert any(event.kind == "extract" for event in events)
+
+
+def test_concurrent_installs_share_the_loop(poks_env: PoksEnv) -> None:
+    for name in ("one", "two", "three"):
+        _add_app(poks_env, name)
+    poks_env.create_config([{"name": "one", "version": "1.0"}])
+
+    async def main() -> list[str]:
+        async with AsyncPoks(poks_env.root_dir, max_workers=2) as poks:
+            # Registers the test bucket, then the apps are installed from it by name
+            await poks.install(poks_env.root_dir / "poks.json")
+            installed = await asyncio.gather(*(poks.install_app(name, "1.0", "test") for name in ("two", "three")))
+        return [app.name for app in installed]
+
+    with PLATFORM_PATCH:
+        assert asyncio.run(main()) == ["two", "three"]
+    assert sorted(path.name for path in poks_env.apps_dir.iterdir() if path.is_dir()) == ["one", "three", "two"]
+
+
+def test_pending_downloads_skips_installed_and_cached(poks_env: PoksEnv) -> None:
+    for name in ("one", "two", "three"):
+        _add_app(poks_env, name)
+    config_path = poks_env.create_config([{"name": name, "version": "1.0"} for name in ("one", "two", "three")])
+    poks = Poks(poks_env.root_dir, progress_callback=None, extract_callback=None)
+
+    with PLATFORM_PATCH:
+        pending = poks.pending_downloads(config_path)
+        assert [entry.app for entry in pending] == ["one", "two", "three"]
+        (poks.apps_dir / "one" / "1.0").mkdir(parents=True)
+        poks.cache_dir.mkdir(exist_ok=True)
+        cache_path_for(pending[1].url, poks.cache_dir).write_bytes(b"")
+
+        assert [entry.app for entry in poks.pending_downloads(config_path)] == ["three"]
+
+
+def test_install_downloads_on_the_loop(poks_env: PoksEnv) -> None:
+    pytest.importorskip("httpx")
+    with _serve(poks_env.archives_dir) as base_url:
+        archive = _add_app(poks_env, "tool", base_url)
+        config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+
+        async def main() -> list[ProgressEvent]:
+            async with AsyncPoks(poks_env.root_dir) as poks:
+                events: list[ProgressEvent] = []
+
+                async def collect() -> None:
+                    events.extend([event async for event in poks.progress()])
+
+                collector = asyncio.create_task(collect())
+                await asyncio.sleep(0)
+                await poks.install(config_path)
+            await collector
+            return events
+
+        # The install finds the archive in the cache, the worker threads never download
+        with PLATFORM_PATCH, patch("poks.downloader.download_file", side_effect=AssertionError("downloaded on a worker thread")):
+            events = asyncio.run(main())
+
+    assert ProgressEvent("download", "tool", archive.stat().st_size, archive.stat().st_size) in events
+    assert (poks_env.apps_dir / "tool" / "1.0" / "bin" / "tool").is_file()
+
+
+def test_failed_download_is_left_to_the_install(poks_env: PoksEnv) -> None:
+    pytest.importorskip("httpx")
+    with _serve(poks_env.archives_dir) as base_url:
+        _add_app(poks_env, "tool", f"{base_url}/nowhere")
+        config = PoksConfig.from_json_file(poks_env.create_config([{"name": "tool", "version": "1.0"}]))
+
+        async def main() -> None:
+            async with AsyncPoks(poks_env.root_dir) as poks:
+                await poks._fetch(config)
+
+        with PLATFORM_PATCH:
+            asyncio.run(main())
+
+    assert list((poks_env.root_dir / "cache").iterdir()) == []
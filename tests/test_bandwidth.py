@@ -0,0 +1,125 @@
+"""Tests for the shared download bandwidth limiter."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from poks.bandwidth import BandwidthLimiter, parse_rate
+from poks.domain import PoksAppVersion, PoksArchive, PoksManifest
+from poks.downloader import download_file
+from poks.poks import Poks
+from tests.conftest import PoksEnv
+
+KIB = 1024
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("2048", 2048),
+        ("500K", 500 * KIB),
+        ("10M", 10 * KIB * KIB),
+        ("1.5MB/s", int(1.5 * KIB * KIB)),
+        ("1g", KIB**3),
+        ("64 KiB", 64 * KIB),
+    ],
+)
+def test_parse_rate(value: str, expected: int) -> None:
+    assert parse_rate(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "0", "fast", "10X", "-1M"])
+def test_parse_rate_invalid(value: str) -> None:
+    with pytest.raises(ValueError, match="Invalid bandwidth"):
+        parse_rate(value)
+
+
+def test_download_is_throttled(tmp_path: Path) -> None:
+    source = tmp_path / "archive.bin"
+    source.write_bytes(bytes(256 * KIB))
+    limiter = BandwidthLimiter(KIB * KIB, burst=64 * KIB)
+
+    start = time.monotonic()
+    download_file(source.as_uri(), tmp_path / "copy.bin", limiter=limiter)
+    elapsed = time.monotonic() - start
+
+    # The first 64 KiB are the burst, the remaining 192 KiB take 3/16 s
+    assert elapsed >= 0.15
+    assert (tmp_path / "copy.bin").stat().st_size == 256 * KIB
+
+
+def test_small_download_goes_first() -> None:
+    limiter = BandwidthLimiter(256 * KIB, burst=64 * KIB)
+    limiter.acquire(64 * KIB)
+    finished: list[str] = []
+
+    def download(name: str, remaining: int | None) -> None:
+        limiter.acquire(32 * KIB, remaining)
+        finished.append(name)
+
+    big = threading.Thread(target=download, args=("big", None))
+    big.start()
+    deadline = time.monotonic() + 5
+    while not limiter._waiting and time.monotonic() < deadline:
+        time.sleep(0.001)
+    small = threading.Thread(target=download, args=("small", 10 * KIB))
+    small.start()
+    big.join(5)
+    small.join(5)
+
+    assert finished == ["small", "big"]
+
+
+def test_large_download_is_not_starved_by_small_ones() -> None:
+    limiter = BandwidthLimiter(4 * KIB * KIB, burst=64 * KIB)
+    stop = threading.Event()
+
+    def small_downloads() -> None:
+        while not stop.is_set():
+            limiter.acquire(16 * KIB, KIB)
+
+    smalls = [threading.Thread(target=small_downloads) for _ in range(2)]
+    for thread in smalls:
+        thread.start()
+
+    def big_download() -> None:
+        for _ in range(4):
+            limiter.acquire(16 * KIB)
+
+    big = threading.Thread(target=big_download)
+    big.start()
+    big.join(5)
+    stop.set()
+    for thread in smalls:
+        thread.join(5)
+
+    assert not big.is_alive()
+
+
+def test_install_with_bandwidth_limit(poks_env: PoksEnv) -> None:
+    # Random text compresses poorly, so the archive is large enough to be throttled
+    archive, sha256 = poks_env.make_archive({"bin/tool": os.urandom(192 * KIB).hex()})
+    poks_env.add_manifest(
+        "tool",
+        PoksManifest(description="Tool", versions=[PoksAppVersion(version="1.0", url=archive.as_uri(), archives=[PoksArchive(os="linux", arch="x86_64", sha256=sha256)])]),
+    )
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+    poks = Poks(root_dir=poks_env.root_dir, max_bandwidth=parse_rate("1M"))
+    assert poks.limiter is not None
+    # Everything beyond the initial burst is transferred at the limited rate
+    throttled_seconds = (archive.stat().st_size - poks.limiter.burst) / poks.limiter.rate
+
+    start = time.monotonic()
+    with patch("poks.poks.get_current_platform", return_value=("linux", "x86_64")):
+        result = poks.install(config_path)
+    elapsed = time.monotonic() - start
+
+    assert throttled_seconds > 0.1
+    assert elapsed >= throttled_seconds
+    assert (result.apps[0].install_dir / "bin" / "tool").is_file()
@@ -0,0 +1,197 @@
+"""Tests for offline bundles (poks bundle create / install --from-bundle) and cross-platform prefetching."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from py_app_dev.core.exceptions import UserNotificationException
+from typer.testing import CliRunner
+
+from poks.bundle import BundleError, open_bundle, write_bundle
+from poks.domain import PoksApp, PoksAppVersion, PoksArchive, PoksBundleArchive, PoksBundleIndex, PoksConfig, PoksManifest
+from poks.main import app
+from poks.poks import Poks
+from tests.conftest import PoksEnv
+from tests.helpers import create_archive
+
+PLATFORM_PATCH = patch("poks.poks.get_current_platform", return_value=("linux", "x86_64"))
+PLATFORMS = [("linux", "x86_64"), ("windows", "x86_64")]
+runner = CliRunner()
+
+
+def _add_tool(poks_env: PoksEnv) -> dict[str, Path]:
+    """Add a ``tool`` manifest with one archive for Linux and one shared by Windows and macOS."""
+    linux, linux_sha = poks_env.make_archive({"bin/tool": "linux"})
+    other, other_sha = poks_env.make_archive({"bin/tool.exe": "other"}, fmt="zip")
+    poks_env.add_manifest(
+        "tool",
+        PoksManifest(
+            description="Tool",
+            versions=[
+                PoksAppVersion(
+                    version="1.0",
+                    url=poks_env.archives_dir.as_uri() + "/archive${ext}",
+                    archives=[
+                        PoksArchive(os="linux", arch="x86_64", ext=".tar.gz", sha256=linux_sha),
+                        PoksArchive(os="windows", arch="x86_64", ext=".zip", sha256=other_sha),
+                        PoksArchive(os="macos", arch="aarch64", ext=".zip", sha256=other_sha),
+                    ],
+                ),
+                PoksAppVersion(version="0.9", yanked="broken", archives=[]),
+            ],
+        ),
+    )
+    return {"linux": linux, "other": other}
+
+
+def test_bundle_round_trip(poks_env: PoksEnv, tmp_path: Path) -> None:
+    archives = _add_tool(poks_env)
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+    bundle_path = tmp_path / "tools.bundle"
+
+    index = poks_env.poks.create_bundle(config_path, PLATFORMS, bundle_path)
+
+    assert index.platforms == ["linux/x86_64", "windows/x86_64"]
+    assert [(entry.os, entry.size) for entry in index.archives] == [("linux", archives["linux"].stat().st_size), ("windows", archives["other"].stat().st_size)]
+    assert [v.version for v in index.manifests["test"]["tool"].versions] == ["1.0"]
+
+    # The air-gapped machine: neither the archives nor the bucket are reachable
+    for archive in archives.values():
+        archive.unlink()
+    offline = Poks(root_dir=tmp_path / "offline")
+    with PLATFORM_PATCH:
+        result = offline.install_from_bundle(bundle_path)
+
+    assert (result.apps[0].install_dir / "bin" / "tool").read_text() == "linux"
+    assert [t.phase for t in result.timings] == ["bundle read"]
+
+
+def test_bundle_with_two_versions_of_an_app(poks_env: PoksEnv, tmp_path: Path) -> None:
+    versions = []
+    for version in ("1.0", "2.0"):
+        archive_dir = poks_env.archives_dir / version
+        archive_dir.mkdir()
+        archive, sha256 = create_archive(archive_dir, {"bin/tool": version})
+        versions.append(PoksAppVersion(version=version, url=archive.as_uri(), archives=[PoksArchive(os="linux", arch="x86_64", sha256=sha256)]))
+    poks_env.add_manifest("tool", PoksManifest(description="Tool", versions=versions))
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}, {"name": "tool", "version": "2.0"}])
+    bundle_path = tmp_path / "tools.bundle"
+
+    index = poks_env.poks.create_bundle(config_path, [("linux", "x86_64")], bundle_path)
+    with PLATFORM_PATCH:
+        result = Poks(root_dir=tmp_path / "offline").install_from_bundle(bundle_path)
+
+    assert [v.version for v in index.manifests["test"]["tool"].versions] == ["1.0", "2.0"]
+    assert sorted((app.version, (app.install_dir / "bin" / "tool").read_text()) for app in result.apps) == [("1.0", "1.0"), ("2.0", "2.0")]
+
+
+def test_bundle_stores_shared_archives_once(poks_env: PoksEnv, tmp_path: Path) -> None:
+    archives = _add_tool(poks_env)
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+    bundle_path = tmp_path / "tools.bundle"
+
+    index = poks_env.poks.create_bundle(config_path, [("windows", "x86_64"), ("macos", "aarch64")], bundle_path)
+
+    assert len(index.archives) == 2
+    assert index.archives[0].offset == index.archives[1].offset
+    assert bundle_path.stat().st_size < 2 * archives["other"].stat().st_size + 4096
+    with open_bundle(bundle_path) as bundle:
+        copy = bundle.copy_archive(bundle.archives_for("macos", "aarch64")[0], tmp_path / "copy.zip")
+    assert copy.read_bytes() == archives["other"].read_bytes()
+
+
+def test_bundle_without_current_platform(poks_env: PoksEnv, tmp_path: Path) -> None:
+    _add_tool(poks_env)
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+    bundle_path = tmp_path / "tools.bundle"
+    poks_env.poks.create_bundle(config_path, [("windows", "x86_64")], bundle_path)
+
+    with PLATFORM_PATCH, pytest.raises(UserNotificationException, match="no archives for linux/x86_64"):
+        Poks(root_dir=tmp_path / "offline").install_from_bundle(bundle_path)
+
+
+def test_bundle_requires_archive_for_every_platform(poks_env: PoksEnv, tmp_path: Path) -> None:
+    _add_tool(poks_env)
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+
+    with pytest.raises(UserNotificationException, match="Cannot bundle 'tool'"):
+        poks_env.poks.create_bundle(config_path, [("linux", "aarch64")], tmp_path / "tools.bundle")
+    assert not (tmp_path / "tools.bundle").exists()
+
+
+def test_open_invalid_bundle(tmp_path: Path) -> None:
+    not_a_bundle = tmp_path / "tools.bundle"
+    not_a_bundle.write_bytes(b"PK\x03\x04" + bytes(64))
+
+    with pytest.raises(BundleError, match="not a Poks bundle"), open_bundle(not_a_bundle):
+        pass
+
+
+@pytest.mark.parametrize(
+    "index",
+    [
+        PoksBundleIndex(config=PoksConfig(), platforms=[], manifests={"../escape": {}}),
+        PoksBundleIndex(config=PoksConfig(), platforms=[], manifests={"test": {"../../escape": PoksManifest(description="Tool", versions=[])}}),
+        PoksBundleIndex(config=PoksConfig(apps=[PoksApp(name="tool", version="../../escape", bucket="test")]), platforms=[]),
+        PoksBundleIndex(config=PoksConfig(), platforms=[], archives=[PoksBundleArchive(app="..", version="1.0", os="linux", arch="x86_64", url="file:///t.zip", sha256="0")]),
+    ],
+)
+def test_open_bundle_rejects_paths_outside_their_directory(tmp_path: Path, index: PoksBundleIndex) -> None:
+    bundle_path = tmp_path / "tools.bundle"
+    (tmp_path / "t.zip").write_bytes(b"PK")
+    write_bundle(bundle_path, index, {"0": tmp_path / "t.zip"})
+
+    with pytest.raises(BundleError, match="is not a valid bucket, app or version name"), open_bundle(bundle_path):
+        pass
+
+
+def test_bundle_cli(poks_env: PoksEnv, tmp_path: Path) -> None:
+    _add_tool(poks_env)
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+    bundle_path = tmp_path / "tools.bundle"
+
+    created = runner.invoke(
+        app,
+        ["bundle", "create", "-c", str(config_path), "--platform", "linux/x86_64", "--platform", "windows/x86_64", "-o", str(bundle_path), "--root", str(poks_env.root_dir)],
+    )
+    with PLATFORM_PATCH:
+        installed = runner.invoke(app, ["install", "--from-bundle", str(bundle_path), "--root", str(tmp_path / "offline")])
+    invalid = runner.invoke(app, ["bundle", "create", "-c", str(config_path), "--platform", "linux", "-o", str(bundle_path)])
+
+    assert created.exit_code == 0, created.output
+    assert "2 archives for linux/x86_64, windows/x86_64" in created.stdout
+    assert installed.exit_code == 0, installed.output
+    assert (tmp_path / "offline" / "apps" / "tool" / "1.0" / "bin" / "tool").is_file()
+    assert invalid.exit_code != 0
+
+
+def test_prefetch_all_platforms(poks_env: PoksEnv) -> None:
+    archives = _add_tool(poks_env)
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+
+    fetched = poks_env.poks.prefetch(config_path)
+    again = poks_env.poks.prefetch(config_path, [("linux", "x86_64")])
+
+    assert {result.path.read_bytes() for result in fetched.values()} == {archive.read_bytes() for archive in archives.values()}
+    assert all(result.downloaded for result in fetched.values())
+    assert [result.downloaded for result in again.values()] == [False]
+    assert not poks_env.apps_dir.joinpath("tool").exists()
+
+
+def test_prefetch_skips_missing_platforms(poks_env: PoksEnv) -> None:
+    _add_tool(poks_env)
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+
+    assert poks_env.poks.prefetch(config_path, [("linux", "aarch64")]) == {}
+
+
+def test_fetch_cli(poks_env: PoksEnv) -> None:
+    _add_tool(poks_env)
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+
+    result = runner.invoke(app, ["fetch", "-c", str(config_path), "--platform", "windows/x86_64", "--platform", "macos/aarch64", "--root", str(poks_env.root_dir)])
+
+    assert result.exit_code == 0, result.output
+    assert "Fetched 1 archives (1 downloaded, 0 already cached)" in result.stdout
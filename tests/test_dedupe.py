@@ -0,0 +1,126 @@
+"""Tests for deduplicating files across installed app versions."""
+
+from __future__ import annotations
+
+import os
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from poks.dedupe import dedupe, find_duplicates
+from poks.domain import PoksAppVersion, PoksManifest
+from poks.main import app
+from poks.poker import PatchEntry, poke
+from poks.relocation import save_relocation_index
+from poks.state import load_installed_state
+from tests.conftest import PoksEnv
+
+runner = CliRunner()
+
+
+def _install_fake_app(env: PoksEnv, name: str, version: str, files: dict[str, str]) -> Path:
+    install_dir = env.apps_dir / name / version
+    for rel_path, content in files.items():
+        path = install_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    manifest = PoksManifest(description=name, versions=[PoksAppVersion(version=version, archives=[])])
+    (install_dir / ".manifest.json").write_text(manifest.to_json_string())
+    return install_dir
+
+
+def test_unique_sizes_are_never_hashed(tmp_path: Path) -> None:
+    (tmp_path / "a").write_text("short")
+    (tmp_path / "b").write_text("a bit longer")
+
+    with patch("poks.dedupe._head_digest", side_effect=AssertionError("hashed")):
+        assert find_duplicates([tmp_path]) == []
+
+
+def test_same_size_different_content_not_grouped(tmp_path: Path) -> None:
+    (tmp_path / "a").write_text("aaaa")
+    (tmp_path / "b").write_text("bbbb")
+    (tmp_path / "c").write_text("aaaa")
+
+    groups = find_duplicates([tmp_path])
+
+    assert [sorted(ref.path.name for ref in group) for group in groups] == [["a", "c"]]
+
+
+def test_dedupe_links_identical_files(tmp_path: Path) -> None:
+    first = tmp_path / "one"
+    second = tmp_path / "two"
+    for root in (first, second):
+        (root / "lib").mkdir(parents=True)
+        (root / "lib" / "shared.so").write_bytes(b"\x7fELF" * 1024)
+    (second / "own.txt").write_text("unique")
+
+    result = dedupe([first, second])
+
+    assert result.files_linked == 1
+    assert result.bytes_saved == 4096
+    assert result.linked == {second: ["lib/shared.so"]}
+    assert (second / "lib" / "shared.so").read_bytes() == b"\x7fELF" * 1024
+
+    # Already linked files are not linked again
+    assert dedupe([first, second]).files_linked == (0 if os.path.samefile(first / "lib" / "shared.so", second / "lib" / "shared.so") else 1)
+
+
+def test_poks_dedupe_records_state_and_survives_uninstall(poks_env: PoksEnv) -> None:
+    files = {"bin/tool": "#!/bin/sh\necho tool\n", "share/data.txt": "payload"}
+    _install_fake_app(poks_env, "tool", "1.0.0", files)
+    newer_dir = _install_fake_app(poks_env, "tool", "1.1.0", {**files, "share/new.txt": "new"})
+
+    result = poks_env.poks.dedupe()
+
+    assert result.files_linked == 2
+    state = load_installed_state(poks_env.poks.state_path)
+    assert state is not None
+    linked_entries = [entry for entry in state.apps if entry.deduped]
+    assert len(linked_entries) == 1
+    assert linked_entries[0].deduped == ["bin/tool", "share/data.txt"]
+
+    poks_env.poks.uninstall("tool", "1.0.0")
+
+    state = load_installed_state(poks_env.poks.state_path)
+    assert state is not None
+    assert [entry.version for entry in state.apps] == ["1.1.0"]
+    assert (newer_dir / "bin" / "tool").read_text() == "#!/bin/sh\necho tool\n"
+    assert (newer_dir / "share" / "data.txt").read_text() == "payload"
+
+
+def test_relocate_unshares_deduped_files(poks_env: PoksEnv, tmp_path: Path) -> None:
+    placeholder = "/opt/anaconda1anaconda2anaconda3"
+    old_dir = tmp_path / "old"
+    files = {"bin/tool": f"exec {placeholder}/bin/real\n", "share/data.txt": "payload"}
+    for rel_path, content in files.items():
+        (old_dir / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (old_dir / rel_path).write_text(content)
+    save_relocation_index(old_dir, poke(old_dir, [PatchEntry(path="bin/tool", prefix_placeholder=placeholder, file_mode="text")]))
+    # Both versions were moved from the same prefix, so their patched files are identical
+    install_dirs = []
+    for version in ("1.0.0", "1.1.0"):
+        shutil.copytree(old_dir, poks_env.apps_dir / "tool" / version)
+        install_dirs.append(_install_fake_app(poks_env, "tool", version, {}))
+    assert poks_env.poks.dedupe().files_linked == 3
+
+    assert poks_env.poks.relocate() == 2
+
+    for install_dir in install_dirs:
+        assert (install_dir / "bin" / "tool").read_text() == f"exec {install_dir}/bin/real\n"
+        assert (install_dir / "share" / "data.txt").read_text() == "payload"
+    state = load_installed_state(poks_env.poks.state_path)
+    assert state is not None
+    assert [entry.deduped for entry in state.apps if entry.deduped] == [[".relocation.json", "share/data.txt"]]
+
+
+def test_cli_dedupe_command(poks_env: PoksEnv) -> None:
+    _install_fake_app(poks_env, "tool", "1.0.0", {"data.bin": "x" * 2048})
+    _install_fake_app(poks_env, "other", "1.0.0", {"data.bin": "x" * 2048})
+
+    result = runner.invoke(app, ["dedupe", "--root", str(poks_env.root_dir)])
+
+    assert result.exit_code == 0
+    assert "Linked 1 duplicate files" in result.stdout
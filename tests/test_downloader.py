@@ -3,6 +3,9 @@
 from __future__ import annotations
 
 import hashlib
+import threading
+import time
+from collections.abc import Iterator
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -12,7 +15,8 @@ import requests
 from poks.downloader import (
     DownloadError,
     HashMismatchError,
-    _cache_path_for,
+    cache_path_for,
+    download_fastest,
     download_file,
     get_cached_or_download,
     verify_sha256,
@@ -39,7 +43,7 @@ def _mock_requests_get(content_length: str | None = None) -> MagicMock:
 def test_download_file_success(tmp_path: Path) -> None:
     dest = tmp_path / "sub" / "archive.tar.gz"
 
-    with patch("poks.downloader.requests.get", _mock_requests_get()):
+    with patch("requests.get", _mock_requests_get()):
         result = download_file("https://example.com/archive.tar.gz", dest)
 
     assert result == dest
@@ -50,7 +54,7 @@ def test_download_file_network_error(tmp_path: Path) -> None:
     dest = tmp_path / "archive.tar.gz"
 
     with (
-        patch("poks.downloader.requests.get", side_effect=requests.RequestException("connection refused")),
+        patch("requests.get", side_effect=requests.RequestException("connection refused")),
         pytest.raises(DownloadError, match="connection refused"),
     ):
         download_file("https://example.com/archive.tar.gz", dest)
@@ -81,10 +85,10 @@ def test_cached_file_reused(tmp_path: Path) -> None:
     url = "https://example.com/archive.tar.gz"
     cache_dir = tmp_path / "cache"
     cache_dir.mkdir()
-    cached_file = _cache_path_for(url, cache_dir)
+    cached_file = cache_path_for(url, cache_dir)
     cached_file.write_bytes(SAMPLE_CONTENT)
 
-    with patch("poks.downloader.requests.get") as mock_dl:
+    with patch("requests.get") as mock_dl:
         result = get_cached_or_download(url, SAMPLE_SHA256, cache_dir)
 
     assert result.path == cached_file
@@ -96,10 +100,10 @@ def test_corrupt_cache_redownloaded(tmp_path: Path) -> None:
     url = "https://example.com/archive.tar.gz"
     cache_dir = tmp_path / "cache"
     cache_dir.mkdir()
-    cached_file = _cache_path_for(url, cache_dir)
+    cached_file = cache_path_for(url, cache_dir)
     cached_file.write_bytes(b"corrupt data")
 
-    with patch("poks.downloader.requests.get", _mock_requests_get()):
+    with patch("requests.get", _mock_requests_get()):
         result = get_cached_or_download(url, SAMPLE_SHA256, cache_dir)
 
     assert result.path == cached_file
@@ -111,10 +115,10 @@ def test_missing_cache_downloads(tmp_path: Path) -> None:
     url = "https://example.com/archive.tar.gz"
     cache_dir = tmp_path / "cache"
 
-    with patch("poks.downloader.requests.get", _mock_requests_get()):
+    with patch("requests.get", _mock_requests_get()):
         result = get_cached_or_download(url, SAMPLE_SHA256, cache_dir)
 
-    assert result.path == _cache_path_for(url, cache_dir)
+    assert result.path == cache_path_for(url, cache_dir)
     assert result.downloaded is True
     assert result.path.read_bytes() == SAMPLE_CONTENT
 
@@ -125,8 +129,8 @@ def test_missing_cache_downloads(tmp_path: Path) -> None:
 def test_cache_path_collision_avoidance(tmp_path: Path) -> None:
     """Two URLs with the same filename produce distinct cache paths."""
     cache_dir = tmp_path / "cache"
-    path_a = _cache_path_for("https://example.com/v1/archive.tar.gz", cache_dir)
-    path_b = _cache_path_for("https://example.com/v2/archive.tar.gz", cache_dir)
+    path_a = cache_path_for("https://example.com/v1/archive.tar.gz", cache_dir)
+    path_b = cache_path_for("https://example.com/v2/archive.tar.gz", cache_dir)
 
     assert path_a != path_b
     assert path_a.name.endswith("_archive.tar.gz")
@@ -140,7 +144,7 @@ def test_progress_callback_invoked_with_total(tmp_path: Path) -> None:
     dest = tmp_path / "archive.tar.gz"
     calls: list[tuple[str, int, int | None]] = []
 
-    with patch("poks.downloader.requests.get", _mock_requests_get(content_length=str(len(SAMPLE_CONTENT)))):
+    with patch("requests.get", _mock_requests_get(content_length=str(len(SAMPLE_CONTENT)))):
         download_file(
             "https://example.com/archive.tar.gz",
             dest,
@@ -159,7 +163,7 @@ def test_progress_callback_without_content_length(tmp_path: Path) -> None:
     dest = tmp_path / "archive.tar.gz"
     calls: list[tuple[str, int, int | None]] = []
 
-    with patch("poks.downloader.requests.get", _mock_requests_get()):
+    with patch("requests.get", _mock_requests_get()):
         download_file(
             "https://example.com/archive.tar.gz",
             dest,
@@ -171,3 +175,70 @@ def test_progress_callback_without_content_length(tmp_path: Path) -> None:
     _last_name, last_downloaded, last_total = calls[-1]
     assert last_downloaded == len(SAMPLE_CONTENT)
     assert last_total is None
+
+
+# -- download_fastest --------------------------------------------------------
+
+
+def test_download_fastest_continues_on_first_responder(tmp_path: Path) -> None:
+    local = tmp_path / "local.tar.gz"
+    local.write_bytes(SAMPLE_CONTENT)
+    release = threading.Event()
+    slow = _mock_requests_get()
+    slow.return_value.iter_content = lambda chunk_size: iter([release.wait(timeout=10) and SAMPLE_CONTENT])
+    dest = tmp_path / "archive.tar.gz"
+
+    try:
+        with patch("requests.get", slow):
+            source = download_fastest(["https://slow.example.com/archive.tar.gz", local.as_uri()], dest)
+    finally:
+        release.set()
+
+    assert source == local.as_uri()
+    assert dest.read_bytes() == SAMPLE_CONTENT
+
+
+def test_download_fastest_falls_back_on_failure(tmp_path: Path) -> None:
+    local = tmp_path / "local.tar.gz"
+    local.write_bytes(SAMPLE_CONTENT)
+    dest = tmp_path / "archive.tar.gz"
+
+    with patch("requests.get", side_effect=requests.RequestException("connection refused")):
+        source = download_fastest(["https://down.example.com/archive.tar.gz", local.as_uri()], dest, race=1)
+
+    assert source == local.as_uri()
+    assert dest.read_bytes() == SAMPLE_CONTENT
+
+
+def test_download_fastest_all_sources_fail(tmp_path: Path) -> None:
+    with pytest.raises(DownloadError, match="missing"):
+        download_fastest([(tmp_path / "missing").as_uri(), (tmp_path / "missing-too").as_uri()], tmp_path / "archive.tar.gz")
+
+
+def test_download_fastest_skips_source_with_wrong_content(tmp_path: Path) -> None:
+    wrong = tmp_path / "wrong.tar.gz"
+    wrong.write_bytes(b"stale mirror")
+
+    def slow_chunks(chunk_size: int) -> Iterator[bytes]:
+        time.sleep(0.2)
+        yield SAMPLE_CONTENT
+
+    slow = _mock_requests_get()
+    slow.return_value.iter_content = slow_chunks
+    dest = tmp_path / "archive.tar.gz"
+
+    with patch("requests.get", slow):
+        source = download_fastest([wrong.as_uri(), "https://slow.example.com/archive.tar.gz"], dest, sha256=SAMPLE_SHA256)
+
+    assert source == "https://slow.example.com/archive.tar.gz"
+    assert dest.read_bytes() == SAMPLE_CONTENT
+
+
+def test_download_fastest_rejects_wrong_content_from_every_source(tmp_path: Path) -> None:
+    wrong = tmp_path / "wrong.tar.gz"
+    wrong.write_bytes(b"stale mirror")
+    dest = tmp_path / "archive.tar.gz"
+
+    with pytest.raises(DownloadError, match="SHA256 mismatch"):
+        download_fastest([wrong.as_uri(), wrong.as_uri() + "?again"], dest, sha256=SAMPLE_SHA256)
+    assert not dest.exists()
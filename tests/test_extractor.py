@@ -1,4 +1,9 @@
+import gzip
 import json
+import os
+import shutil
+import subprocess
+import sys
 import tarfile
 import zipfile
 from io import BytesIO
@@ -9,8 +14,10 @@ from unittest.mock import patch
 import py7zr
 import pytest
 import zstandard
+from py_app_dev.core.exceptions import UserNotificationException
 
-from poks.extractor import _rename_with_retry, extract_archive
+from poks.extractor import DECOMPRESSORS, SUPPORTED_FORMATS, _find_decompressor, _rename_with_retry, _validate_entry_paths, extract_archive
+from tests.helpers import create_archive
 
 HELLO_CONTENT = "hello poks"
 NESTED_CONTENT = "nested file"
@@ -27,7 +34,7 @@ def _create_zip(path: Path, top_dir: str | None = None) -> Path:
 
 def _create_tar(path: Path, compression: str, ext: str, top_dir: str | None = None) -> Path:
     archive = path / f"archive{ext}"
-    mode = cast(Literal["w:gz", "w:xz", "w:bz2"], f"w:{compression}")
+    mode = cast(Literal["w:", "w:gz", "w:xz", "w:bz2"], f"w:{compression}")
     with tarfile.open(archive, mode) as tf:
         prefix = f"{top_dir}/" if top_dir else ""
         info = tarfile.TarInfo(name=f"{prefix}hello.txt")
@@ -37,6 +44,22 @@ def _create_tar(path: Path, compression: str, ext: str, top_dir: str | None = No
     return archive
 
 
+def _create_tar_zst(path: Path, ext: str = ".tar.zst", top_dir: str | None = None) -> Path:
+    archive = path / f"archive{ext}"
+    tar_data = _create_tar(path, "", ".tar", top_dir=top_dir).read_bytes()
+    # Two frames, like the output of pzstd or zstd -T
+    cctx = zstandard.ZstdCompressor()
+    middle = len(tar_data) // 2
+    archive.write_bytes(cctx.compress(tar_data[:middle]) + cctx.compress(tar_data[middle:]))
+    return archive
+
+
+def _create_tar_lz4(path: Path) -> Path:
+    tar_path = _create_tar(path, "", ".tar")
+    subprocess.run(["lz4", "-q", str(tar_path), str(path / "archive.tar.lz4")], check=True)  # noqa: S603, S607
+    return path / "archive.tar.lz4"
+
+
 def _create_7z(path: Path, top_dir: str | None = None) -> Path:
     archive = path / "archive.7z"
     src_dir = path / "src_7z"
@@ -92,6 +115,8 @@ ARCHIVE_CREATORS = [
     ("tar.gz", lambda p: _create_tar(p, "gz", ".tar.gz")),
     ("tar.xz", lambda p: _create_tar(p, "xz", ".tar.xz")),
     ("tar.bz2", lambda p: _create_tar(p, "bz2", ".tar.bz2")),
+    ("tar.zst", lambda p: _create_tar_zst(p)),
+    ("tzst", lambda p: _create_tar_zst(p, ".tzst")),
     ("7z", lambda p: _create_7z(p)),
     ("conda", lambda p: _create_conda(p)),
 ]
@@ -106,9 +131,20 @@ def test_extract_archive(tmp_path, label, creator):
     assert (dest / "hello.txt").read_text() == HELLO_CONTENT
 
 
+@pytest.mark.parametrize("ext", SUPPORTED_FORMATS)
+def test_helper_archives_round_trip(tmp_path, ext):
+    files: dict[str, str | bytes] = {"bin/tool": bytes(range(256)) * 64, "share/readme.txt": HELLO_CONTENT}
+    archive, _ = create_archive(tmp_path, files, fmt=ext[1:], top_dir="app")
+    dest = tmp_path / "out"
+    extract_archive(archive, dest, extract_dir="app")
+    assert (dest / "bin" / "tool").read_bytes() == files["bin/tool"]
+    assert (dest / "share" / "readme.txt").read_text() == HELLO_CONTENT
+
+
 EXTRACT_DIR_CREATORS = [
     ("zip", lambda p, td: _create_zip(p, top_dir=td)),
     ("tar.gz", lambda p, td: _create_tar(p, "gz", ".tar.gz", top_dir=td)),
+    ("tar.zst", lambda p, td: _create_tar_zst(p, top_dir=td)),
     ("7z", lambda p, td: _create_7z(p, top_dir=td)),
 ]
 
@@ -178,6 +214,204 @@ def test_unsupported_format_raises(tmp_path):
         extract_archive(fake, tmp_path / "out")
 
 
+# -- progress ----------------------------------------------------------------
+
+
+def _create_zip_with_sizes(path: Path, sizes: list[int]) -> Path:
+    archive = path / "sizes.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        for idx, size in enumerate(sizes):
+            zf.writestr(f"file{idx}", b"x" * size)
+    return archive
+
+
+def test_zip_progress_reports_uncompressed_bytes(tmp_path):
+    archive = _create_zip_with_sizes(tmp_path, [100, 200, 300])
+    calls = []
+
+    extract_archive(archive, tmp_path / "out", progress_callback=lambda *args: calls.append(args), app_name="app", progress_interval=0)
+
+    assert calls == [("app", 100, 600), ("app", 300, 600), ("app", 600, 600), ("app", 600, 600)]
+
+
+def test_progress_is_coalesced(tmp_path):
+    archive = _create_zip_with_sizes(tmp_path, [10] * 50)
+    calls = []
+
+    extract_archive(archive, tmp_path / "out", progress_callback=lambda *args: calls.append(args), app_name="app", progress_interval=3600)
+
+    assert calls == [("app", 500, 500)]
+
+
+@pytest.mark.parametrize(("label", "creator"), [c for c in ARCHIVE_CREATORS if c[0] != "zip"], ids=[c[0] for c in ARCHIVE_CREATORS if c[0] != "zip"])
+def test_progress_ends_at_total(tmp_path, label, creator):
+    archive = creator(tmp_path)
+    calls = []
+
+    extract_archive(archive, tmp_path / "out", progress_callback=lambda *args: calls.append(args), app_name="app", progress_interval=0)
+
+    done = [c[1] for c in calls]
+    assert done == sorted(done)
+    assert calls[-1][1] == calls[-1][2] > 0
+
+
+# -- external decompressors --------------------------------------------------
+
+FAKE_XZ = [sys.executable, "-c", "import lzma, sys; sys.stdout.buffer.write(lzma.decompress(sys.stdin.buffer.read()))"]
+
+
+def test_tar_uses_external_decompressor(tmp_path):
+    archive = _create_tar(tmp_path, "xz", ".tar.xz")
+    dest = tmp_path / "out"
+
+    with patch("poks.extractor._find_decompressor", return_value=FAKE_XZ), patch("poks.extractor.subprocess.Popen", wraps=subprocess.Popen) as popen:
+        extract_archive(archive, dest)
+
+    assert popen.call_args.args[0] == FAKE_XZ
+    assert (dest / "hello.txt").read_text() == HELLO_CONTENT
+
+
+def test_tar_falls_back_to_stdlib_without_decompressor(tmp_path):
+    archive = _create_tar(tmp_path, "bz2", ".tar.bz2")
+    dest = tmp_path / "out"
+
+    with patch("poks.extractor._find_decompressor", return_value=None), patch("poks.extractor.subprocess.Popen", side_effect=AssertionError("external tool used")):
+        extract_archive(archive, dest)
+
+    assert (dest / "hello.txt").read_text() == HELLO_CONTENT
+
+
+def test_external_decompressor_failure_is_reported(tmp_path):
+    archive = _create_tar(tmp_path, "gz", ".tar.gz")
+    failing = [sys.executable, "-c", "import sys; sys.stderr.write('corrupt input'); sys.exit(1)"]
+
+    with patch("poks.extractor._find_decompressor", return_value=failing), pytest.raises(ValueError, match=r"failed to decompress archive\.tar\.gz: corrupt input"):
+        extract_archive(archive, tmp_path / "out")
+
+
+def test_find_decompressor_picks_first_available(monkeypatch):
+    monkeypatch.setitem(DECOMPRESSORS, "xz", [["no-such-xz-tool", "-d"], [Path(sys.executable).name, "-c", "pass"]])
+    _find_decompressor.cache_clear()
+    try:
+        command = _find_decompressor("xz")
+    finally:
+        _find_decompressor.cache_clear()
+
+    assert command is not None
+    assert Path(command[0]).name == Path(sys.executable).name
+    assert command[1:] == ["-c", "pass"]
+
+
+@pytest.mark.skipif(shutil.which("lz4") is None, reason="lz4 command line tool not available")
+def test_extract_tar_lz4(tmp_path):
+    archive = _create_tar_lz4(tmp_path)
+    dest = tmp_path / "out"
+
+    extract_archive(archive, dest)
+
+    assert (dest / "hello.txt").read_text() == HELLO_CONTENT
+
+
+def test_tar_lz4_without_any_decoder_raises(tmp_path):
+    archive = tmp_path / "archive.tar.lz4"
+    archive.write_bytes(b"\x04\x22\x4d\x18")
+
+    with patch("poks.extractor._find_decompressor", return_value=None), patch.dict(sys.modules, {"lz4": None, "lz4.frame": None}):
+        with pytest.raises(UserNotificationException, match="install the 'lz4'"):
+            extract_archive(archive, tmp_path / "out")
+
+
+# -- native 7-Zip ------------------------------------------------------------
+
+# Mimics the subset of the 7-Zip CLI used by the extractor, backed by py7zr
+FAKE_7ZIP = """
+import sys
+from pathlib import Path
+
+import py7zr
+
+command, *args = sys.argv[1:]
+archive = args[-1]
+with py7zr.SevenZipFile(archive) as sz:
+    if command == "l":
+        print("Path = " + archive + "\\nType = 7z\\nPhysical Size = 1\\n")
+        for info in sz.list():
+            attributes = "A_ lrwxrwxrwx" if info.is_symlink else "A_ -rw-r--r--"
+            print("Path = " + info.filename + "\\nSize = " + str(info.uncompressed) + "\\nAttributes = " + attributes + "\\n")
+    else:
+        out = next(a[2:] for a in args if a.startswith("-o"))
+        Path(out, ".used-7zip").write_text("yes")
+        print("  50% 1 - hello.txt", flush=True)
+        sz.extractall(out)
+"""
+
+
+@pytest.fixture
+def fake_7zip(tmp_path):
+    script = tmp_path / "fake_7zz.py"
+    script.write_text(FAKE_7ZIP)
+    with patch("poks.extractor._find_7zip", return_value=[sys.executable, str(script)]):
+        yield
+
+
+@pytest.mark.usefixtures("fake_7zip")
+def test_7z_uses_native_7zip(tmp_path):
+    archive = _create_7z(tmp_path, top_dir="sdk")
+    dest = tmp_path / "out"
+
+    with patch("py7zr.SevenZipFile.extractall", side_effect=AssertionError("py7zr used")):
+        extract_archive(archive, dest, extract_dir="sdk")
+
+    assert (dest / "hello.txt").read_text() == HELLO_CONTENT
+    assert (dest / ".used-7zip").exists()
+
+
+@pytest.mark.usefixtures("fake_7zip")
+def test_7z_native_progress(tmp_path):
+    archive = _create_7z(tmp_path)
+    calls = []
+
+    extract_archive(archive, tmp_path / "out", progress_callback=lambda *args: calls.append(args), app_name="sdk", progress_interval=0)
+
+    assert calls == [("sdk", 5, 10), ("sdk", 10, 10)]
+
+
+def test_7z_native_listing_is_validated(tmp_path):
+    archive = _create_7z(tmp_path)
+    dest = tmp_path / "out"
+    lists_traversal = [sys.executable, "-c", "import sys; print('Path = ../escape.txt' if sys.argv[1] == 'l' else sys.exit(3))"]
+
+    with patch("poks.extractor._find_7zip", return_value=lists_traversal), pytest.raises(ValueError, match="Path traversal detected"):
+        extract_archive(archive, dest)
+
+
+@pytest.mark.usefixtures("fake_7zip")
+@pytest.mark.skipif(sys.platform == "win32", reason="Creating symlinks requires privileges on Windows")
+def test_7z_with_symlinks_is_not_extracted_by_native_7zip(tmp_path):
+    # A link to a directory outside plus a file below the link: old 7-Zip versions follow it
+    (tmp_path / "outside").mkdir()
+    (tmp_path / "link").symlink_to(tmp_path / "outside")
+    archive = tmp_path / "links.7z"
+    with py7zr.SevenZipFile(archive, "w") as sz:
+        sz.write(tmp_path / "link", "link")
+        sz.writestr(b"escaped", "link/x")
+    dest = tmp_path / "out"
+
+    with pytest.raises(py7zr.exceptions.Bad7zFile, match="Symlink"):
+        extract_archive(archive, dest)
+
+    assert not (dest / ".used-7zip").exists()
+    assert not list((tmp_path / "outside").iterdir())
+
+
+def test_7z_native_failure_is_reported(tmp_path):
+    archive = _create_7z(tmp_path)
+    failing = [sys.executable, "-c", "import sys; sys.stderr.write('Unsupported Method'); sys.exit(2)"]
+
+    with patch("poks.extractor._find_7zip", return_value=failing), pytest.raises(UserNotificationException, match="Unsupported Method"):
+        extract_archive(archive, tmp_path / "out")
+
+
 # -- path traversal protection -----------------------------------------------
 
 
@@ -215,6 +449,82 @@ def test_tar_path_traversal_rejected(tmp_path):
         extract_archive(archive, dest)
 
 
+@pytest.mark.parametrize("name", ["../escape.txt", "a/../../escape.txt", "/etc/passwd", "C:\\Windows\\evil.dll", "a\\..\\..\\escape.txt", ".."])
+def test_validate_entry_paths_rejects(name):
+    with pytest.raises(ValueError, match="Path traversal detected"):
+        _validate_entry_paths(["ok.txt", name])
+
+
+def test_validate_entry_paths_accepts_without_filesystem_access():
+    with patch.object(Path, "resolve", side_effect=AssertionError("filesystem access")):
+        _validate_entry_paths(["a/b/c.txt", "./d", "a/../e", "a/b/"])
+
+
+@pytest.mark.parametrize(
+    ("symlinks", "name"),
+    [
+        ({"lib": "/etc"}, "lib/passwd"),
+        ({"lib": "../outside"}, "lib"),
+        ({"a": ".", "x": "a/.."}, "x/file"),
+        ({"a": "b", "b": "a"}, "a/file"),
+    ],
+)
+def test_validate_entry_paths_rejects_through_symlinks(symlinks, name):
+    with pytest.raises(ValueError, match="Path traversal detected"):
+        _validate_entry_paths([*symlinks, name], symlinks)
+
+
+def test_validate_entry_paths_accepts_symlinks_inside():
+    symlinks = {"lib64": "lib", "sdk/current": "../sdk-1.0", "x": "lib64/.."}
+    _validate_entry_paths([*symlinks, "lib64/libc.so", "sdk/current/bin/tool", "x/README"], symlinks)
+
+
+@pytest.mark.parametrize("fmt", ["tar.gz", "tar.zst"])
+def test_tar_links_are_copied_without_link_support(tmp_path, monkeypatch, fmt):
+    buffer = BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tf:
+        info = tarfile.TarInfo(name="lib/libfoo.so.1")
+        info.size = len(HELLO_CONTENT)
+        tf.addfile(info, BytesIO(HELLO_CONTENT.encode()))
+        for name, link_type, linkname in [("lib/libfoo.so", tarfile.SYMTYPE, "libfoo.so.1"), ("bin/foo", tarfile.LNKTYPE, "lib/libfoo.so.1")]:
+            link = tarfile.TarInfo(name=name)
+            link.type = link_type
+            link.linkname = linkname
+            tf.addfile(link)
+    archive = tmp_path / f"archive.{fmt}"
+    archive.write_bytes(gzip.compress(buffer.getvalue()) if fmt == "tar.gz" else zstandard.ZstdCompressor().compress(buffer.getvalue()))
+    dest = tmp_path / "out"
+
+    def no_links(*args: object, **kwargs: object) -> None:
+        raise OSError("links not supported")
+
+    monkeypatch.setattr(os, "symlink", no_links)
+    monkeypatch.setattr(os, "link", no_links)
+    with patch("poks.extractor._find_decompressor", return_value=None):
+        extract_archive(archive, dest)
+
+    for name in ("lib/libfoo.so", "bin/foo"):
+        assert not (dest / name).is_symlink()
+        assert (dest / name).read_text() == HELLO_CONTENT
+
+
+def test_tar_symlink_escape_rejected(tmp_path):
+    archive = tmp_path / "malicious.tar.gz"
+    with tarfile.open(archive, "w:gz") as tf:
+        link = tarfile.TarInfo(name="lib")
+        link.type = tarfile.SYMTYPE
+        link.linkname = str(tmp_path / "outside")
+        tf.addfile(link)
+        info = tarfile.TarInfo(name="lib/escape.txt")
+        info.size = 5
+        tf.addfile(info, BytesIO(b"pwned"))
+
+    _filter_error = getattr(tarfile, "FilterError", ValueError)
+    with pytest.raises((ValueError, _filter_error)):
+        extract_archive(archive, tmp_path / "out")
+    assert not (tmp_path / "outside").exists()
+
+
 # -- .conda-specific tests ---------------------------------------------------
 
 
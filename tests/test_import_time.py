@@ -0,0 +1,70 @@
+"""Import-time regression checks for the ``poks`` CLI startup path."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import zipfile
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parents[1] / "src"
+HEAVY_MODULES = {"git", "requests", "urllib3", "py7zr", "zstandard", "rich", "mashumaro"}
+
+
+def _import_times(code: str, cwd: Path) -> dict[str, int]:
+    """Run *code* under ``python -X importtime`` and return ``{module: cumulative_us}``."""
+    proc = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC_DIR), os.environ.get("PYTHONPATH")]))},
+        check=False,
+    )
+    assert proc.returncode == 0, proc.stderr
+    times: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def _heavy_imports(times: dict[str, int]) -> set[str]:
+    return {name.split(".")[0] for name in times} & HEAVY_MODULES
+
+
+def _cli(*args: str) -> str:
+    """Python snippet that runs the poks CLI in-process with *args*."""
+    return f"import sys; sys.argv = ['poks', *{list(args)!r}]; from poks.main import main; main()"
+
+
+def test_import_main_skips_heavy_modules(tmp_path: Path) -> None:
+    times = _import_times("import poks.main", tmp_path)
+    assert not _heavy_imports(times), f"poks.main imported heavy modules (took {times['poks.main'] / 1000:.1f} ms)"
+
+
+def test_version_command_skips_heavy_modules(tmp_path: Path) -> None:
+    assert not _heavy_imports(_import_times(_cli("--version"), tmp_path))
+
+
+def test_list_command_only_loads_models(tmp_path: Path) -> None:
+    assert _heavy_imports(_import_times(_cli("list", "--root", str(tmp_path)), tmp_path)) <= {"mashumaro"}
+
+
+def test_unpack_command_skips_heavy_modules(tmp_path: Path) -> None:
+    archive = tmp_path / "tool.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("bin/tool", "echo")
+
+    assert not _heavy_imports(_import_times(_cli("unpack", str(archive), "-o", str(tmp_path / "out")), tmp_path))
+
+
+def test_cached_env_command_skips_heavy_modules(tmp_path: Path) -> None:
+    (tmp_path / "poks.json").write_text('{"apps": []}')
+    cli = _cli("env", "-c", str(tmp_path / "poks.json"), "--root", str(tmp_path / ".poks"))
+    _import_times(cli, tmp_path)  # fills the activation cache
+
+    assert not _heavy_imports(_import_times(cli, tmp_path))
@@ -8,8 +8,9 @@ from unittest.mock import patch
 
 import pytest
 
-from poks.domain import PoksApp, PoksAppVersion, PoksArchive, PoksBucket, PoksConfig, PoksManifest
+from poks.domain import PoksApp, PoksAppVersion, PoksArchive, PoksBucket, PoksConfig, PoksManifest, PoksMirror, PoksReceipt
 from poks.poks import Poks
+from poks.state import RECEIPT_FILE_NAME
 from tests.helpers import assert_install_result, assert_installed_app, create_archive
 
 
@@ -197,6 +198,40 @@ def test_idempotency_skips_installed(
     assert app.bin_dirs == [install_dir / "bin"]
 
 
+def test_install_downloads_from_mirror(
+    install_env: tuple[Poks, Path, Path],
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    poks, root_dir, archives_dir = install_env
+    manifest = _make_manifest(archives_dir)
+    archive_path = archives_dir / "archive.tar.gz"
+    mirror_dir = tmp_path / "mirror"
+    mirror_dir.mkdir()
+    # The upstream is gone, only the mirror still has the archive
+    archive_path.rename(mirror_dir / archive_path.name)
+    bucket_dir = root_dir / "buckets" / "test"
+    _setup_bucket(bucket_dir, {"my-tool": manifest})
+
+    config = PoksConfig(
+        buckets=[PoksBucket(name="test", url="unused")],
+        apps=[PoksApp(name="my-tool", version="1.0.0", bucket="test")],
+        mirrors=[PoksMirror(prefix=f"{archives_dir.as_uri()}/", url=f"{mirror_dir.as_uri()}/")],
+    )
+
+    with PLATFORM_PATCH:
+        monkeypatch.setattr(
+            "poks.poks.sync_all_buckets",
+            lambda _buckets, _dir: {"test": bucket_dir},
+        )
+        result = poks.install(config)
+
+    app = assert_installed_app(result, "my-tool")
+    assert (app.install_dir / "bin" / "tool").is_file()
+    receipt = PoksReceipt.from_json_file(app.install_dir / RECEIPT_FILE_NAME)
+    assert receipt.url == archive_path.as_uri()
+
+
 def test_multiple_apps_env_merged(
     install_env: tuple[Poks, Path, Path],
     monkeypatch: pytest.MonkeyPatch,
@@ -389,6 +424,34 @@ def test_install_from_manifest(
     assert installed.env["TOOL_HOME"] == str(installed.install_dir)
 
 
+def test_install_writes_resolved_receipt(
+    install_env: tuple[Poks, Path, Path],
+) -> None:
+    poks, _root_dir, archives_dir = install_env
+    manifest = _make_manifest(archives_dir, bin_dirs=["bin"], archive_env={"TOOL_HOME": "${dir}"})
+    manifest_path = archives_dir / "my-tool.json"
+    manifest_path.write_text(manifest.to_json_string())
+
+    with PLATFORM_PATCH:
+        installed = poks.install_from_manifest(manifest_path, "1.0.0")
+
+    receipt = PoksReceipt.from_json_file(installed.install_dir / ".receipt.json")
+    archive = manifest.versions[0].archives[0]
+    assert not (installed.install_dir / ".manifest.json").exists()
+    assert receipt.archive == archive
+    assert receipt.sha256 == archive.sha256
+    assert receipt.url == manifest.versions[0].url
+    assert receipt.version is not None
+    assert receipt.version.archives == []
+    assert receipt.version.bin_dirs == ["bin"]
+
+    # Listing resolves bin_dirs and the archive-level env from the receipt alone
+    poks.state_path.unlink()
+    listed = assert_installed_app(poks.list_installed(), "my-tool")
+    assert listed.bin_dirs == [installed.install_dir / "bin"]
+    assert listed.env == {"TOOL_HOME": str(installed.install_dir)}
+
+
 def test_install_from_manifest_version_not_found(
     install_env: tuple[Poks, Path, Path],
 ) -> None:
@@ -2,17 +2,22 @@
 
 from __future__ import annotations
 
+import shutil
+import subprocess
+import sys
 from pathlib import Path
 
 from typer.testing import CliRunner
 
-from poks.domain import PoksAppVersion, PoksManifest
+from poks.domain import PoksAppVersion, PoksArchive, PoksInstalledEntry, PoksInstalledState, PoksManifest
 from poks.main import app
 from tests.conftest import PoksEnv
 from tests.helpers import assert_installed_app
 
 runner = CliRunner()
 
+PLATFORMS = [("linux", "x86_64"), ("linux", "aarch64"), ("macos", "aarch64"), ("macos", "x86_64"), ("windows", "x86_64")]
+
 
 def test_list_api_returns_installed_apps(poks_env: PoksEnv, tmp_path: Path) -> None:
     """Test that poks.list_installed() returns installed apps with details."""
@@ -63,3 +68,89 @@ def test_list_empty(poks_env: PoksEnv) -> None:
     result = runner.invoke(app, ["list", "--root", str(poks_env.root_dir)])
     assert result.exit_code == 0
     assert "No apps installed." in result.stdout
+
+
+def test_list_reads_installed_state(poks_env: PoksEnv) -> None:
+    """Once the installed-state file exists, list_installed does not re-read stored manifests."""
+    install_dir = poks_env.apps_dir / "state-app" / "1.0.0"
+    install_dir.mkdir(parents=True)
+    manifest = PoksManifest(description="State App", versions=[PoksAppVersion(version="1.0.0", archives=[], bin_dirs=["bin"])])
+    (install_dir / ".manifest.json").write_text(manifest.to_json_string())
+
+    # First listing migrates the directory scan into the state file
+    poks_env.poks.list_installed()
+    state = PoksInstalledState.from_json_file(poks_env.poks.state_path)
+    assert state.apps == [PoksInstalledEntry(name="state-app", version="1.0.0", bin_dirs=["bin"])]
+
+    (install_dir / ".manifest.json").unlink()
+    result = poks_env.poks.list_installed()
+
+    installed = assert_installed_app(result, "state-app")
+    assert installed.bin_dirs == [install_dir / "bin"]
+
+
+def test_install_and_uninstall_update_installed_state(poks_env: PoksEnv) -> None:
+    archive_path, sha256 = poks_env.make_archive({"bin/tool": "echo"}, fmt="tar.gz")
+    manifest = PoksManifest(
+        description="Tool",
+        versions=[
+            PoksAppVersion(
+                version=version,
+                url=archive_path.as_uri(),
+                archives=[PoksArchive(os=os_name, arch=arch, ext=".tar.gz", sha256=sha256) for os_name, arch in PLATFORMS],
+                env={"TOOL_HOME": "${dir}"},
+            )
+            for version in ("1.0.0", "2.0.0")
+        ],
+    )
+    manifest_path = poks_env.root_dir / "tool.json"
+    manifest.to_json_file(manifest_path)
+
+    poks_env.poks.install_from_manifest(manifest_path, "1.0.0")
+    poks_env.poks.install_from_manifest(manifest_path, "2.0.0")
+
+    result = poks_env.poks.list_installed()
+    assert [(a.name, a.version) for a in result.apps] == [("tool", "1.0.0"), ("tool", "2.0.0")]
+    assert result.apps[1].env == {"TOOL_HOME": str(poks_env.apps_dir / "tool" / "2.0.0")}
+
+    poks_env.poks.uninstall("tool", "1.0.0")
+    assert [(a.name, a.version) for a in poks_env.poks.list_installed().apps] == [("tool", "2.0.0")]
+
+    poks_env.poks.uninstall(all_apps=True)
+    assert not poks_env.poks.state_path.exists()
+    assert poks_env.poks.list_installed().apps == []
+
+
+def test_list_drops_removed_install_dirs(poks_env: PoksEnv) -> None:
+    for version in ("1.0.0", "2.0.0"):
+        install_dir = poks_env.apps_dir / "tool" / version
+        install_dir.mkdir(parents=True)
+        (install_dir / ".manifest.json").write_text(PoksManifest(description="Tool", versions=[PoksAppVersion(version=version, archives=[])]).to_json_string())
+    poks_env.poks.list_installed()
+
+    shutil.rmtree(poks_env.apps_dir / "tool" / "1.0.0")
+
+    assert [a.version for a in poks_env.poks.list_installed().apps] == ["2.0.0"]
+    assert [e.version for e in PoksInstalledState.from_json_file(poks_env.poks.state_path).apps] == ["2.0.0"]
+
+
+RECORD_SCRIPT = """
+import sys
+from pathlib import Path
+
+from poks.domain import PoksAppVersion
+from poks.poks import Poks
+
+poks = Poks(root_dir=Path(sys.argv[1]))
+for version in range(20):
+    poks._record_installed(sys.argv[2], str(version), PoksAppVersion(version=str(version), archives=[]))
+"""
+
+
+def test_concurrent_processes_do_not_lose_state_updates(poks_env: PoksEnv) -> None:
+    poks_env.apps_dir.mkdir(parents=True, exist_ok=True)
+    processes = [subprocess.Popen([sys.executable, "-c", RECORD_SCRIPT, str(poks_env.root_dir), f"app{i}"]) for i in range(4)]  # noqa: S603
+
+    assert [process.wait(timeout=60) for process in processes] == [0] * 4
+    state = PoksInstalledState.from_json_file(poks_env.poks.state_path)
+    assert len(state.apps) == 4 * 20
@@ -0,0 +1,226 @@
+"""Tests for the download mirror served by ``poks serve``."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from poks.domain import PoksAppVersion, PoksArchive, PoksManifest
+from poks.downloader import get_cached_or_download, mirror_url
+from poks.mirror import MirrorServer, upstream_allowed
+from poks.poks import Poks
+from tests.helpers import create_archive
+
+PAYLOAD = os.urandom(256 * 1024)
+PAYLOAD_SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+@dataclass
+class Upstream:
+    """A local origin server serving PAYLOAD, holding its second half back until ``release`` is set."""
+
+    base_url: str = ""
+    url: str = ""
+    requests: list[str] = field(default_factory=list)
+    release: threading.Event = field(default_factory=threading.Event)
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                upstream.requests.append(self.path)
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(PAYLOAD)))
+                self.end_headers()
+                half = len(PAYLOAD) // 2
+                self.wfile.write(PAYLOAD[:half])
+                self.wfile.flush()
+                upstream.release.wait(timeout=10)
+                self.wfile.write(PAYLOAD[half:])
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        return Handler
+
+
+@contextmanager
+def _serve(server: ThreadingHTTPServer) -> Iterator[str]:
+    """Run *server* in a thread and yield its base URL."""
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def upstream() -> Iterator[Upstream]:
+    upstream = Upstream()
+    upstream.release.set()
+    with _serve(ThreadingHTTPServer(("127.0.0.1", 0), upstream.handler())) as base_url:
+        upstream.base_url = base_url
+        upstream.url = f"{base_url}/tool.bin"
+        yield upstream
+
+
+@pytest.fixture
+def mirror(tmp_path: Path, upstream: Upstream) -> Iterator[MirrorServer]:
+    server = MirrorServer(tmp_path / "mirror-root", port=0, allowed_upstreams=[upstream.base_url])
+    with _serve(server):
+        yield server
+
+
+def test_miss_is_fetched_verified_and_kept(mirror: MirrorServer, upstream: Upstream) -> None:
+    url = mirror_url(mirror.url, PAYLOAD_SHA256, upstream.url)
+
+    first = requests.get(url, timeout=10)
+    second = requests.get(url, timeout=10)
+
+    assert first.content == PAYLOAD
+    assert second.content == PAYLOAD
+    assert len(upstream.requests) == 1
+    assert (mirror.mirror_dir / PAYLOAD_SHA256).read_bytes() == PAYLOAD
+
+
+def test_concurrent_clients_share_one_upstream_download(mirror: MirrorServer, upstream: Upstream) -> None:
+    upstream.release.clear()
+    url = mirror_url(mirror.url, PAYLOAD_SHA256, upstream.url)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(requests.get, url, timeout=10) for _ in range(4)]
+        upstream.release.set()
+        bodies = [future.result().content for future in futures]
+
+    assert bodies == [PAYLOAD] * 4
+    assert len(upstream.requests) == 1
+
+
+def test_range_requests(mirror: MirrorServer) -> None:
+    (mirror.mirror_dir / PAYLOAD_SHA256).write_bytes(PAYLOAD)
+    url = f"{mirror.url}/{PAYLOAD_SHA256}/tool.bin"
+
+    partial = requests.get(url, headers={"Range": "bytes=10-19"}, timeout=10)
+    suffix = requests.get(url, headers={"Range": "bytes=-5"}, timeout=10)
+    beyond = requests.get(url, headers={"Range": f"bytes={len(PAYLOAD)}-"}, timeout=10)
+
+    assert partial.status_code == 206
+    assert partial.content == PAYLOAD[10:20]
+    assert partial.headers["Content-Range"] == f"bytes 10-19/{len(PAYLOAD)}"
+    assert suffix.content == PAYLOAD[-5:]
+    assert beyond.status_code == 416
+
+
+def test_unknown_archive_without_upstream_is_not_found(mirror: MirrorServer) -> None:
+    assert requests.get(f"{mirror.url}/{PAYLOAD_SHA256}/tool.bin", timeout=10).status_code == 404
+    assert requests.get(f"{mirror.url}/not-a-hash", timeout=10).status_code == 404
+
+
+def test_upstream_outside_the_allowlist_is_not_fetched(mirror: MirrorServer, upstream: Upstream) -> None:
+    mirror.allowed_upstreams = ["https://github.com/"]
+
+    response = requests.get(mirror_url(mirror.url, PAYLOAD_SHA256, upstream.url), timeout=10)
+
+    assert response.status_code == 404
+    assert upstream.requests == []
+
+
+@pytest.mark.parametrize(
+    ("url", "allowed"),
+    [
+        ("https://github.com/org/tool/releases/tool.zip", True),
+        ("https://GitHub.com/org/tool.zip", True),
+        ("http://github.com/org/tool.zip", False),
+        ("https://github.com.example.org/tool.zip", False),
+        ("https://github.com:8443/org/tool.zip", False),
+        ("https://example.com/github/tool.zip", True),
+        ("https://example.com/githubx/tool.zip", False),
+        ("https://example.com/tool.zip", False),
+        ("file:///etc/passwd", False),
+    ],
+)
+def test_upstream_allowed(url: str, allowed: bool) -> None:
+    assert upstream_allowed(url, ["https://github.com", "https://example.com/github/"]) is allowed
+
+
+def test_hash_mismatch_is_not_mirrored(mirror: MirrorServer, upstream: Upstream) -> None:
+    wrong = "0" * 64
+    url = mirror_url(mirror.url, wrong, upstream.url)
+
+    response = requests.get(url, headers={"Range": "bytes=0-0"}, timeout=10)
+
+    assert response.status_code == 502
+    assert not (mirror.mirror_dir / wrong).exists()
+    assert not list(mirror.mirror_dir.iterdir())
+
+
+def test_cached_archive_of_the_root_is_served(mirror: MirrorServer, upstream: Upstream) -> None:
+    get_cached_or_download(upstream.url, PAYLOAD_SHA256, mirror.cache_dir)
+    upstream.requests.clear()
+
+    response = requests.get(mirror_url(mirror.url, PAYLOAD_SHA256, upstream.url), timeout=10)
+
+    assert response.content == PAYLOAD
+    assert upstream.requests == []
+
+
+def test_cached_archive_is_kept_on_wrong_hash_and_unknown_upstream(mirror: MirrorServer, upstream: Upstream) -> None:
+    cached = get_cached_or_download(upstream.url, PAYLOAD_SHA256, mirror.cache_dir).path
+    upstream.requests.clear()
+
+    wrong_hash = requests.get(mirror_url(mirror.url, "0" * 64, upstream.url), headers={"Range": "bytes=0-0"}, timeout=10)
+    mirror.allowed_upstreams = []
+    not_allowed = requests.get(mirror_url(mirror.url, PAYLOAD_SHA256, upstream.url), timeout=10)
+
+    assert wrong_hash.status_code == 502
+    assert not_allowed.status_code == 404
+    assert cached.read_bytes() == PAYLOAD
+    assert not (mirror.mirror_dir / PAYLOAD_SHA256).exists()
+
+
+def test_install_through_mirror(tmp_path: Path, mirror: MirrorServer) -> None:
+    archives_dir = tmp_path / "archives"
+    archives_dir.mkdir()
+    archive, sha256 = create_archive(archives_dir, {"bin/tool": "#!/bin/sh\n"})
+    with _serve(ThreadingHTTPServer(("127.0.0.1", 0), _file_handler(archive))) as base_url:
+        url = f"{base_url}/{archive.name}"
+        mirror.allowed_upstreams.append(base_url)
+        manifest = PoksManifest(description="Tool", versions=[PoksAppVersion(version="1.0", url=url, archives=[PoksArchive(os="linux", arch="x86_64", sha256=sha256)])])
+        manifest_path = tmp_path / "tool.json"
+        manifest.to_json_file(manifest_path)
+        poks = Poks(root_dir=tmp_path / "client", mirror=mirror.url)
+
+        with patch("poks.poks.get_current_platform", return_value=("linux", "x86_64")):
+            installed = poks.install_from_manifest(manifest_path, "1.0")
+
+    assert (installed.install_dir / "bin" / "tool").is_file()
+    assert (mirror.mirror_dir / sha256).read_bytes() == archive.read_bytes()
+
+
+def _file_handler(path: Path) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            data = path.read_bytes()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    return Handler
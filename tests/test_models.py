@@ -99,6 +99,26 @@ class TestPoksManifest:
         # bin_dirs is in versions
         assert "bin_dirs" not in raw["versions"][0]
 
+    def test_get_version(self, tmp_path):
+        path = tmp_path / "manifest.json"
+        path.write_text(json.dumps(SAMPLE_MANIFEST))
+        manifest = PoksManifest.from_json_file(path)
+
+        assert manifest.get_version("0.16.5-1") is manifest.versions[0]
+        assert manifest.get_version("9.9.9") is None
+
+    def test_read_version_decodes_only_requested(self, tmp_path):
+        data = json.loads(json.dumps(SAMPLE_MANIFEST))
+        # A broken entry for another version must not be decoded
+        data["versions"].append({"version": "0.1.0", "archives": "not-a-list"})
+        path = tmp_path / "manifest.json"
+        path.write_text(json.dumps(data))
+
+        version = PoksManifest.read_version(path, "0.16.5-1")
+
+        assert version == PoksManifest.from_dict(SAMPLE_MANIFEST).versions[0]
+        assert PoksManifest.read_version(path, "9.9.9") is None
+
 
 class TestPoksConfig:
     def test_from_json_file(self, tmp_path):
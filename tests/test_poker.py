@@ -1,8 +1,11 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 
-from poks.poker import PatchEntry, poke
+from poks.poker import POKE_WORKERS, PatchEntry, PokeError, poke
 
 PLACEHOLDER = "/opt/anaconda1anaconda2anaconda3"
 # Binary tests need a placeholder longer than any realistic tmp_path (~120 chars on macOS)
@@ -97,3 +100,101 @@ class TestWindowsDelimiters:
         result = (tmp_path / "lib/foo.dll").read_bytes()
         assert win_placeholder.encode() not in result
         assert len(result) == len(binary_content)
+
+
+class TestSinglePass:
+    def test_file_without_hits_is_not_written(self, tmp_path: Path) -> None:
+        target = _write_file(tmp_path, "lib/libbar.so", b"\x00no placeholder here\x00")
+        os.utime(target, ns=(0, 0))
+        patches = [
+            PatchEntry(path="lib/libbar.so", prefix_placeholder=LONG_PLACEHOLDER, file_mode="binary"),
+            PatchEntry(path="lib/libbar.so", prefix_placeholder=PLACEHOLDER, file_mode="text"),
+        ]
+
+        poke(tmp_path, patches)
+
+        assert target.stat().st_mtime_ns == 0
+
+    def test_multiple_placeholders_in_one_file(self, tmp_path: Path) -> None:
+        other = "/opt/other_build_prefix"
+        _write_file(tmp_path, "etc/config", f"a={PLACEHOLDER}\nb={other}/lib\n")
+        patches = [
+            PatchEntry(path="etc/config", prefix_placeholder=PLACEHOLDER, file_mode="text"),
+            PatchEntry(path="etc/config", prefix_placeholder=other, file_mode="text"),
+        ]
+
+        poke(tmp_path, patches)
+
+        assert (tmp_path / "etc/config").read_text() == f"a={tmp_path}\nb={tmp_path}/lib\n"
+
+    def test_binary_patches_every_offset_in_place(self, tmp_path: Path) -> None:
+        placeholder = LONG_PLACEHOLDER.encode()
+        content = b"\xff" * 10 + placeholder + b"/bin\x00" + b"\xee" * 4096 + placeholder + b"\x00"
+        _write_file(tmp_path, "lib/libfoo.so", content)
+        patches = [PatchEntry(path="lib/libfoo.so", prefix_placeholder=LONG_PLACEHOLDER, file_mode="binary")]
+
+        poke(tmp_path, patches)
+
+        padded = str(tmp_path).encode() + b"\x00" * (len(placeholder) - len(str(tmp_path).encode()))
+        assert (tmp_path / "lib/libfoo.so").read_bytes() == b"\xff" * 10 + padded + b"/bin\x00" + b"\xee" * 4096 + padded + b"\x00"
+
+    def test_text_mode_keeps_line_endings(self, tmp_path: Path) -> None:
+        _write_file(tmp_path, "Scripts/activate.bat", f"set PREFIX={PLACEHOLDER}\r\n".encode())
+        patches = [PatchEntry(path="Scripts/activate.bat", prefix_placeholder=PLACEHOLDER, file_mode="text")]
+
+        poke(tmp_path, patches)
+
+        assert (tmp_path / "Scripts/activate.bat").read_bytes() == f"set PREFIX={tmp_path}\r\n".encode()
+
+
+class TestParallel:
+    def test_patches_many_files_with_workers(self, tmp_path: Path) -> None:
+        patches = []
+        for i in range(20):
+            _write_file(tmp_path, f"bin/tool{i}", f"prefix={PLACEHOLDER}\n")
+            patches.append(PatchEntry(path=f"bin/tool{i}", prefix_placeholder=PLACEHOLDER, file_mode="text"))
+        _write_file(tmp_path, "bin/clean", "nothing to do\n")
+        patches.append(PatchEntry(path="bin/clean", prefix_placeholder=PLACEHOLDER, file_mode="text"))
+
+        report = poke(tmp_path, patches, workers=4)
+
+        assert sorted(f.path for f in report.patched) == sorted(f"bin/tool{i}" for i in range(20))
+        assert all((tmp_path / f"bin/tool{i}").read_text() == f"prefix={tmp_path}\n" for i in range(20))
+
+    @pytest.mark.parametrize(("workers", "files", "threads"), [(1, 20, None), (POKE_WORKERS, 20, POKE_WORKERS), (POKE_WORKERS, 2, 2)])
+    def test_bounds_threads(self, tmp_path: Path, workers: int, files: int, threads: int | None) -> None:
+        patches = []
+        for i in range(files):
+            _write_file(tmp_path, f"bin/tool{i}", f"prefix={PLACEHOLDER}\n")
+            patches.append(PatchEntry(path=f"bin/tool{i}", prefix_placeholder=PLACEHOLDER, file_mode="text"))
+
+        with patch("poks.poker.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as executor:
+            report = poke(tmp_path, patches, workers=workers)
+
+        assert len(report.patched) == files
+        if threads is None:
+            executor.assert_not_called()
+        else:
+            executor.assert_called_once_with(max_workers=threads)
+
+    def test_aggregates_all_failures(self, tmp_path: Path) -> None:
+        short_placeholder = "/x"
+        deep_dir = tmp_path / ("a" * 100)
+        _write_file(deep_dir, "lib/one.so", short_placeholder.encode())
+        _write_file(deep_dir, "lib/two.so", short_placeholder.encode())
+        _write_file(deep_dir, "etc/config", f"prefix={PLACEHOLDER}\n")
+        patches = [
+            PatchEntry(path="lib/one.so", prefix_placeholder=short_placeholder, file_mode="binary"),
+            PatchEntry(path="missing", prefix_placeholder=PLACEHOLDER, file_mode="text"),
+            PatchEntry(path="lib/two.so", prefix_placeholder=short_placeholder, file_mode="binary"),
+            PatchEntry(path="etc/config", prefix_placeholder=PLACEHOLDER, file_mode="text"),
+        ]
+
+        with pytest.raises(PokeError, match=r"Failed to patch 2 file\(s\)") as exc_info:
+            poke(deep_dir, patches, workers=2)
+
+        report = exc_info.value.report
+        assert list(report.errors) == ["lib/one.so", "lib/two.so"]
+        assert report.missing == ["missing"]
+        assert [f.path for f in report.patched] == ["etc/config"]
+        assert (deep_dir / "etc/config").read_text() == f"prefix={deep_dir}\n"
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+import threading
+import time
 from typing import Any
 
 import pytest
 
-import poks.progress
+# Imported before the tests patch rich.live.Live, so that rich's Progress keeps its real Live
+import rich.progress  # noqa: F401
+
 from poks.progress import RichProgressHandler
 
 
@@ -23,19 +27,21 @@ class DummyLive:
 
 
 def test_live_starts_on_first_callback(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setattr(poks.progress, "Live", DummyLive)
+    monkeypatch.setattr("rich.live.Live", DummyLive)
     handler = RichProgressHandler()
     assert handler._live is None
 
     handler.on_download("app1", 0, 100)
+    handler.flush()
 
     assert handler._live is not None
     assert handler._live.started is True  # type: ignore[unreachable]
+    handler.close()
 
 
 def test_live_stays_open_until_close(monkeypatch: pytest.MonkeyPatch) -> None:
     """Live display is not auto-stopped when tasks complete — only close() stops it."""
-    monkeypatch.setattr(poks.progress, "Live", DummyLive)
+    monkeypatch.setattr("rich.live.Live", DummyLive)
     handler = RichProgressHandler()
 
     handler.on_download("app1", 0, 100)
@@ -43,6 +49,7 @@ def test_live_stays_open_until_close(monkeypatch: pytest.MonkeyPatch) -> None:
 
     handler.on_download("app1", 100, 100)
     handler.on_extract("app1", 50, 50)
+    handler.flush()
 
     # Live is still open after all tasks complete
     assert handler._live is not None
@@ -54,36 +61,81 @@ def test_live_stays_open_until_close(monkeypatch: pytest.MonkeyPatch) -> None:
 
 
 def test_close_is_safe_when_no_live(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setattr(poks.progress, "Live", DummyLive)
+    monkeypatch.setattr("rich.live.Live", DummyLive)
     handler = RichProgressHandler()
     handler.close()  # Should not raise
 
 
 def test_multiple_apps_tracked_independently(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setattr(poks.progress, "Live", DummyLive)
+    monkeypatch.setattr("rich.live.Live", DummyLive)
     handler = RichProgressHandler()
 
     handler.on_download("app1", 10, 100)
     handler.on_download("app2", 20, 200)
+    handler.flush()
 
     assert len(handler._download_tasks) == 2
 
     # Both apps complete — tasks stay tracked (Live stays open until close())
     handler.on_download("app1", 100, 100)
     handler.on_download("app2", 200, 200)
+    handler.flush()
     assert handler._live is not None
 
     handler.close()
 
 
 def test_download_and_extract_bars_separate(monkeypatch: pytest.MonkeyPatch) -> None:
-    monkeypatch.setattr(poks.progress, "Live", DummyLive)
+    monkeypatch.setattr("rich.live.Live", DummyLive)
     handler = RichProgressHandler()
 
     handler.on_download("app1", 50, 100)
     handler.on_extract("app1", 3, 10)
+    handler.flush()
 
     assert len(handler._download_tasks) == 1
     assert len(handler._extract_tasks) == 1
 
     handler.close()
+
+
+def test_events_are_coalesced_per_bar(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("rich.live.Live", DummyLive)
+    handler = RichProgressHandler()
+    rendered: list[dict[tuple[str, str], tuple[int, int | None]]] = []
+    original_render = handler._render
+
+    def render(latest: dict[tuple[str, str], tuple[int, int | None]]) -> None:
+        rendered.append(dict(latest))
+        original_render(latest)
+
+    monkeypatch.setattr(handler, "_render", render)
+
+    # The renderer sleeps between batches, so the following events queue up and are coalesced
+    handler.on_download("app1", 0, 1000)
+    handler.flush()
+    for downloaded in range(1, 1001):
+        handler.on_download("app1", downloaded, 1000)
+    handler.close()
+
+    assert rendered[-1] == {("download", "app1"): (1000, 1000)}
+    assert len(rendered) < 1000
+    assert handler._download_progress is not None
+    assert handler._download_progress.tasks[0].completed == 1000
+
+
+def test_producers_do_not_wait_for_rendering(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("rich.live.Live", DummyLive)
+    handler = RichProgressHandler()
+    release = threading.Event()
+    monkeypatch.setattr(handler, "_render", lambda latest: release.wait(5))
+
+    handler.on_download("app1", 0, 100)
+    started = time.monotonic()
+    for downloaded in range(1, 101):
+        handler.on_download("app1", downloaded, 100)
+    elapsed = time.monotonic() - started
+
+    release.set()
+    handler.close()
+    assert elapsed < 1
@@ -0,0 +1,167 @@
+"""Tests for relocating conda installs via the recorded patch sites."""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from typer.testing import CliRunner
+
+from poks.domain import PoksAppVersion, PoksArchive, PoksManifest
+from poks.extractor import extract_archive
+from poks.main import app
+from poks.poker import PatchEntry, PokeError, poke
+from poks.poks import Poks
+from poks.relocation import RELOCATION_FILE_NAME, relocate_install, save_relocation_index
+from tests.helpers import create_archive
+
+PLACEHOLDER = "/opt/anaconda1anaconda2anaconda3"
+LONG_PLACEHOLDER = "/opt/" + "placeholder_" * 25
+runner = CliRunner()
+
+
+def _poked_install(install_dir: Path) -> None:
+    (install_dir / "bin").mkdir(parents=True)
+    (install_dir / "lib").mkdir()
+    (install_dir / "bin" / "tool").write_text(f'#!/bin/sh\nexec {PLACEHOLDER}/lib/tool "$@"\n# {PLACEHOLDER}\n')
+    (install_dir / "lib" / "libtool.so").write_bytes(b"\x7fELF" + LONG_PLACEHOLDER.encode() + b"/share\x00\xff" + LONG_PLACEHOLDER.encode() + b"\x00")
+    patches = [
+        PatchEntry(path="bin/tool", prefix_placeholder=PLACEHOLDER, file_mode="text"),
+        PatchEntry(path="lib/libtool.so", prefix_placeholder=LONG_PLACEHOLDER, file_mode="binary"),
+    ]
+    save_relocation_index(install_dir, poke(install_dir, patches))
+
+
+def _padded(prefix: Path) -> bytes:
+    return str(prefix).encode() + b"\x00" * (len(LONG_PLACEHOLDER) - len(str(prefix)))
+
+
+def test_relocate_rewrites_recorded_sites(tmp_path: Path) -> None:
+    old_dir = tmp_path / "old" / "tool" / "1.0"
+    _poked_install(old_dir)
+    new_dir = tmp_path / "somewhere" / "else" / "tool" / "1.0"
+    new_dir.parent.mkdir(parents=True)
+    shutil.move(old_dir, new_dir)
+
+    assert relocate_install(new_dir) == 4
+
+    assert (new_dir / "bin" / "tool").read_text() == f'#!/bin/sh\nexec {new_dir}/lib/tool "$@"\n# {new_dir}\n'
+    assert (new_dir / "lib" / "libtool.so").read_bytes() == b"\x7fELF" + _padded(new_dir) + b"/share\x00\xff" + _padded(new_dir) + b"\x00"
+    assert json.loads((new_dir / RELOCATION_FILE_NAME).read_text())["prefix"] == str(new_dir)
+    assert relocate_install(new_dir) == 0
+
+
+def test_relocate_round_trip(tmp_path: Path) -> None:
+    first = tmp_path / "a" / "1.0"
+    _poked_install(first)
+    original = (first / "bin" / "tool").read_bytes()
+    second = tmp_path / "much" / "longer" / "location" / "1.0"
+    second.parent.mkdir(parents=True)
+    shutil.move(first, second)
+    relocate_install(second)
+    shutil.move(second, first)
+
+    relocate_install(first)
+
+    assert (first / "bin" / "tool").read_bytes() == original
+
+
+def test_relocate_breaks_hardlinks(tmp_path: Path) -> None:
+    old_dir = tmp_path / "old" / "1.0"
+    _poked_install(old_dir)
+    shared = tmp_path / "shared.so"
+    os.link(old_dir / "lib" / "libtool.so", shared)
+    before = shared.read_bytes()
+    new_dir = tmp_path / "new" / "1.0"
+    new_dir.parent.mkdir()
+    shutil.move(old_dir, new_dir)
+
+    relocate_install(new_dir)
+
+    assert shared.read_bytes() == before
+    assert (new_dir / "lib" / "libtool.so").stat().st_nlink == 1
+
+
+def test_relocate_reports_all_failures(tmp_path: Path) -> None:
+    old_dir = tmp_path / "old" / "1.0"
+    _poked_install(old_dir)
+    new_dir = tmp_path.joinpath(*["n" * 100] * 3, "1.0")
+    new_dir.parent.mkdir(parents=True)
+    shutil.move(old_dir, new_dir)
+
+    with pytest.raises(PokeError, match="exceeds placeholder") as exc_info:
+        relocate_install(new_dir)
+
+    assert list(exc_info.value.report.errors) == ["lib/libtool.so"]
+    # The text file could be relocated and is recorded under the new prefix
+    assert (new_dir / "bin" / "tool").read_text().count(str(new_dir)) == 2
+
+
+def test_relocate_retries_failed_files_after_another_move(tmp_path: Path) -> None:
+    old_dir = tmp_path / "old" / "1.0"
+    _poked_install(old_dir)
+    long_dir = tmp_path.joinpath(*["n" * 100] * 3, "1.0")
+    long_dir.parent.mkdir(parents=True)
+    shutil.move(old_dir, long_dir)
+    with pytest.raises(PokeError):
+        relocate_install(long_dir)
+
+    # The failed file keeps its old prefix in the index instead of being dropped
+    files = {f["path"]: f for f in json.loads((long_dir / RELOCATION_FILE_NAME).read_text())["files"]}
+    assert files["lib/libtool.so"]["prefix"] == str(old_dir)
+    assert "prefix" not in files["bin/tool"]
+
+    new_dir = tmp_path / "new" / "1.0"
+    new_dir.parent.mkdir()
+    shutil.move(long_dir, new_dir)
+
+    assert relocate_install(new_dir) == 4
+    assert (new_dir / "bin" / "tool").read_text() == f'#!/bin/sh\nexec {new_dir}/lib/tool "$@"\n# {new_dir}\n'
+    assert (new_dir / "lib" / "libtool.so").read_bytes() == b"\x7fELF" + _padded(new_dir) + b"/share\x00\xff" + _padded(new_dir) + b"\x00"
+    assert relocate_install(new_dir) == 0
+
+
+def test_relocate_conda_extracted_with_extract_dir(tmp_path: Path) -> None:
+    archive, _ = create_archive(
+        tmp_path,
+        {"pkg/bin/tool": f"prefix={PLACEHOLDER}\n", "info/about": PLACEHOLDER},
+        fmt="conda",
+        conda_patches=[{"_path": "pkg/bin/tool", "prefix_placeholder": PLACEHOLDER, "file_mode": "text"}],
+    )
+    old_dir = tmp_path / "old" / "tool"
+    extract_archive(archive, old_dir, extract_dir="pkg")
+    new_dir = tmp_path / "new" / "tool"
+    new_dir.parent.mkdir()
+    shutil.move(old_dir, new_dir)
+
+    assert [f["path"] for f in json.loads((new_dir / RELOCATION_FILE_NAME).read_text())["files"]] == ["bin/tool"]
+    assert relocate_install(new_dir) == 1
+    assert (new_dir / "bin" / "tool").read_text() == f"prefix={new_dir}\n"
+
+
+def test_poks_relocate_after_moving_root(tmp_path: Path) -> None:
+    archive, sha256 = create_archive(
+        tmp_path,
+        {"bin/tool": f"prefix={PLACEHOLDER}\n", "lib/data": "static"},
+        fmt="conda",
+        conda_patches=[{"_path": "bin/tool", "prefix_placeholder": PLACEHOLDER, "file_mode": "text"}],
+    )
+    manifest = PoksManifest(
+        description="Tool",
+        versions=[PoksAppVersion(version="1.0", url=archive.as_uri(), archives=[PoksArchive(os="linux", arch="x86_64", ext=".conda", sha256=sha256)])],
+    )
+    manifest_path = tmp_path / "tool.json"
+    manifest.to_json_file(manifest_path)
+    with patch("poks.poks.get_current_platform", return_value=("linux", "x86_64")):
+        Poks(root_dir=tmp_path / "root", progress_callback=None, extract_callback=None).install_from_manifest(manifest_path, "1.0")
+    shutil.move(tmp_path / "root", tmp_path / "moved")
+
+    result = runner.invoke(app, ["relocate", str(tmp_path / "moved")])
+
+    assert result.exit_code == 0
+    assert "Rewrote 1 patch sites" in result.stdout
+    assert (tmp_path / "moved" / "apps" / "tool" / "1.0" / "bin" / "tool").read_text() == f"prefix={tmp_path / 'moved' / 'apps' / 'tool' / '1.0'}\n"
@@ -1,7 +1,7 @@
 import pytest
 
-from poks.domain import PoksAppVersion, PoksArchive
-from poks.resolver import expand_variables, resolve_archive, resolve_download_url
+from poks.domain import PoksAppVersion, PoksArchive, PoksMirror
+from poks.resolver import expand_variables, resolve_archive, resolve_download_url, resolve_mirror_urls
 
 
 @pytest.mark.parametrize(
@@ -67,3 +67,18 @@ def test_resolve_download_url_no_url():
     )
     with pytest.raises(ValueError, match="No URL"):
         resolve_download_url(version, version.archives[0])
+
+
+def test_resolve_mirror_urls():
+    mirrors = [
+        PoksMirror(prefix="https://github.com/", url="https://artifactory.example.com/github/"),
+        PoksMirror(prefix="https://example.com/", url="https://other.example.com/"),
+        PoksMirror(prefix="https://github.com/", url="https://backup.example.com/"),
+    ]
+
+    assert resolve_mirror_urls("https://github.com/org/tool/v1/tool.zip", mirrors) == [
+        "https://artifactory.example.com/github/org/tool/v1/tool.zip",
+        "https://backup.example.com/org/tool/v1/tool.zip",
+        "https://github.com/org/tool/v1/tool.zip",
+    ]
+    assert resolve_mirror_urls("https://gitlab.com/tool.zip", mirrors) == ["https://gitlab.com/tool.zip"]
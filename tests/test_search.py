@@ -75,7 +75,7 @@ def test_search_no_matches(runner: CliRunner, mock_buckets_dir: Path, tmp_path:
 
 def test_search_updates_buckets(runner: CliRunner, mock_buckets_dir: Path, tmp_path: Path) -> None:
     """Test search updates buckets by default."""
-    with patch("poks.bucket.Repo") as mock_repo:
+    with patch("git.Repo") as mock_repo:
         mock_repo_instance = MagicMock()
         mock_repo.return_value = mock_repo_instance
 
@@ -89,7 +89,7 @@ def test_search_updates_buckets(runner: CliRunner, mock_buckets_dir: Path, tmp_p
 
 def test_search_no_update_flag(runner: CliRunner, mock_buckets_dir: Path, tmp_path: Path) -> None:
     """Test --no-update flag skips update."""
-    with patch("poks.bucket.Repo") as mock_repo:
+    with patch("git.Repo") as mock_repo:
         result = runner.invoke(app, ["search", "app", "--root", str(tmp_path), "--no-update"])
 
         assert result.exit_code == 0
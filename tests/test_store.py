@@ -0,0 +1,99 @@
+"""Tests for the content-addressed unpacked store."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from poks.domain import PoksAppVersion, PoksArchive, PoksManifest
+from poks.poks import Poks
+from poks.store import add_to_store, is_stored, materialize, store_entry_dir
+from tests.helpers import create_archive
+
+PLACEHOLDER = "/opt/anaconda1anaconda2anaconda3"
+PLATFORM_PATCH = patch("poks.poks.get_current_platform", return_value=("linux", "x86_64"))
+
+
+def test_store_entry_dir_keyed_by_extract_dir(tmp_path: Path) -> None:
+    assert store_entry_dir(tmp_path, "abc") == tmp_path / "abc"
+    assert store_entry_dir(tmp_path, "abc", "sub") != store_entry_dir(tmp_path, "abc", "other")
+
+
+def test_materialize_links_files(tmp_path: Path) -> None:
+    archive, sha256 = create_archive(tmp_path, {"bin/tool": "#!/bin/sh\necho hi", "README": "docs"})
+    entry_dir = store_entry_dir(tmp_path / "store", sha256)
+
+    add_to_store(entry_dir, archive)
+    assert is_stored(entry_dir)
+
+    first = tmp_path / "apps" / "tool" / "1.0"
+    second = tmp_path / "apps" / "tool-copy" / "1.0"
+    materialize(entry_dir, first)
+    materialize(entry_dir, second)
+
+    stored = entry_dir / "content" / "bin" / "tool"
+    for install_dir in (first, second):
+        assert (install_dir / "README").read_text() == "docs"
+        assert (install_dir / "bin" / "tool").read_bytes() == stored.read_bytes()
+    assert not list((tmp_path / "store").glob(".tmp-*"))
+
+
+def test_add_to_store_keeps_existing_entry(tmp_path: Path) -> None:
+    archive, sha256 = create_archive(tmp_path, {"a.txt": "first"})
+    entry_dir = store_entry_dir(tmp_path / "store", sha256)
+    add_to_store(entry_dir, archive)
+
+    # A concurrent install finishing second must not fail nor leave staging dirs behind
+    add_to_store(entry_dir, archive)
+
+    assert (entry_dir / "content" / "a.txt").read_text() == "first"
+    assert [p.name for p in (tmp_path / "store").iterdir()] == [entry_dir.name]
+
+
+def test_conda_patched_files_get_private_copies(tmp_path: Path) -> None:
+    archive, sha256 = create_archive(
+        tmp_path,
+        {"bin/script": f"prefix={PLACEHOLDER}\n", "lib/data": "static"},
+        fmt="conda",
+        conda_patches=[{"_path": "bin/script", "prefix_placeholder": PLACEHOLDER, "file_mode": "text"}],
+    )
+    entry_dir = store_entry_dir(tmp_path / "store", sha256)
+    add_to_store(entry_dir, archive)
+
+    install_dir = tmp_path / "apps" / "pkg" / "1.0"
+    materialize(entry_dir, install_dir)
+
+    assert (install_dir / "bin" / "script").read_text() == f"prefix={install_dir}\n"
+    assert (entry_dir / "content" / "bin" / "script").read_text() == f"prefix={PLACEHOLDER}\n"
+    assert not os.path.samefile(install_dir / "bin" / "script", entry_dir / "content" / "bin" / "script")
+
+
+def test_reinstall_from_store_skips_download(tmp_path: Path) -> None:
+    archive, sha256 = create_archive(tmp_path, {"bin/tool": "echo"}, top_dir="tool-1.0")
+    manifest = PoksManifest(
+        description="Tool",
+        versions=[
+            PoksAppVersion(
+                version="1.0",
+                url=archive.as_uri(),
+                extract_dir="tool-1.0",
+                archives=[PoksArchive(os="linux", arch="x86_64", ext=".tar.gz", sha256=sha256)],
+            )
+        ],
+    )
+    manifest_path = tmp_path / "tool.json"
+    manifest.to_json_file(manifest_path)
+    poks = Poks(root_dir=tmp_path / ".poks", progress_callback=None, extract_callback=None, use_store=True)
+
+    with PLATFORM_PATCH:
+        first = poks.install_from_manifest(manifest_path, "1.0")
+        poks.uninstall("tool")
+        with patch("poks.poks.get_cached_or_download", side_effect=AssertionError("should not download")):
+            second = poks.install_from_manifest(manifest_path, "1.0")
+
+    assert first.extracted
+    assert first.linked
+    assert not second.extracted
+    assert second.status_label == "store hit, linked"
+    assert (second.install_dir / "bin" / "tool").read_text() == "echo"
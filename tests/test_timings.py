@@ -0,0 +1,114 @@
+"""Tests for per-phase install timings."""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+from typer.testing import CliRunner
+
+from poks.domain import InstalledApp, InstallResult, PhaseTiming, PoksAppVersion, PoksArchive, PoksManifest
+from poks.main import app
+from poks.timings import format_timings_table, record_timings, span, timings_to_jsonl
+from tests.conftest import PoksEnv
+from tests.helpers import create_archive
+
+PLATFORM_PATCH = patch("poks.poks.get_current_platform", return_value=("linux", "x86_64"))
+runner = CliRunner()
+
+
+def test_span_is_recorded_only_inside_recorder() -> None:
+    with span("outside"):
+        pass
+    with record_timings() as timings, span("download") as timing:
+        timing.bytes = 2048
+
+    assert [t.phase for t in timings] == ["download"]
+    assert timings[0].seconds > 0
+    assert timings[0].bytes_per_second == 2048 / timings[0].seconds
+    assert timings[0].files_per_second is None
+
+
+def test_recorders_are_per_thread() -> None:
+    seen: dict[str, list[str]] = {}
+
+    def worker(name: str) -> None:
+        with record_timings() as timings:
+            with span(name):
+                pass
+            seen[name] = [t.phase for t in timings]
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ("a", "b")]
+    with record_timings() as outer:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert seen == {"a": ["a"], "b": ["b"]}
+    assert outer == []
+
+
+def _result() -> InstallResult:
+    tool = InstalledApp(name="tool", version="1.0", install_dir=Path("/apps/tool/1.0"), bin_dirs=[], env={})
+    tool.timings = [PhaseTiming(phase="download", seconds=2.0, bytes=4 * 1024 * 1024), PhaseTiming(phase="extract", seconds=0.5, bytes=1024, files=10)]
+    return InstallResult(apps=[tool], timings=[PhaseTiming(phase="bucket sync", seconds=1.0, target="main")])
+
+
+def test_timings_to_jsonl() -> None:
+    lines = [json.loads(line) for line in timings_to_jsonl(_result()).splitlines()]
+
+    assert lines == [
+        {"app": None, "version": None, "phase": "bucket sync", "seconds": 1.0, "target": "main"},
+        {"app": "tool", "version": "1.0", "phase": "download", "seconds": 2.0, "bytes": 4 * 1024 * 1024},
+        {"app": "tool", "version": "1.0", "phase": "extract", "seconds": 0.5, "bytes": 1024, "files": 10},
+    ]
+
+
+def test_format_timings_table() -> None:
+    table = format_timings_table(_result()).splitlines()
+
+    assert table[2].split() == ["main", "bucket", "sync", "1.000", "-", "-"]
+    assert table[3].split() == ["tool@1.0", "download", "2.000", "2.0", "-"]
+    assert table[4].split() == ["tool@1.0", "extract", "0.500", "0.0", "20.0"]
+    assert table[-1].split() == ["total", "extract", "0.500"]
+
+
+def test_install_records_phases(poks_env: PoksEnv) -> None:
+    archive, sha256 = poks_env.make_archive({"bin/tool": "#!/bin/sh\n"})
+    poks_env.add_manifest(
+        "tool",
+        PoksManifest(description="Tool", versions=[PoksAppVersion(version="1.0", url=archive.as_uri(), archives=[PoksArchive(os="linux", arch="x86_64", sha256=sha256)])]),
+    )
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}])
+
+    with PLATFORM_PATCH:
+        result = poks_env.poks.install(config_path)
+        again = poks_env.poks.install(config_path)
+
+    assert [t.phase for t in result.timings] == ["bucket sync"]
+    assert result.timings[0].target == "test"
+    phases = {t.phase: t for t in result.apps[0].timings}
+    assert list(phases) == ["manifest parse", "cache lookup", "download", "hash verify", "extract", "receipt write"]
+    assert phases["download"].bytes == archive.stat().st_size
+    assert phases["extract"].files == 1
+    # Already installed: only the manifest is read
+    assert [t.phase for t in again.apps[0].timings] == ["manifest parse"]
+
+
+def test_install_cli_prints_timings(tmp_path: Path) -> None:
+    archive, sha256 = create_archive(tmp_path, {"bin/tool": "#!/bin/sh\n"})
+    manifest = PoksManifest(description="Tool", versions=[PoksAppVersion(version="1.0", url=archive.as_uri(), archives=[PoksArchive(os="linux", arch="x86_64", sha256=sha256)])])
+    manifest_path = tmp_path / "tool.json"
+    manifest.to_json_file(manifest_path)
+
+    with PLATFORM_PATCH:
+        result = runner.invoke(app, ["install", "-m", str(manifest_path), "--version", "1.0", "--root", str(tmp_path / "root"), "--timings", "jsonl"])
+
+    assert result.exit_code == 0, result.output
+    # The progress bars share stdout when it is not a terminal
+    records = [json.loads(line[line.index("{") :]) for line in result.stdout.splitlines() if "{" in line]
+    assert [r["phase"] for r in records] == ["manifest parse", "cache lookup", "download", "hash verify", "extract", "receipt write"]
+    assert {r["app"] for r in records} == {"tool"}
@@ -0,0 +1,133 @@
+"""Tests for the optional tracer hook."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from typer.testing import CliRunner
+
+from poks.domain import PoksAppVersion, PoksArchive, PoksManifest
+from poks.main import app
+from poks.poks import Poks
+from poks.tracing import InMemorySpanExporter, OtlpJsonFileExporter, Tracer, trace, use_tracer
+from tests.conftest import PoksEnv
+from tests.helpers import create_archive
+
+PLACEHOLDER = "/opt/anaconda1anaconda2anaconda3"
+PLATFORM_PATCH = patch("poks.poks.get_current_platform", return_value=("linux", "x86_64"))
+runner = CliRunner()
+
+
+def test_trace_is_noop_without_tracer() -> None:
+    with trace("outside", {"poks.app": "tool"}) as span:
+        span.set_attribute("poks.bytes", 1)
+
+    assert not span.is_recording()
+    assert span.attributes == {}
+
+
+def test_spans_nest_and_export_with_root() -> None:
+    exporter = InMemorySpanExporter()
+    with use_tracer(Tracer(exporter)), trace("root") as root:
+        with trace("child", {"poks.app": "tool"}) as child:
+            child.set_attribute("poks.bytes", 42)
+        assert exporter.spans == []
+
+    assert [span.name for span in exporter.spans] == ["child", "root"]
+    assert child.trace_id == root.trace_id
+    assert child.parent_span_id == root.span_id
+    assert child.attributes == {"poks.app": "tool", "poks.bytes": 42}
+    assert root.end_time_ns >= child.end_time_ns >= child.start_time_ns >= root.start_time_ns
+
+
+def test_span_records_error() -> None:
+    exporter = InMemorySpanExporter()
+    with pytest.raises(ValueError, match="boom"), use_tracer(Tracer(exporter)), trace("root"):
+        raise ValueError("boom")
+
+    assert exporter.spans[0].error == "boom"
+
+
+def test_otlp_json_file_exporter(tmp_path: Path) -> None:
+    trace_file = tmp_path / "traces" / "poks.jsonl"
+    with use_tracer(Tracer(OtlpJsonFileExporter(trace_file))), trace("root"), trace("child", {"poks.cache_hit": True, "poks.bytes": 7, "poks.format": "zip"}):
+        pass
+
+    request = json.loads(trace_file.read_text())
+    resource_spans = request["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "poks"}}]
+    child, root = resource_spans["scopeSpans"][0]["spans"]
+    assert child["parentSpanId"] == root["spanId"]
+    assert "parentSpanId" not in root
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert child["attributes"] == [
+        {"key": "poks.cache_hit", "value": {"boolValue": True}},
+        {"key": "poks.bytes", "value": {"intValue": "7"}},
+        {"key": "poks.format", "value": {"stringValue": "zip"}},
+    ]
+    assert child["status"] == {"code": 1}
+
+
+def _conda_manifest(tmp_path: Path) -> PoksManifest:
+    archive, sha256 = create_archive(
+        tmp_path,
+        {"bin/tool": f"prefix={PLACEHOLDER}\n"},
+        fmt="conda",
+        conda_patches=[{"_path": "bin/tool", "prefix_placeholder": PLACEHOLDER, "file_mode": "text"}],
+    )
+    return PoksManifest(
+        description="Tool",
+        versions=[PoksAppVersion(version="1.0", url=archive.as_uri(), archives=[PoksArchive(os="linux", arch="x86_64", ext=".conda", sha256=sha256)])],
+    )
+
+
+def test_install_emits_spans(poks_env: PoksEnv) -> None:
+    poks_env.add_manifest("tool", _conda_manifest(poks_env.archives_dir))
+    archive, sha256 = poks_env.make_archive({"bin/other": "#!/bin/sh\n"}, fmt="zip")
+    poks_env.add_manifest(
+        "other",
+        PoksManifest(
+            description="Other", versions=[PoksAppVersion(version="2.0", url=archive.as_uri(), archives=[PoksArchive(os="linux", arch="x86_64", ext=".zip", sha256=sha256)])]
+        ),
+    )
+    config_path = poks_env.create_config([{"name": "tool", "version": "1.0"}, {"name": "other", "version": "2.0"}])
+    exporter = InMemorySpanExporter()
+    poks = Poks(root_dir=poks_env.root_dir, progress_callback=None, extract_callback=None, tracer=Tracer(exporter))
+
+    with PLATFORM_PATCH:
+        poks.install(config_path)
+
+    (root,) = exporter.by_name("install")
+    assert {span.trace_id for span in exporter.spans} == {root.trace_id}
+    (sync,) = exporter.by_name("sync_bucket")
+    assert sync.parent_span_id == root.span_id
+    assert sync.attributes["poks.bucket"] == "test"
+    install_spans = {span.attributes["poks.app"]: span for span in exporter.by_name("install_app")}
+    assert {span.parent_span_id for span in install_spans.values()} == {root.span_id}
+    assert install_spans["other"].attributes["poks.version"] == "2.0"
+    downloads = {span.attributes["poks.app"]: span for span in exporter.by_name("get_cached_or_download")}
+    assert downloads["tool"].parent_span_id == install_spans["tool"].span_id
+    assert downloads["tool"].attributes["poks.cache_hit"] is False
+    assert downloads["other"].attributes["poks.bytes"] == archive.stat().st_size
+    extracts = {span.attributes["poks.app"]: span for span in exporter.by_name("extract_archive")}
+    assert extracts["tool"].attributes["poks.format"] == "conda"
+    assert extracts["other"].attributes["poks.format"] == "zip"
+    (poke,) = exporter.by_name("poke")
+    assert poke.parent_span_id == extracts["tool"].span_id
+    assert poke.attributes == {"poks.files": 1, "poks.sites": 1}
+
+
+def test_install_cli_writes_trace_file(tmp_path: Path) -> None:
+    manifest_path = tmp_path / "tool.json"
+    _conda_manifest(tmp_path).to_json_file(manifest_path)
+    trace_file = tmp_path / "trace.jsonl"
+
+    with PLATFORM_PATCH:
+        result = runner.invoke(app, ["install", "-m", str(manifest_path), "--version", "1.0", "--root", str(tmp_path / "root"), "--trace-file", str(trace_file)])
+
+    assert result.exit_code == 0, result.output
+    spans = json.loads(trace_file.read_text())["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in spans] == ["get_cached_or_download", "poke", "extract_archive", "install_app"]